@@ -1,15 +1,17 @@
 import cv2
 import numpy as np
 import time
-import os
+import threading
 import PoseModule as pm
-import json
+from classification_worker import ClassificationWorker
+from progress_store import get_progress_store
+from overlay import OverlayCompositor
 
 class HuggingFaceHybridDetector:
     """
     A hybrid approach that combines Hugging Face transformer-based classification with angle-based verification
     """
-    def __init__(self, pose_name="vrksana", use_hf=True):
+    def __init__(self, pose_name="vrksana", use_hf=True, classifier=None):
         # Create a custom pose detector
         self.angle_detector = pm.PoseDetector(pose_name=pose_name)
         
@@ -21,14 +23,17 @@ class HuggingFaceHybridDetector:
         
         # Frame count for processing
         self.frame_count = 0
-        self.process_every_n_frames = 3  # Only process every 3rd frame for HF model
-        self.last_frame_time = time.time()
-        self.target_fps = 15  # Target 15 FPS
-        self.frame_duration = 1.0 / self.target_fps
         
-        # Progress tracking variables
-        self.progress_data_file = os.path.join(os.path.dirname(__file__), 'pose_progress.json')
-        self.progress_data = self._load_progress_data()
+        # Set by close(); a closed detector never starts a classification thread again
+        self.closed = False
+        self._worker_lock = threading.Lock()
+        
+        # Progress tracking variables (shared in-memory store, flushed to pose_progress.json in the background)
+        self.progress_store = get_progress_store()
+        self.progress_data_file = self.progress_store.path
+        
+        # Reusable canvases for the completion / progress bands
+        self.overlay = OverlayCompositor()
         
         # Pose completion variables
         self.pose_start_time = time.time()
@@ -41,58 +46,62 @@ class HuggingFaceHybridDetector:
         self.is_in_correct_position = False  # Track if user is currently in correct position
         self.last_position_time = time.time()  # Time of last position check
         
-        # Initialize HuggingFace classifier if requested
+        # Initialize HuggingFace classifier if requested (or use an already loaded one;
+        # loading the model takes seconds)
         self.hf_classifier = None
-        if self.use_hf:
+        self.classification_worker = None
+        if classifier is not None:
+            self.attach_classifier(classifier)
+        elif self.use_hf:
             try:
                 from HuggingFacePoseClassifier import HuggingFacePoseClassifier
                 self.hf_classifier = HuggingFacePoseClassifier()
+                # Classify on a background thread; the interval adapts to model latency and body motion
+                self.classification_worker = ClassificationWorker(self.hf_classifier).start()
                 print(f"HuggingFace classifier initialized successfully")
             except Exception as e:
                 print(f"Error initializing HuggingFace classifier: {str(e)}")
                 self.use_hf = False
     
-    def _load_progress_data(self):
-        """Load pose progress data from JSON file"""
-        if os.path.exists(self.progress_data_file):
-            try:
-                with open(self.progress_data_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading progress data: {str(e)}")
-                return self._initialize_progress_data()
-        else:
-            return self._initialize_progress_data()
-            
-    def _initialize_progress_data(self):
-        """Initialize empty progress data structure"""
-        poses = [
-            'vrksana', 'adhomukha', 'balasana', 'tadasan', 'trikonasana', 
-            'virabhadrasana', 'bhujangasana', 'setubandhasana', 
-            'uttanasana', 'shavasana', 'ardhamatsyendrasana'
-        ]
-        
-        data = {}
-        for pose in poses:
-            data[pose] = {
-                'attempts': 0,
-                'completions': 0,
-                'total_practice_time': 0,
-                'best_accuracy': 0,
-                'last_practiced': None
-            }
-        return data
-        
-    def _save_progress_data(self):
-        """Save pose progress data to JSON file"""
+    def attach_classifier(self, classifier):
+        """Start classifying with a loaded classifier, e.g. once a background load has finished"""
+        with self._worker_lock:
+            if self.closed:
+                return
+            if self.classification_worker is not None:
+                self.classification_worker.stop()
+            self.hf_classifier = classifier
+            # Classify on a background thread; the interval adapts to model latency and body motion
+            self.classification_worker = ClassificationWorker(classifier).start()
+            self.use_hf = True
+    
+    def close(self):
+        """Stop the classification thread and release the MediaPipe graph"""
+        with self._worker_lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.classification_worker is not None:
+                self.classification_worker.stop()
+                self.classification_worker = None
+            self.use_hf = False
         try:
-            with open(self.progress_data_file, 'w') as f:
-                json.dump(self.progress_data, f, indent=4)
+            self.angle_detector.pose.close()
         except Exception as e:
-            print(f"Error saving progress data: {str(e)}")
+            print(f"Error closing pose detector: {str(e)}")
+    
+    @property
+    def progress_data(self):
+        """Snapshot of pose progress data for all poses"""
+        return self.progress_store.snapshot()
             
     def _get_pose_completion_time(self, pose_name):
         """Get the required time to complete a pose in seconds"""
+        return self.get_pose_completion_time(pose_name)
+    
+    @staticmethod
+    def get_pose_completion_time(pose_name):
+        """Required hold time for a pose in seconds (no detector instance needed)"""
         completion_times = {
             'vrksana': 30,        # Tree pose - moderate difficulty
             'adhomukha': 45,      # Downward dog - moderate difficulty 
@@ -130,19 +139,15 @@ class HuggingFaceHybridDetector:
             self.correct_pose_duration = 0
             
             # Update attempt count in progress data
-            if new_pose_name in self.progress_data:
-                self.progress_data[new_pose_name]['attempts'] += 1
-                self.progress_data[new_pose_name]['last_practiced'] = time.strftime("%Y-%m-%d %H:%M:%S")
-                self._save_progress_data()
+            self.progress_store.update(new_pose_name, attempts=1)
     
     def _record_practice_time(self):
         """Record the practice time for the current pose"""
-        if self.pose_name in self.progress_data:
+        if self.pose_name in self.progress_store:
             practice_duration = time.time() - self.practice_start_time
             # Only record if they practiced for at least 5 seconds
             if practice_duration >= 5:
-                self.progress_data[self.pose_name]['total_practice_time'] += practice_duration
-                self._save_progress_data()
+                self.progress_store.update(self.pose_name, practice_time=practice_duration, touch=False)
                 print(f"Recorded {practice_duration:.1f}s practice time for {self.pose_name}")
 
     def findPose(self, frame, draw=True):
@@ -153,26 +158,24 @@ class HuggingFaceHybridDetector:
             
         # If this is the first frame, increment the attempts counter for the current pose
         # This ensures attempts are counted as soon as you start practicing
-        if self.frame_count == 0 and self.pose_name in self.progress_data:
-            self.progress_data[self.pose_name]['attempts'] += 1
-            self.progress_data[self.pose_name]['last_practiced'] = time.strftime("%Y-%m-%d %H:%M:%S")
-            self._save_progress_data()
+        if self.frame_count == 0 and self.progress_store.update(self.pose_name, attempts=1) is not None:
             print(f"Incremented attempts for {self.pose_name}")
             
         # Use the base detector but don't draw the landmarks to avoid extra lines
         result_frame = self.angle_detector.findPose(frame, draw)
         
-        # Process with Hugging Face model periodically if enabled
+        # Process with Hugging Face model in the background if enabled
         self.frame_count += 1
-        current_time = time.time()
         
-        # Only process every Nth frame to maintain performance, and ensure minimum time between frames
-        if self.use_hf and self.hf_classifier and self.frame_count % self.process_every_n_frames == 0 and current_time - self.last_frame_time >= self.frame_duration:
-            self.last_frame_time = current_time
-            
+        # Hand the newest frame to the worker (returns immediately) and pick up any finished result
+        result = None
+        if self.use_hf and self.classification_worker:
+            self.classification_worker.submit(frame, self.angle_detector.getLandmarkArray())
+            result = self.classification_worker.poll()
+        
+        if result is not None:
             try:
-                # Use HuggingFace classifier to detect pose
-                predicted_pose, confidence = self.hf_classifier.classify_image(frame)
+                predicted_pose, confidence = result['pose'], result['confidence']
                 # Store confidence for later use
                 self.last_confidence = confidence
                 
@@ -214,25 +217,23 @@ class HuggingFaceHybridDetector:
                             print(f"Pose {self.pose_name} completed after {self.correct_pose_duration:.1f} seconds!")
                             
                             # Update progress data on completion
-                            if self.pose_name in self.progress_data:
-                                # Increment completions counter
-                                self.progress_data[self.pose_name]['completions'] += 1
-                                
+                            if self.pose_name in self.progress_store:
                                 # Record practice time immediately when the pose is completed
                                 elapsed_practice_time = current_time - self.practice_start_time
-                                self.progress_data[self.pose_name]['total_practice_time'] += elapsed_practice_time
-                                print(f"Added {elapsed_practice_time:.1f}s practice time for {self.pose_name}")
                                 
                                 # Calculate accuracy from angle measurements
                                 angles = self._calculate_pose_accuracy()
                                 avg_accuracy = sum(angles.values()) / len(angles) if angles else 85
                                 
-                                # Update best accuracy if this attempt was better
-                                if avg_accuracy > self.progress_data[self.pose_name]['best_accuracy']:
-                                    self.progress_data[self.pose_name]['best_accuracy'] = avg_accuracy
-                                
-                                # Save the updated progress data
-                                self._save_progress_data()
+                                # Increment completions, add practice time and keep the best accuracy in one update
+                                self.progress_store.update(
+                                    self.pose_name,
+                                    completions=1,
+                                    practice_time=elapsed_practice_time,
+                                    best_accuracy=avg_accuracy,
+                                    touch=False
+                                )
+                                print(f"Added {elapsed_practice_time:.1f}s practice time for {self.pose_name}")
                                 
                                 # Reset practice start time for next session
                                 self.practice_start_time = current_time
@@ -249,6 +250,9 @@ class HuggingFaceHybridDetector:
                         
             except Exception as e:
                 print(f"Error in HuggingFace processing: {str(e)}")
+        elif self.is_in_correct_position and self.correct_pose_start_time is not None:
+            # No new classification this frame - keep the hold timer moving from the last result
+            self.correct_pose_duration = time.time() - self.correct_pose_start_time
         
         # Draw breathing guide text on the frame itself (instead of a separate call)
         h, w, _ = result_frame.shape
@@ -277,24 +281,8 @@ class HuggingFaceHybridDetector:
         
         # Add overlay showing completion status - place outside the camera view
         if self.pose_completed and not self.completion_notification_shown:
-            # Add 100 pixels at the bottom for completion notification
-            h, w, _ = result_frame.shape
-            expanded_h = h + 100
-            expanded_img = np.zeros((expanded_h, w, 3), dtype=np.uint8)
-            
-            # Copy the original image to the top portion of the expanded image
-            expanded_img[0:h, 0:w] = result_frame
-            
-            # Create bottom area with semi-transparent green background
-            cv2.rectangle(expanded_img, (0, h), (w, expanded_h), (0, 200, 0), -1)
-            
-            # Add text
-            font = cv2.FONT_HERSHEY_DUPLEX
-            text = "Pose Completed!"
-            text_size = cv2.getTextSize(text, font, 1.5, 2)[0]
-            text_x = (w - text_size[0]) // 2
-            text_y = h + 60
-            cv2.putText(expanded_img, text, (text_x, text_y), font, 1.5, (255, 255, 255), 2)
+            # 100 pixel completion band below the image (static, rendered once and cached)
+            expanded_img = self.overlay.completion_banner(result_frame)
             
             # Set the flag to avoid showing notification continuously
             self.completion_notification_shown = True
@@ -307,36 +295,9 @@ class HuggingFaceHybridDetector:
             progress = (self.correct_pose_duration / self.pose_completion_time) * 100
             progress = min(100, max(0, progress))  # Limit to 0-100%
             
-            # Create expanded image with 60 pixels at the bottom for progress bar
-            h, w, _ = result_frame.shape
-            expanded_h = h + 60
-            expanded_img = np.zeros((expanded_h, w, 3), dtype=np.uint8)
-            
-            # Copy the original image to the top portion of the expanded image
-            expanded_img[0:h, 0:w] = result_frame
-            
-            # Create bottom area with dark background
-            cv2.rectangle(expanded_img, (0, h), (w, expanded_h), (50, 50, 50), -1)
-            
-            # Background of bar
-            bar_height = 20
-            bar_y = h + 20
-            bar_width = int(w * 0.8)
-            bar_x = (w - bar_width) // 2
-            cv2.rectangle(expanded_img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (200, 200, 200), -1)
-            
-            # Filled portion
-            filled_width = int(bar_width * (progress / 100))
-            cv2.rectangle(expanded_img, (bar_x, bar_y), (bar_x + filled_width, bar_y + bar_height), (0, 255, 0), -1)
-            
-            # Text showing percentage
+            # 60 pixel progress band below the image; only the fill and text are redrawn
             text = f"{int(progress)}% - Hold for {int(self.pose_completion_time-self.correct_pose_duration)}s more"
-            text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 1)[0]
-            text_x = (w - text_size[0]) // 2
-            text_y = h + 15
-            cv2.putText(expanded_img, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1, cv2.LINE_AA, False)
-            
-            return expanded_img
+            return self.overlay.progress_banner(result_frame, progress, text)
                 
         return result_frame
 
@@ -348,6 +309,10 @@ class HuggingFaceHybridDetector:
         """Delegate to the angle detector's findAngle method"""
         return self.angle_detector.findAngle(frame, p1, p2, p3, draw)
 
+    def findAngles(self, frame=None, draw=False, named=True):
+        """Delegate to the angle detector's batched findAngles method"""
+        return self.angle_detector.findAngles(frame, draw, named)
+
     def getPosition(self, frame, draw=True):
         """Delegate to the angle detector's getPosition method"""
         return self.angle_detector.getPosition(frame, draw)
@@ -369,22 +334,22 @@ class HuggingFaceHybridDetector:
             }
             
         try:
-            # Calculate actual angles for different body parts
+            # Calculate actual angles for all body parts in one vectorized pass
+            joint_angles = self.angle_detector.findAngles()
+            if joint_angles is None:
+                raise ValueError("No landmarks available for angle calculation")
+            
             # Right arm (shoulder-elbow-wrist)
-            right_arm_angle = self.angle_detector.findAngle(None, 12, 14, 16, draw=False)
-            right_arm_accuracy = self._calculate_part_accuracy(right_arm_angle, 'right_arm')
+            right_arm_accuracy = self._calculate_part_accuracy(float(joint_angles['right_arm']), 'right_arm')
             
             # Left arm (shoulder-elbow-wrist)
-            left_arm_angle = self.angle_detector.findAngle(None, 11, 13, 15, draw=False)
-            left_arm_accuracy = self._calculate_part_accuracy(left_arm_angle, 'left_arm')
+            left_arm_accuracy = self._calculate_part_accuracy(float(joint_angles['left_arm']), 'left_arm')
             
             # Right leg (hip-knee-ankle)
-            right_leg_angle = self.angle_detector.findAngle(None, 24, 26, 28, draw=False)
-            right_leg_accuracy = self._calculate_part_accuracy(right_leg_angle, 'right_leg')
+            right_leg_accuracy = self._calculate_part_accuracy(float(joint_angles['right_leg']), 'right_leg')
             
             # Left leg (hip-knee-ankle)
-            left_leg_angle = self.angle_detector.findAngle(None, 23, 25, 27, draw=False)
-            left_leg_accuracy = self._calculate_part_accuracy(left_leg_angle, 'left_leg')
+            left_leg_accuracy = self._calculate_part_accuracy(float(joint_angles['left_leg']), 'left_leg')
             
             # Store the calculated accuracies
             angles['right_arm'] = right_arm_accuracy
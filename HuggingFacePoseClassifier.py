@@ -5,30 +5,83 @@ import os
 import numpy as np
 import cv2
 import logging
+import threading
 import traceback
+import json
+import re
+import time
+import tempfile
+from classification_cache import ClassificationCache
+
+# Model input size and ImageNet normalization folded into one per-channel
+# scale and bias: (x / 255 - mean) / std == x * scale + bias
+INPUT_SIZE = 224
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+NORM_SCALE = (1.0 / (255.0 * IMAGENET_STD)).astype(np.float32).reshape(3, 1, 1)
+NORM_BIAS = (-IMAGENET_MEAN / IMAGENET_STD).astype(np.float32).reshape(3, 1, 1)
+
+# Model variants: the eager transformers model, a TorchScript trace of it, or a
+# TorchScript trace with dynamic int8 quantization of the Linear layers.
+# Compiled variants are exported once and cached in MODEL_CACHE_DIR.
+VARIANTS = ('eager', 'torchscript', 'int8')
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_cache')
+# Bundled pose images used to check that a compiled variant agrees with the eager model
+VERIFY_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+VERIFY_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Tensor-in, logits-out wrapper so a transformers model can be traced"""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values, return_dict=False)[0]
+
 
 class HuggingFacePoseClassifier:
-    def __init__(self, model_name="AdityasArsenal/finetuned-for-YogaPosesv6"):
+    def __init__(self, model_name="AdityasArsenal/finetuned-for-YogaPosesv6", variant=None,
+                 cache_dir=MODEL_CACHE_DIR, min_agreement=0.9, result_cache_size=512, result_cache_path=None):
         """
         Initialize the Hugging Face yoga pose classifier with custom preprocessing.
         
         Args:
             model_name (str): The name of the Hugging Face model to use.
+            variant (str): 'eager', 'torchscript' or 'int8' (defaults to $NYRA_HF_VARIANT or 'eager').
+                Compiled variants are loaded from cache_dir, or exported there on first use.
+            cache_dir (str): Directory for compiled model artifacts.
+            min_agreement (float): Top-1 agreement with the eager model on the bundled images
+                a freshly exported variant needs; otherwise the eager model is used.
+            result_cache_size (int): Number of predict() results cached by image content (0 disables).
+            result_cache_path (str): Optional JSON file the result cache is persisted to.
         """
-        print(f"Loading Hugging Face model: {model_name}")
+        variant = variant or os.environ.get('NYRA_HF_VARIANT', 'eager')
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown model variant '{variant}', expected one of {VARIANTS}")
+        print(f"Loading Hugging Face model: {model_name} ({variant})")
         self.model_name = model_name
+        self.variant = variant
+        self.cache_dir = cache_dir
+        self.min_agreement = min_agreement
+        self.model = None             # Eager transformers model (not loaded when a cached artifact is used)
+        self.compiled_model = None    # TorchScript module returning logits
+        
+        # Preallocated preprocessing buffers, grown to the largest batch seen
+        self._batch_buffer = None
+        self._resize_buffer = np.empty((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        # Preprocessing buffers and the model are shared between threads
+        self._lock = threading.RLock()
         
         # Load model with standard image preprocessing approach
         try:
-            # Load the model directly from HuggingFace
-            print(f"Loading model from HuggingFace")
-            self.model = AutoModelForImageClassification.from_pretrained(model_name)
-            
-            # Set model to evaluation mode
-            self.model.eval()
-            
-            print(f"Model loaded successfully with {len(self.model.config.id2label)} yoga pose classes")
-            self.id2label = self.model.config.id2label
+            # A cached compiled artifact skips loading the transformers model altogether
+            if variant == 'eager' or not self._load_compiled():
+                self._load_eager()
+                print(f"Model loaded successfully with {len(self.id2label)} yoga pose classes")
+                if variant != 'eager':
+                    self._export_compiled()
             
             # Print the available classes with their indices for debugging
             print("Available class mappings:")
@@ -41,11 +94,143 @@ class HuggingFacePoseClassifier:
             # Create custom pose mappings for our specific application
             self._create_pose_mappings()
             
+            # predict() results by image content, separate per model and loaded variant
+            self.result_cache = None
+            if result_cache_size > 0:
+                loaded_variant = self.variant if self.compiled_model is not None else 'eager'
+                self.result_cache = ClassificationCache(
+                    result_cache_size, result_cache_path, namespace=f"{self.model_name}:{loaded_variant}")
+            
         except Exception as e:
             print(f"Error loading model: {str(e)}")
             traceback.print_exc()
             raise
     
+    def _load_eager(self):
+        """Load the full-precision model from HuggingFace"""
+        print(f"Loading model from HuggingFace")
+        self.model = AutoModelForImageClassification.from_pretrained(self.model_name)
+        
+        # Set model to evaluation mode
+        self.model.eval()
+        self.id2label = self.model.config.id2label
+    
+    def _artifact_paths(self):
+        """(model, metadata) paths of the cached artifact for this model, variant and torch version"""
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.model_name)
+        # TorchScript (and especially quantized) artifacts are not portable across torch versions
+        torch_version = torch.__version__.split('+')[0]
+        stem = os.path.join(self.cache_dir, f"{name}-{self.variant}-torch{torch_version}")
+        return stem + '.pt', stem + '.json'
+    
+    def _load_compiled(self):
+        """Load a cached compiled artifact; returns False if there is none (or it is unusable)"""
+        model_path, meta_path = self._artifact_paths()
+        if not os.path.exists(model_path) or not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            self.compiled_model = torch.jit.load(model_path, map_location='cpu').eval()
+            # JSON object keys are strings; the transformers config uses int class ids
+            self.id2label = {int(k): v for k, v in meta['id2label'].items()}
+            print(f"Loaded cached {self.variant} model from {model_path} "
+                  f"(top-1 agreement {meta.get('agreement', 0) * 100:.1f}% with the eager model)")
+            return True
+        except Exception as e:
+            print(f"Could not load cached model {model_path}: {str(e)}")
+            self.compiled_model = None
+            return False
+    
+    def _export_compiled(self):
+        """Trace (and quantize) the eager model, verify it and cache it for later starts"""
+        start = time.time()
+        model = self.model
+        if self.variant == 'int8':
+            # Dynamic quantization: Linear weights stored as int8, activations quantized per batch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        example = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE)
+        try:
+            with torch.no_grad():
+                compiled = torch.jit.trace(_LogitsOnly(model).eval(), example, strict=False)
+        except Exception as e:
+            print(f"Could not compile {self.variant} model, using the eager model: {str(e)}")
+            return
+        
+        report = self.verify_agreement(compiled)
+        print(f"{self.variant} model agrees with the eager model on {report['agreement'] * 100:.1f}% "
+              f"of {report['images']} images (compiled in {time.time() - start:.1f}s)")
+        if report['images'] and report['agreement'] < self.min_agreement:
+            print(f"Agreement below {self.min_agreement * 100:.0f}%, using the eager model")
+            return
+        self.compiled_model = compiled
+        
+        model_path, meta_path = self._artifact_paths()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            os.close(fd)
+            torch.jit.save(compiled, tmp_path)
+            os.replace(tmp_path, model_path)
+            with open(meta_path, 'w') as f:
+                json.dump({
+                    'model_name': self.model_name,
+                    'variant': self.variant,
+                    'torch_version': torch.__version__,
+                    'id2label': {str(k): v for k, v in self.id2label.items()},
+                    'agreement': report['agreement'],
+                    'verified_images': report['images'],
+                    'created': time.time(),
+                }, f, indent=2)
+            print(f"Cached {self.variant} model at {model_path}")
+        except Exception as e:
+            print(f"Could not cache compiled model: {str(e)}")
+    
+    def _forward(self, inputs):
+        """Logits for a preprocessed batch from the loaded variant (caller holds the lock)"""
+        with torch.no_grad():
+            if self.compiled_model is not None:
+                return self.compiled_model(inputs)
+            return self.model(inputs).logits
+    
+    def verify_agreement(self, candidate=None, image_dir=VERIFY_IMAGE_DIR):
+        """
+        Compare top-1 predictions of the eager model and a compiled variant
+        (default: the loaded one) on the images in image_dir.
+        
+        Returns:
+            dict with 'images', 'agreement' (0-1) and the file names in 'mismatches'
+        """
+        candidate = candidate if candidate is not None else self.compiled_model
+        if candidate is None:
+            raise ValueError("No compiled model to verify")
+        if self.model is None:
+            self._load_eager()
+        
+        names = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(VERIFY_IMAGE_EXTENSIONS)) \
+            if os.path.isdir(image_dir) else []
+        matches, mismatches, total = 0, [], 0
+        for name in names:
+            try:
+                image = Image.open(os.path.join(image_dir, name)).convert("RGB")
+            except Exception:
+                continue
+            with self._lock:
+                inputs = self.preprocess_image(image)
+                with torch.no_grad():
+                    expected = self.model(inputs).logits.argmax(dim=1).item()
+                    actual = candidate(inputs).argmax(dim=1).item()
+            total += 1
+            if expected == actual:
+                matches += 1
+            else:
+                mismatches.append(name)
+        return {
+            'images': total,
+            'agreement': matches / total if total else 1.0,
+            'mismatches': mismatches,
+        }
+    
     def _create_fallback_mappings(self):
         """Create fallback mappings in case we encounter unknown class indices"""
         # Store numerical keys for easy integer-based lookup
@@ -162,6 +347,54 @@ class HuggingFacePoseClassifier:
         # Return the original input if no mapping found
         return class_index_or_name
     
+    def _as_uint8_image(self, image):
+        """Return (array, is_bgr) for an OpenCV frame or PIL image, with 3 uint8 channels"""
+        if isinstance(image, Image.Image):
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            return np.asarray(image), False
+        
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        elif image.shape[-1] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        if image.dtype != np.uint8:
+            image = np.clip(image, 0, 255).astype(np.uint8)
+        return image, True
+    
+    def preprocess_batch(self, images):
+        """
+        Preprocess N frames into one [N, 3, 224, 224] float32 tensor.
+        
+        Frames are resized with cv2 (INTER_AREA) into a reused uint8 buffer and
+        written straight into a preallocated float32 batch buffer with the
+        channel swap and ImageNet normalization fused into one multiply-add.
+        
+        Args:
+            images: list of numpy arrays (BGR, as from OpenCV) or PIL Images
+            
+        Returns:
+            tensor sharing memory with the batch buffer - it is overwritten by the
+            next call, so run the forward pass before preprocessing again
+        """
+        n = len(images)
+        with self._lock:
+            if self._batch_buffer is None or self._batch_buffer.shape[0] < n:
+                self._batch_buffer = np.empty((n, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+            batch = self._batch_buffer[:n]
+            
+            for i, image in enumerate(images):
+                array, is_bgr = self._as_uint8_image(image)
+                cv2.resize(array, (INPUT_SIZE, INPUT_SIZE), dst=self._resize_buffer, interpolation=cv2.INTER_AREA)
+                # HWC -> CHW view; reversing the channel axis turns BGR into RGB without a copy
+                chw = self._resize_buffer.transpose(2, 0, 1)
+                if is_bgr:
+                    chw = chw[::-1]
+                np.multiply(chw, NORM_SCALE, out=batch[i])
+                batch[i] += NORM_BIAS
+            
+            return torch.from_numpy(batch)
+    
     def preprocess_image(self, image):
         """
         Custom preprocessing function for yoga pose images.
@@ -171,37 +404,44 @@ class HuggingFacePoseClassifier:
             image: PIL Image or numpy array
             
         Returns:
-            preprocessed tensor ready for model
+            preprocessed tensor ready for model, shape [1, 3, 224, 224]
         """
-        # Convert numpy array to PIL Image if needed
-        if isinstance(image, np.ndarray):
-            # If BGR (OpenCV), convert to RGB
-            if image.shape[-1] == 3:
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(image)
-            
-        # Resize to standard size for most vision models (224x224)
-        image = image.resize((224, 224))
-        
-        # Convert to RGB if needed
-        if image.mode != "RGB":
-            image = image.convert("RGB")
-            
-        # Convert to numpy array
-        img_array = np.array(image)
+        return self.preprocess_batch([image])
+    
+    def _map_prediction(self, predicted_class_idx):
+        """Return (predicted_pose, original_class) for a model output index"""
+        # First get the standard class label
+        predicted_class = self._safe_get_class_label(predicted_class_idx)
         
-        # Normalize to [0, 1]
-        img_array = img_array.astype(np.float32) / 255.0
+        # Then map to our application's pose name
+        predicted_pose = self.map_to_pose_name(predicted_class_idx)
         
-        # Normalize with ImageNet mean and std
-        mean = np.array([0.485, 0.456, 0.406])
-        std = np.array([0.229, 0.224, 0.225])
-        img_array = (img_array - mean) / std
+        # If mapping didn't work, use the original class
+        if not predicted_pose or predicted_pose == predicted_class_idx:
+            predicted_pose = predicted_class
+        return predicted_pose, predicted_class
+    
+    def classify_batch(self, images):
+        """
+        Classify N frames with a single forward pass.
         
-        # Convert to tensor format [1, 3, 224, 224]
-        img_tensor = torch.from_numpy(img_array).permute(2, 0, 1).unsqueeze(0).float()
+        Args:
+            images: list of numpy arrays (BGR) or PIL Images
+        Returns:
+            list of (pose_name, confidence) tuples, confidence in 0-1
+        """
+        if len(images) == 0:
+            return []
+        with self._lock:
+            inputs = self.preprocess_batch(images)
+            logits = self._forward(inputs)
         
-        return img_tensor
+        probabilities = torch.nn.functional.softmax(logits, dim=1)
+        confidences, indices = torch.max(probabilities, dim=1)
+        return [
+            (self._map_prediction(idx)[0], conf)
+            for idx, conf in zip(indices.tolist(), confidences.tolist())
+        ]
         
     def predict(self, image_path):
         """
@@ -217,18 +457,25 @@ class HuggingFacePoseClassifier:
             return {"error": f"Image not found at {image_path}"}
         
         try:
+            # Images seen before (e.g. the reference poses) are served without running the model
+            cache_key = None
+            if self.result_cache is not None:
+                cache_key = self.result_cache.key_for_file(image_path)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Load and preprocess the image
             image = Image.open(image_path).convert("RGB")
             
             # Preprocess using our custom function
-            inputs = self.preprocess_image(image)
-            
-            # Make prediction
-            with torch.no_grad():
-                outputs = self.model(inputs)
+            with self._lock:
+                inputs = self.preprocess_image(image)
+                
+                # Make prediction
+                logits = self._forward(inputs)
                 
             # Get predicted class
-            logits = outputs.logits
             probabilities = torch.nn.functional.softmax(logits, dim=1)
             
             # Get top prediction
@@ -241,11 +488,14 @@ class HuggingFacePoseClassifier:
             # Map to our application's pose name
             predicted_pose = self.map_to_pose_name(predicted_class_idx) or predicted_class
             
-            return {
+            result = {
                 "pose": predicted_pose,
                 "original_class": predicted_class,
                 "confidence": confidence * 100  # Convert to percentage
             }
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
+            return result
             
         except Exception as e:
             return {"error": f"Prediction error: {str(e)}"}
@@ -296,27 +546,16 @@ class HuggingFacePoseClassifier:
             confidence: Confidence score (0-1)
         """
         try:
-            # Preprocess using our custom function
-            inputs = self.preprocess_image(img)
-            
-            # Make prediction
-            with torch.no_grad():
-                outputs = self.model(inputs)
+            # Single-frame batch through the shared preprocessing buffers
+            with self._lock:
+                inputs = self.preprocess_image(img)
+                logits = self._forward(inputs)
             
-            logits = outputs.logits
             probabilities = torch.nn.functional.softmax(logits, dim=1)
             predicted_class_idx = torch.argmax(probabilities, dim=1).item()
             confidence = probabilities[0][predicted_class_idx].item()
             
-            # First get the standard class label
-            predicted_class = self._safe_get_class_label(predicted_class_idx)
-            
-            # Then map to our application's pose name
-            predicted_pose = self.map_to_pose_name(predicted_class_idx)
-            
-            # If mapping didn't work, use the original class
-            if not predicted_pose or predicted_pose == predicted_class_idx:
-                predicted_pose = predicted_class
+            predicted_pose, predicted_class = self._map_prediction(predicted_class_idx)
                 
             print(f"Classified as: {predicted_pose} (original class: {predicted_class}) with {confidence*100:.2f}% confidence")
                 
@@ -339,7 +578,20 @@ class HuggingFacePoseClassifier:
 
 # Example usage
 if __name__ == "__main__":
-    classifier = HuggingFacePoseClassifier()
+    import argparse
+    parser = argparse.ArgumentParser(description="Classify a test image, optionally with a compiled model variant")
+    parser.add_argument('--variant', choices=VARIANTS, default=None,
+                        help="Model variant (compiled variants are exported to model_cache/ on first use)")
+    parser.add_argument('--verify', action='store_true',
+                        help="Report top-1 agreement of the compiled variant with the eager model on static/images")
+    args = parser.parse_args()
+    
+    classifier = HuggingFacePoseClassifier(variant=args.variant)
+    if args.verify and classifier.compiled_model is not None:
+        report = classifier.verify_agreement()
+        print(f"Top-1 agreement: {report['agreement'] * 100:.1f}% of {report['images']} images")
+        for name in report['mismatches']:
+            print(f"  mismatch: {name}")
     # Use an existing image from the assets folder
     test_image = "assets/photo1.png"  # Change this to your test image
     
@@ -4,11 +4,36 @@ import time
 import math
 import numpy as np
 import os
-import pygame  # For audio playback
+from joint_angles import JointAngleEngine, DEFAULT_ENGINE
+from overlay import OverlayCompositor
+from roi_tracker import ROITracker
+
+# MediaPipe Pose always returns this many landmarks
+NUM_LANDMARKS = 33
+
+# Landmark triplets used to decide if a body part is visible
+VISIBILITY_PARTS = {
+    'right_arm': (12, 14, 16),
+    'left_arm': (11, 13, 15),
+    'right_leg': (24, 26, 28),
+    'left_leg': (23, 25, 27)
+}
+_VISIBILITY_INDEX = np.array(list(VISIBILITY_PARTS.values()))
+
+# pygame is only needed for audio cues, so it is imported on first use
+pygame = None
+
+
+def _import_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as _pygame  # For audio playback
+        pygame = _pygame
+    return pygame
 
 
 class PoseDetector:
-    def __init__(self, mode = False, maxHands=1, modelComplexity=1, upBody = False, smooth=True, detectionCon = 0.5, trackCon = 0.5, pose_name="vrksana", use_local_model=True):
+    def __init__(self, mode = False, maxHands=1, modelComplexity=1, upBody = False, smooth=True, detectionCon = 0.5, trackCon = 0.5, pose_name="vrksana", use_local_model=True, joints=None, enable_audio=True, pose_backend=None, roi_tracking=False, metrics=None):
 
         self.mode = mode
         self.maxHands = maxHands
@@ -22,7 +47,41 @@ class PoseDetector:
 
         self.mpDraw = mp.solutions.drawing_utils
         self.mpPose = mp.solutions.pose
-        self.pose = self.mpPose.Pose(self.mode, self.maxHands, self.modelComplex, self.upBody, self.smooth, self.detectionCon, self.trackCon)
+        # pose_backend replaces the in-process Pose, e.g. a stream of a PoseWorkerPool (pose_workers.py)
+        if pose_backend is not None:
+            self.pose = pose_backend
+        else:
+            self.pose = self.mpPose.Pose(self.mode, self.maxHands, self.modelComplex, self.upBody, self.smooth, self.detectionCon, self.trackCon)
+        
+        # Reused BGR->RGB conversion target and drawing styles for findPose
+        self._rgbBuffer = None
+        self._landmarkSpec = self.mpDraw.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2)
+        self._connectionSpec = self.mpDraw.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
+        # Debug counters: image bytes copied/converted by the last findPose call and in total
+        self.frameBytesCopied = 0
+        self.totalBytesCopied = 0
+        
+        # Optional pipeline_metrics.PipelineMetrics for per-stage timings of findPose
+        self.metrics = metrics
+        
+        # Crop MediaPipe's input to the region around the last detected person (video mode only)
+        self.roiTracker = ROITracker() if roi_tracking and not self.mode else None
+        
+        # Preallocated landmark buffers, reused every frame instead of rebuilding Python lists
+        self.lmArray = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)     # normalized x, y, z, visibility
+        self.lmPixels = np.zeros((NUM_LANDMARKS, 2), dtype=np.float32)    # pixel x, y
+        self.lmPixelsInt = np.zeros((NUM_LANDMARKS, 3), dtype=np.int32)   # id, pixel x, pixel y (lmList layout)
+        self.lmPixelsInt[:, 0] = np.arange(NUM_LANDMARKS)
+        self._pixelScale = np.ones(2, dtype=np.float32)
+        self._lmResults = None  # Results object the landmark buffers were last filled from
+        self.lmValid = False
+        self.lmList = []
+        
+        # Batched joint-angle engine (see joint_angles.py for the joint table)
+        self.angleEngine = JointAngleEngine(joints) if joints is not None else DEFAULT_ENGINE
+        
+        # Reusable canvases and cached chrome for the breathing guide band
+        self.overlay = OverlayCompositor()
         
         # Define breathing patterns for different yoga poses
         self.breathing_patterns = {
@@ -50,10 +109,12 @@ class PoseDetector:
         self.is_inhaling = True   # Start with inhale
         self.prev_is_inhaling = True  # Track previous state for audio cue triggering
         
-        # Initialize audio cues
+        # Initialize audio cues (disabled for headless/server-side detectors)
         self.audio_initialized = False
+        if not enable_audio:
+            return
         try:
-            pygame.mixer.init()
+            _import_pygame().mixer.init()
             # Fix the path to correctly point to the static/audio directory
             audio_dir = os.path.join(os.path.dirname(__file__), 'static', 'audio')
             self.inhale_sound = os.path.join(audio_dir, 'inhale.mp3')
@@ -96,45 +157,113 @@ class PoseDetector:
             return True
         return False
 
-    def findPose(self, img, draw=True):
+    def findPose(self, img, draw=True, inplace=False):
         """
         Find and draw pose landmarks on the image
         Returns the image with pose landmarks drawn if draw=True
+        With inplace=True the landmarks are drawn straight into img (for callers
+        that own the frame) instead of into a copy
         """
         if img is None or img.size == 0:
             print("Warning: Empty image passed to findPose")
             return None
         
+        self.frameBytesCopied = 0
+        
         # Ensure contiguous memory layout to prevent OpenCV stride errors
         if not img.flags['C_CONTIGUOUS']:
             img = np.ascontiguousarray(img)
+            self.frameBytesCopied += img.nbytes
         
+        metrics = self.metrics
+        t = time.perf_counter() if metrics is not None else 0.0
         try:
-            # Create a copy to avoid modifying the original
-            imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            # Only the tracked region (downscaled) is converted and sent to MediaPipe
+            src = self.roiTracker.crop(img) if self.roiTracker is not None else img
+            
+            # Convert into a reused RGB buffer (the worker's shared memory when the
+            # pose runs in a PoseWorkerPool) instead of a new array every frame
+            if hasattr(self.pose, 'input_buffer'):
+                rgb = self.pose.input_buffer(src.shape)
+            else:
+                if self._rgbBuffer is None or self._rgbBuffer.shape != src.shape:
+                    self._rgbBuffer = np.empty(src.shape, dtype=np.uint8)
+                rgb = self._rgbBuffer
+            imgRGB = cv2.cvtColor(src, cv2.COLOR_BGR2RGB, dst=rgb)
+            self.frameBytesCopied += imgRGB.nbytes
+            if metrics is not None:
+                t = metrics.lap('color_convert', t)
             self.results = self.pose.process(imgRGB)
             
-            if self.results.pose_landmarks:
-                if draw:
-                    # Create a fresh copy for drawing to prevent stride issues
-                    draw_img = img.copy()
-                    self.mpDraw.draw_landmarks(
-                        draw_img, 
-                        self.results.pose_landmarks,
-                        self.mpPose.POSE_CONNECTIONS,
-                        self.mpDraw.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
-                        self.mpDraw.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-                    )
-                    # Ensure result is contiguous
-                    return np.ascontiguousarray(draw_img)
+            if self.roiTracker is not None:
+                # Landmarks back to full-frame coordinates, then pick the next frame's region
+                self.roiTracker.remap_results(self.results)
+                self.roiTracker.update(self.getLandmarkArray())
+            if metrics is not None:
+                t = metrics.lap('mediapipe', t)
             
-            # Return the original image if no drawing or no landmarks
-            return np.ascontiguousarray(img)
+            if draw and self.results.pose_landmarks:
+                if not inplace:
+                    # Draw on a copy so the caller's frame stays untouched
+                    img = img.copy()
+                    self.frameBytesCopied += img.nbytes
+                self.mpDraw.draw_landmarks(
+                    img, 
+                    self.results.pose_landmarks,
+                    self.mpPose.POSE_CONNECTIONS,
+                    self._landmarkSpec,
+                    self._connectionSpec
+                )
+                if metrics is not None:
+                    metrics.lap('draw_landmarks', t)
+            
+            return img
             
         except Exception as e:
             print(f"Error in findPose: {e}")
             # Return the original image on error
             return img
+        finally:
+            self.totalBytesCopied += self.frameBytesCopied
+
+    def getLandmarkArray(self, img=None):
+        """
+        Return the preallocated (33, 4) float32 array of normalized landmarks
+        (x, y, z, visibility) for the last processed frame, or None if no person
+        was detected. The same array object is reused (and overwritten) every frame.
+        If img is given, self.lmPixels is also updated with pixel coordinates.
+        """
+        results = getattr(self, 'results', None)
+        # Pose worker results carry the landmarks as an array already
+        landmark_array = getattr(results, 'landmark_array', None)
+        if landmark_array is None and (not results or not results.pose_landmarks):
+            self.lmValid = False
+            self._lmResults = None
+            return None
+        
+        # Fill all 33 landmarks in one pass (only once per results object)
+        if self._lmResults is not results:
+            if landmark_array is not None:
+                np.copyto(self.lmArray, landmark_array)
+            else:
+                # Protobuf landmarks expose no buffer, so the 132 field reads stay in Python;
+                # fromiter with a known count at least skips the intermediate list
+                landmarks = results.pose_landmarks.landmark
+                values = (v for lm in landmarks for v in (lm.x, lm.y, lm.z, lm.visibility))
+                np.copyto(self.lmArray, np.fromiter(values, dtype=np.float32, count=self.lmArray.size).reshape(self.lmArray.shape))
+            self._lmResults = results
+            self.lmValid = True
+        
+        if img is not None:
+            h, w = img.shape[:2]
+            self._pixelScale[0] = w
+            self._pixelScale[1] = h
+            # Pixel conversion as a single vectorized multiply into the reused buffer
+            np.multiply(self.lmArray[:, :2], self._pixelScale, out=self.lmPixels)
+            # Truncate like int() did for each landmark
+            self.lmPixelsInt[:, 1:] = self.lmPixels
+        
+        return self.lmArray
 
     def getPosition(self, img, draw=True):
         self.lmList = []
@@ -153,12 +282,11 @@ class PoseDetector:
                 imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 self.results = self.pose.process(imgRGB)
                 
-            if self.results and self.results.pose_landmarks:
-                h, w, c = img.shape
-                for id, lm in enumerate(self.results.pose_landmarks.landmark):
-                    cx, cy = int(lm.x * w), int(lm.y * h)
-                    self.lmList.append([id, cx, cy])
-                    if draw:
+            if self.getLandmarkArray(img) is not None:
+                # Keep the list-of-[id, cx, cy] interface for existing callers
+                self.lmList = self.lmPixelsInt.tolist()
+                if draw:
+                    for id, cx, cy in self.lmList:
                         cv2.circle(img, (cx, cy), 5, (255, 0, 0), cv2.FILLED)
         except Exception as e:
             print(f"Error in getPosition: {e}")
@@ -167,15 +295,15 @@ class PoseDetector:
 
     def findAngle(self, img, p1, p2, p3, draw=True):
         try:
-            # Make sure lmList has enough points and valid indices
-            if len(self.lmList) <= max(p1, p2, p3):
+            # Make sure landmarks were found and the indices are valid
+            if not self.lmValid or max(p1, p2, p3) >= NUM_LANDMARKS:
                 print(f"Warning: Not enough landmarks for points {p1}, {p2}, {p3}")
                 return 0
                 
             # Finding the landmarks
-            x1, y1 = self.lmList[p1][1:]
-            x2, y2 = self.lmList[p2][1:]
-            x3, y3 = self.lmList[p3][1:]
+            x1, y1 = self.lmPixelsInt[p1, 1:].tolist()
+            x2, y2 = self.lmPixelsInt[p2, 1:].tolist()
+            x3, y3 = self.lmPixelsInt[p3, 1:].tolist()
 
             # Calculating the angle between those landmarks
             angle = math.degrees(math.atan2(y3-y2, x3-x2) - 
@@ -206,6 +334,35 @@ class PoseDetector:
             print(f"Error in findAngle: {e}")
             return 0
 
+    def findAngles(self, img=None, draw=False, named=True):
+        """
+        Compute every joint in self.angleEngine for the current frame in one
+        vectorized pass. Returns a named array (e.g. angles['right_arm']), or the
+        plain (J,) array in joint-table order if named=False, or None if no
+        person was detected. Uses the same pixel coordinates as findAngle.
+        """
+        if not self.lmValid:
+            return None
+        
+        try:
+            angles = self.angleEngine.compute(self.lmPixelsInt[:, 1:])
+            
+            if draw and img is not None and img.size > 0:
+                for (name, p1, p2, p3), angle in zip(self.angleEngine.joints, angles.tolist()):
+                    x1, y1 = self.lmPixelsInt[p1, 1:].tolist()
+                    x2, y2 = self.lmPixelsInt[p2, 1:].tolist()
+                    x3, y3 = self.lmPixelsInt[p3, 1:].tolist()
+                    cv2.line(img, (x1, y1), (x2, y2), (255, 255, 255), 2)
+                    cv2.line(img, (x3, y3), (x2, y2), (255, 255, 255), 2)
+                    cv2.putText(img, str(int(angle)), (x2-50, y2+50),
+                                cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 255), 2)
+            
+            return self.angleEngine.named(angles) if named else angles
+            
+        except Exception as e:
+            print(f"Error in findAngles: {e}")
+            return None
+
     def showBreathingGuide(self, img):
         """Display breathing guidance (inhale/exhale) on the image with audio cues"""
         # Check if image is valid
@@ -252,57 +409,52 @@ class PoseDetector:
             # Limit progress to range [0, 1]
             progress = max(0, min(1, progress))
             
-            # Create a new canvas that's larger than the original image to place UI elements outside
-            # Add 120 pixels at the top for breathing guide
-            expanded_h = h + 120
-            expanded_img = np.zeros((expanded_h, w, 3), dtype=np.uint8)
-            
-            # Copy the original image to the bottom portion of the expanded image
-            expanded_img[120:expanded_h, 0:w] = img
-            
-            # Create background for breathing guide in the new top area
-            cv2.rectangle(expanded_img, (0, 0), (w, 120), (240, 240, 240), -1)
-            
-            # Position of breathing indicator in the top area
+            # Position of breathing indicator in the 120 pixel band above the image
             box_width = 300
             box_height = 80
             box_x = (w - box_width) // 2
             box_y = 20
             
-            # Draw background box with rounded corners
-            cv2.rectangle(expanded_img, (box_x, box_y), (box_x + box_width, box_y + box_height), (255, 255, 255), -1)
-            cv2.rectangle(expanded_img, (box_x, box_y), (box_x + box_width, box_y + box_height), (200, 200, 200), 1)
-            
             # Text to display
             text = "INHALE" if self.is_inhaling else "EXHALE"
             text_color = (0, 128, 0) if self.is_inhaling else (128, 0, 0)  # Darker Green/Red for better contrast
+            bar_height = 10
+            bar_y = box_y + box_height + 5
             
-            # Draw text centered in box
-            text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.5, 2)[0]
-            text_x = box_x + (box_width - text_size[0]) // 2
-            text_y = box_y + 50
-            cv2.putText(expanded_img, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1.5, text_color, 2)
+            def draw_chrome(band_img):
+                # Background, box, phase text and pose name only change with the phase or pose
+                cv2.rectangle(band_img, (0, 0), (w, 120), (240, 240, 240), -1)
+                cv2.rectangle(band_img, (box_x, box_y), (box_x + box_width, box_y + box_height), (255, 255, 255), -1)
+                cv2.rectangle(band_img, (box_x, box_y), (box_x + box_width, box_y + box_height), (200, 200, 200), 1)
+                
+                # Draw text centered in box
+                text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.5, 2)[0]
+                text_x = box_x + (box_width - text_size[0]) // 2
+                text_y = box_y + 50
+                cv2.putText(band_img, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1.5, text_color, 2)
+                
+                # Add current pose name
+                pose_text = f"Pose: {self.pose_name.capitalize()}"
+                pose_text_size = cv2.getTextSize(pose_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 1)[0]
+                pose_text_x = box_x + (box_width - pose_text_size[0]) // 2
+                pose_text_y = box_y + 20
+                cv2.putText(band_img, pose_text, (pose_text_x, pose_text_y), 
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 1)
+                
+                # Background of bar (light gray)
+                cv2.rectangle(band_img, (w//4, bar_y), (3*w//4, bar_y + bar_height), 
+                            (220, 220, 220), -1)
             
-            # Add current pose name
-            pose_text = f"Pose: {self.pose_name.capitalize()}"
-            pose_text_size = cv2.getTextSize(pose_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 1)[0]
-            pose_text_x = box_x + (box_width - pose_text_size[0]) // 2
-            pose_text_y = box_y + 20
-            cv2.putText(expanded_img, pose_text, (pose_text_x, pose_text_y), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 1)
+            # Reuse the canvas and cached chrome; only the progress bar is drawn per frame
+            expanded_img, band_img = self.overlay.compose(
+                img, 120, ('breathing', self.pose_name, text), draw_chrome, position='top')
             
-            # Progress bar with smoother look
-            bar_height = 10
-            bar_y = box_y + box_height + 5
-            # Background of bar (light gray)
-            cv2.rectangle(expanded_img, (w//4, bar_y), (3*w//4, bar_y + bar_height), 
-                        (220, 220, 220), -1)
             # Filled portion of bar
-            cv2.rectangle(expanded_img, (w//4, bar_y), 
+            cv2.rectangle(band_img, (w//4, bar_y), 
                         (int(w//4 + progress * (w//2)), bar_y + bar_height), 
                         text_color, -1)
             
-            return np.ascontiguousarray(expanded_img)
+            return expanded_img
             
         except Exception as e:
             print(f"Error in showBreathingGuide: {e}")
@@ -321,35 +473,14 @@ class PoseDetector:
         }
         
         # If we don't have landmarks or results is None, return all as not visible
-        if not hasattr(self, 'results') or not self.results.pose_landmarks:
+        lmArray = self.getLandmarkArray()
+        if lmArray is None:
             return visibility
-            
-        h, w, c = img.shape
-        landmarks = self.results.pose_landmarks.landmark
-        
-        # Check right arm visibility (landmarks 12, 14, 16)
-        if (landmarks[12].visibility > 0.7 and 
-            landmarks[14].visibility > 0.7 and 
-            landmarks[16].visibility > 0.7):
-            visibility['right_arm'] = True
-        
-        # Check left arm visibility (landmarks 11, 13, 15)
-        if (landmarks[11].visibility > 0.7 and 
-            landmarks[13].visibility > 0.7 and 
-            landmarks[15].visibility > 0.7):
-            visibility['left_arm'] = True
-        
-        # Check right leg visibility (landmarks 24, 26, 28)
-        if (landmarks[24].visibility > 0.7 and 
-            landmarks[26].visibility > 0.7 and 
-            landmarks[28].visibility > 0.7):
-            visibility['right_leg'] = True
         
-        # Check left leg visibility (landmarks 23, 25, 27)
-        if (landmarks[23].visibility > 0.7 and 
-            landmarks[25].visibility > 0.7 and 
-            landmarks[27].visibility > 0.7):
-            visibility['left_leg'] = True
+        # A part is visible when all three of its landmarks have visibility > 0.7
+        visible = np.all(lmArray[_VISIBILITY_INDEX, 3] > 0.7, axis=1)
+        for part, is_visible in zip(VISIBILITY_PARTS, visible.tolist()):
+            visibility[part] = is_visible
             
         return visibility
     
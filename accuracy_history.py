@@ -0,0 +1,122 @@
+import io
+import threading
+
+import numpy as np
+
+from session_stats import RollingStats
+
+
+class AccuracyHistory:
+    """
+    Fixed-capacity ring buffer of (body part, accuracy) samples with rolling
+    per-part aggregates, replacing the ever-growing accuracy_data lists.
+
+    Once full, the oldest samples are overwritten. Per-part sums and counts
+    are updated incrementally so window means cost O(1), and per-part
+    RollingStats keep session-wide summaries; charts are rendered on demand
+    and cached until a new sample arrives.
+    """
+    def __init__(self, labels, capacity=1024):
+        self.labels = list(labels)
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        self.capacity = capacity
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._parts = np.zeros(capacity, dtype=np.int16)
+        self._sums = np.zeros(len(self.labels), dtype=np.float64)
+        self._counts = np.zeros(len(self.labels), dtype=np.int64)
+        self._next = 0          # Total samples ever appended
+        self.session_stats = {label: RollingStats() for label in self.labels}
+        self.version = 0        # Bumped on every change, used as the chart cache key
+        self._lock = threading.Lock()
+        self._charts = {}
+
+    def append(self, label, value):
+        """Record one accuracy sample for a body part label"""
+        part = self._label_index[label]
+        with self._lock:
+            slot = self._next % self.capacity
+            if self._next >= self.capacity:
+                old = self._parts[slot]
+                self._sums[old] -= self._values[slot]
+                self._counts[old] -= 1
+            self._values[slot] = value
+            self._parts[slot] = part
+            self._sums[part] += value
+            self._counts[part] += 1
+            self._next += 1
+            self.session_stats[label].update(value)
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._sums[:] = 0
+            self._counts[:] = 0
+            self._next = 0
+            for stats in self.session_stats.values():
+                stats.reset()
+            self.version += 1
+
+    def __len__(self):
+        return min(self._next, self.capacity)
+
+    def _ordered(self):
+        """(values, parts) oldest first; caller holds the lock"""
+        n = min(self._next, self.capacity)
+        if self._next <= self.capacity:
+            return self._values[:n].copy(), self._parts[:n].copy()
+        start = self._next % self.capacity
+        return np.roll(self._values, -start), np.roll(self._parts, -start)
+
+    def values(self):
+        """Accuracy values in the window, oldest first"""
+        with self._lock:
+            return self._ordered()[0].tolist()
+
+    def poses(self):
+        """Body part label of each value, oldest first"""
+        with self._lock:
+            parts = self._ordered()[1]
+        return [self.labels[p] for p in parts.tolist()]
+
+    def part_means(self):
+        """{label: mean accuracy} over the window, for parts with samples"""
+        with self._lock:
+            sums = self._sums.copy()
+            counts = self._counts.copy()
+        return {label: float(sums[i] / counts[i]) for i, label in enumerate(self.labels) if counts[i] > 0}
+
+    def summary(self):
+        """Session statistics (count, mean, EWMA, min/max, percentiles) per body part with samples"""
+        with self._lock:
+            return {label: stats.summary() for label, stats in self.session_stats.items() if stats.count}
+
+    def chart(self, image_format='png'):
+        """Line chart of the window per body part as image bytes, cached until the history changes"""
+        with self._lock:
+            key = (self.version, image_format)
+            cached = self._charts.get(key)
+            if cached is not None:
+                return cached
+            values, parts = self._ordered()
+
+        # Figure (not pyplot) keeps rendering thread-safe and off any GUI backend
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(8, 4))
+        ax = fig.add_subplot()
+        sample = np.arange(1, len(values) + 1)
+        for i, label in enumerate(self.labels):
+            mask = parts == i
+            if mask.any():
+                ax.plot(sample[mask], values[mask], label=label)
+        ax.set_xlabel('Sample')
+        ax.set_ylabel('Accuracy (%)')
+        ax.set_ylim(0, 100)
+        if len(values):
+            ax.legend(loc='lower right')
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format, bbox_inches='tight')
+        data = buffer.getvalue()
+
+        self._charts = {key: data}
+        return data
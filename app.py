@@ -16,27 +16,36 @@ try:
 except ImportError:
     print("Warning: Could not apply JAX-NumPy compatibility fix")
 
-from flask import Flask, render_template, Response, request, jsonify, send_from_directory
+# Optionally run MediaPipe in worker processes (NYRA_POSE_WORKERS=<count>) so
+# concurrent sessions use several cores; each detector gets a pinned worker stream.
+# The workers are forked here, before any import below starts a thread (the
+# progress store flusher, the audio file setup), so no lock is held at fork time
+from pose_workers import PoseWorkerPool
+pose_worker_count = int(os.environ.get('NYRA_POSE_WORKERS', '0') or 0)
+pose_workers = PoseWorkerPool(num_workers=pose_worker_count).start() if pose_worker_count > 0 else None
+
+from flask import Flask, render_template, Response, request, jsonify, send_from_directory, session
 import numpy as np
 import cv2
 import time 
-import PoseModule as pm
-import matplotlib.pyplot as plt
 import threading
 import json
-import pygame
-from websocket_handler import start_websocket_server, broadcast_pose_status
+import uuid
+from websocket_handler import start_websocket_server, broadcast_pose_status_threadsafe, broadcast_stats, register_stream_source
+from camera_stream import CameraStream
+from stream_broadcaster import FrameBroadcaster
+from pose_reference import PoseReferenceTable, PART_NAMES, PART_LABELS
+from progress_store import get_progress_store
+from overlay import OverlayCompositor
+from session_manager import SessionManager, SessionLimitError
+from landmark_stream import encode_frame_result
+from model_registry import ModelRegistry, loading_stream
+from pipeline_metrics import PipelineMetrics
+from session_stats import window_means
 
 # Import CORS to handle cross-origin requests during development
 from flask_cors import CORS
 
-# Initialize audio system
-try:
-    pygame.mixer.init()
-    print("Audio system initialized successfully")
-except Exception as e:
-    print(f"Audio initialization warning: {str(e)}")
-
 # Ensure audio directory exists
 audio_dir = os.path.join(os.path.dirname(__file__), 'static', 'audio')
 if not os.path.exists(audio_dir):
@@ -75,24 +84,54 @@ app = Flask(__name__,
 # Enable CORS for development
 CORS(app)
 
-# Global variable to store accuracy data
-accuracy_data = {
-    'poses': [],
-    'values': []
-}
+# Signs the session cookie that identifies each client's PoseSession
+app.secret_key = os.environ.get('NYRA_SECRET_KEY', 'yoga_app_secret_key')
 
-# Global variables for pose tracking
-current_pose = 'vrksana'  # Default to vrksana
-pose_hold_start_time = None
-pose_correct_duration = 0
-pose_completed = False
+# Pose tracking state (current pose, hold timer, accuracy data, detector) is kept
+# per client in session_manager below
 correct_pose_threshold = 0.85  # 85% accuracy for pose to be considered correct
 
-# Initialize webcam capture
-cap = cv2.VideoCapture(0)
+def load_camera():
+    """Open the webcam and drain it on a background thread so inference stalls never back up the driver queue"""
+    cap = cv2.VideoCapture(0)
+    # Check if the webcam is opened correctly
+    if not cap.isOpened():
+        print("Warning: Cannot open webcam! The application might not function correctly.")
+    return CameraStream(cap)
+
+def load_pose_module():
+    """Import MediaPipe and build one detector so its graph is loaded before the first stream"""
+    import PoseModule as pm
+    pm.PoseDetector(enable_audio=False).pose.close()
+    return pm
+
+def load_audio():
+    import pygame
+    pygame.mixer.init()
+    print("Audio system initialized successfully")
+    return pygame
+
+# Webcam, MediaPipe and audio load in parallel background threads so the server
+# binds immediately; /health reports when they are ready
+model_registry = ModelRegistry()
+model_registry.register('camera', load_camera)
+model_registry.register('pose', load_pose_module)
+model_registry.register('audio', load_audio)
 
-# Initialize the PoseDetector with default pose
-detector = pm.PoseDetector(pose_name='vrksana')
+# Components a video stream needs; until they are loaded it shows a placeholder
+STREAM_COMPONENTS = ('camera', 'pose')
+
+def get_camera():
+    return model_registry.get('camera')
+
+# Rolling per-stage latencies of the MJPEG and landmark frame pipelines (served on /api/metrics)
+pipeline_metrics = {
+    'mjpeg': PipelineMetrics(),
+    'landmarks': PipelineMetrics(),
+}
+
+# Shared in-memory progress (creates pose_progress.json if missing, flushes it in the background)
+progress_store = get_progress_store()
 
 # Import yoga pose angle data
 try:
@@ -124,171 +163,111 @@ pose_completion_times = {
     'ardhamatsyendrasana': 45  # Half lord of the fishes
 }
 
-# Check if the webcam is opened correctly
-if not cap.isOpened():
-    print("Warning: Cannot open webcam! The application might not function correctly.")
-
 def make_1080p():
-    cap.set(3, 1920)
-    cap.set(4, 1080)
+    get_camera().set(3, 1920)
+    get_camera().set(4, 1080)
 
 def make_720p():
-    cap.set(3, 1280)
-    cap.set(4, 720)
+    get_camera().set(3, 1280)
+    get_camera().set(4, 720)
 
 def make_480p():
-    cap.set(3, 640)
-    cap.set(4, 480)
+    get_camera().set(3, 640)
+    get_camera().set(4, 480)
 
 def change_res(width, height):
-    cap.set(3, width)
-    cap.set(4, height)
+    get_camera().set(3, width)
+    get_camera().set(4, height)
+
+# Reference angles compiled once into a (num_poses, 4) matrix indexed by pose id
+reference_table = PoseReferenceTable(dataList)
 
 def get_pose_index(pose_name):
     """Get the index of the pose in dataList based on the pose name"""
-    pose_indices = {
-        'vrksana': 1,
-        'balasana': 2, 
-        'trikonasana': 3,
-        'virabhadrasana': 4,
-        'adhomukha': 5,
-        'tadasan': 0  # Default
-    }
-    return pose_indices.get(pose_name, 0)  # Default to tadasan (0) if pose not found
-
-def compare_right_arm(right_arm):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-    
-    if right_arm <= pose_data[0]:
-        acc = (right_arm / pose_data[0]) * 100
-    else:
-        acc = 0
-        
-    if abs(pose_data[0] - right_arm) <= 10:
-        print("Your right arm is accurate")
-    else:
-        print("Your right arm is not accurate")
-
-    return acc
-
-def compare_left_arm(left_arm):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-    
-    if left_arm <= pose_data[1]:
-        acc = (left_arm / pose_data[1]) * 100
-    else:
-        acc = 0
-        
-    if abs(pose_data[1] - left_arm) <= 10:    
-        print("Your left arm is accurate")  
-    else:
-        print("Your left arm is not accurate, try again")
-    
-    return acc
-    
-def compare_right_leg(right_leg):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
+    return reference_table.pose_index(pose_name)  # Defaults to tadasan if pose not found
 
-    if right_leg <= pose_data[2]:
-        acc = (right_leg / pose_data[2]) * 100
-    else:
-        acc = 0
-
-    if abs(pose_data[2] - right_leg) <= 10:
-        print("Your right leg is accurate")
-    else:
-        print("Your right leg is not accurate, try again") 
-
-    return acc
-       
-def compare_left_leg(left_leg):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-    
-    if left_leg <= pose_data[3]:
-        acc = (left_leg / pose_data[3]) * 100
-    else:
-        acc = 0
-
-    if abs(pose_data[3] - left_leg) <= 10 and left_leg < pose_data[3]:
-       print("Your left leg is accurate") 
-    else:
-        print("Your left leg is not accurate, try again") 
-    
-    return acc
+def score_pose(pose_name, part_angles):
+    """
+    Score all four body parts against a pose in one vectorized call.
+    Returns (accuracies, within_tolerance) arrays in PART_NAMES order.
+    """
+    return reference_table.score(pose_name, part_angles)
 
 arr = np.array([])
     
-def generate_frames(arr):
-    global accuracy_data, pose_hold_start_time, pose_correct_duration, pose_completed
+def generate_frames(pose_session, arr=arr, output='mjpeg', detector=None):
+    """
+    Frame generator for one PoseSession; all tracking state lives on the session.
+    output='mjpeg' yields annotated JPEG multipart chunks and tracks the hold
+    timer, accuracy history and progress; output='landmarks' yields compact
+    binary results (see landmark_stream.py) without drawing, JPEG-encoding or
+    touching the session's tracking state.
+    """
     count = 0
+    frame_count = 0  # Frames processed, in both output modes
     timeout = 20
     timeout_start = time.time()
-    
-    while time.time() < timeout_start + timeout:
-        while True:
-            ## read the camera frame
-            success, frame = cap.read()
-            if not success:
+    render = output == 'mjpeg'
+    # Hold timer, progress and status broadcasts belong to the session's MJPEG pipeline
+    track_progress = render
+    if detector is None:
+        detector = pose_session.get_detector()
+    accuracy_history = pose_session.accuracy_history
+    camera = get_camera()
+    metrics = pipeline_metrics[output]
+    last_seq = 0
+    frame_buffer = None  # Frame owned by this generator: filled, mirrored and drawn on in place
+    # Reusable canvases for the completion / progress bands; per generator because
+    # the returned canvas is reused on the next call
+    overlay = OverlayCompositor() if render else None
+    
+    while time.time() < timeout_start + timeout and not pose_session.closed:
+        while not pose_session.closed:
+            ## read the newest camera frame (older buffered frames are dropped);
+            ## every session keeps its own position in the shared ring buffer
+            t = time.perf_counter()
+            seq, frame_buffer = camera.read_latest(last_seq, out=frame_buffer)
+            if frame_buffer is None:
                 break
+            last_seq = seq
+            frame_count += 1
+            t = metrics.lap('capture', t)
                 
-            frame = cv2.flip(frame, 1)
-      
-            # resize the image
-            img = frame.copy()
+            # Mirror in place; the camera copy above is the only full-frame copy
+            frame = cv2.flip(frame_buffer, 1, dst=frame_buffer)
+            t = metrics.lap('flip', t)
              
             # Use our PoseDetector - draw landmarks but don't show breathing guide inside camera view
-            frame = detector.findPose(frame, draw=True)
+            # (it records its color conversion, MediaPipe and drawing stages itself, so the clock
+            # restarts here instead of adding an overlapping find_pose stage)
+            frame = detector.findPose(frame, draw=render, inplace=True)
+            t = time.perf_counter()
             lmlist = detector.getPosition(frame, draw=False)
             
             # Get breathing info for external UI without drawing on camera frame
             breathing_info = detector.getBreathingInfo()
+            t = metrics.lap('landmarks', t)
+            
+            angles = part_accuracies = None
+            overall_accuracy = 0.0
             
             # Check if we have a person in frame
             if len(lmlist) != 0:
-                # Continue with angle-based measurements - all with draw=False to prevent extra blue lines
-                RightArmAngle = int(detector.findAngle(frame, 12, 14, 16, draw=False))
-                right_arm_accuracy = compare_right_arm(RightArmAngle)
-                if (count <= 16 and right_arm_accuracy != 0):
-                    arr = np.append(arr, right_arm_accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Right Arm')
-                    accuracy_data['values'].append(right_arm_accuracy)
-
-                # Left arm - set draw=False
-                LeftArmAngle = int(detector.findAngle(frame, 11, 13, 15, draw=False))
-                left_arm_accuracy = compare_left_arm(LeftArmAngle)
-                if (count <= 16 and left_arm_accuracy != 0):
-                    arr = np.append(arr, left_arm_accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Left Arm')
-                    accuracy_data['values'].append(left_arm_accuracy)
+                # Compute all joint angles for this frame in one vectorized pass (no drawing)
+                angles = detector.findAngles(named=False)
+                t = metrics.lap('angles', t)
                 
-                # Right leg - set draw=False
-                RightLegAngle = int(detector.findAngle(frame, 24, 26, 28, draw=False))
-                right_leg_accuracy = compare_right_leg(RightLegAngle)
-                if (count <= 16 and right_leg_accuracy != 0):
-                    arr = np.append(arr, right_leg_accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Right Leg')
-                    accuracy_data['values'].append(right_leg_accuracy)
-               
-                # Left leg - set draw=False
-                LeftLegAngle = int(detector.findAngle(frame, 23, 25, 27, draw=False))
-                left_leg_accuracy = compare_left_leg(LeftLegAngle)
-                if (count <= 16 and left_leg_accuracy != 0):
-                    arr = np.append(arr, left_leg_accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Left Leg')
-                    accuracy_data['values'].append(left_leg_accuracy)
-                elif(count > 16):
+                # Score right arm, left arm, right leg and left leg against the current pose at once
+                # (angles are truncated to whole degrees as before)
+                part_accuracies, _ = score_pose(pose_session.current_pose, np.trunc(angles[:len(PART_NAMES)]))
+                right_arm_accuracy, left_arm_accuracy, right_leg_accuracy, left_leg_accuracy = part_accuracies.tolist()
+                
+                for label, accuracy in zip(PART_LABELS, part_accuracies.tolist()):
+                    if (track_progress and count <= 16 and accuracy != 0):
+                        arr = np.append(arr, accuracy)
+                        count = count + 1
+                        accuracy_history.append(label, accuracy)
+                if (count > 16):
                     print("entering")
                     print("accuracy: ", accuracyCalculation(arr))
                 
@@ -304,175 +283,190 @@ def generate_frames(arr):
                     is_correct_pose = overall_accuracy >= 70  # Lowered threshold for TensorFlow model
                     
                     # Debug output to help diagnose issues
-                    if count % 30 == 0:  # Print only occasionally to avoid spamming the console
+                    if frame_count % 30 == 0:  # Print only occasionally to avoid spamming the console
                         print(f"Accuracy: {overall_accuracy:.1f}%, Is correct: {is_correct_pose}")
                     
-                    # Track pose hold time
-                    current_time = time.time()
-                    if is_correct_pose:
-                        # First time in correct pose
-                        if pose_hold_start_time is None:
-                            pose_hold_start_time = current_time
-                            print(f"Starting timer for correct pose: {current_pose}")
+                    # Track pose hold time (only in the MJPEG pipeline, so a session with both
+                    # streams open counts attempts and completions once)
+                    if track_progress:
+                        current_time = time.time()
+                        if is_correct_pose:
+                            # First time in correct pose
+                            if pose_session.pose_hold_start_time is None:
+                                pose_session.pose_hold_start_time = current_time
+                                print(f"Starting timer for correct pose: {pose_session.current_pose}")
                             
-                            # Increment the attempts counter when starting a new pose attempt
-                            try:
-                                progress_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_progress.json')
-                                if os.path.exists(progress_data_file):
-                                    with open(progress_data_file, 'r') as f:
-                                        progress_data = json.load(f)
-                                    
-                                    if current_pose in progress_data:
-                                        progress_data[current_pose]['attempts'] += 1
-                                        progress_data[current_pose]['last_practiced'] = time.strftime("%Y-%m-%d %H:%M:%S")
-                                        
-                                        with open(progress_data_file, 'w') as f:
-                                            json.dump(progress_data, f, indent=4)
-                                        print(f"Incremented attempts for {current_pose}")
-                            except Exception as e:
-                                print(f"Error updating attempts count: {str(e)}")
+                                # Increment the attempts counter when starting a new pose attempt
+                                # (merged in memory; the progress store writes it to disk in the background)
+                                if progress_store.update(pose_session.current_pose, attempts=1) is not None:
+                                    print(f"Incremented attempts for {pose_session.current_pose}")
                         
-                        # Calculate how long they've held the correct pose
-                        pose_correct_duration = current_time - pose_hold_start_time
+                            # Calculate how long they've held the correct pose
+                            pose_session.pose_correct_duration = current_time - pose_session.pose_hold_start_time
                         
-                        # Check if pose has been held long enough to be completed
-                        required_time = pose_completion_times.get(current_pose, 30)  # Default 30s
-                        if pose_correct_duration >= required_time and not pose_completed:
-                            pose_completed = True
+                            # Check if pose has been held long enough to be completed
+                            required_time = pose_completion_times.get(pose_session.current_pose, 30)  # Default 30s
+                            if pose_session.pose_correct_duration >= required_time and not pose_session.pose_completed:
+                                pose_session.pose_completed = True
                             
-                            # Update progress data with calculated accuracy values
-                            try:
-                                # Load current progress data
-                                progress_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_progress.json')
-                                if os.path.exists(progress_data_file):
-                                    with open(progress_data_file, 'r') as f:
-                                        progress_data = json.load(f)
-                                        
-                                    # Update completion count
-                                    if current_pose in progress_data:
-                                        progress_data[current_pose]['completions'] += 1
-                                        
-                                        # Update practice time
-                                        progress_data[current_pose]['total_practice_time'] += pose_correct_duration
-                                        
-                                        # Update best accuracy if this attempt was better
-                                        if overall_accuracy > progress_data[current_pose]['best_accuracy']:
-                                            progress_data[current_pose]['best_accuracy'] = overall_accuracy
-                                        
-                                        # Update last practiced time
-                                        progress_data[current_pose]['last_practiced'] = time.strftime("%Y-%m-%d %H:%M:%S")
-                                        
-                                        # Save the updated progress data
-                                        with open(progress_data_file, 'w') as f:
-                                            json.dump(progress_data, f, indent=4)
-                                            
-                                        print(f"Updated progress for {current_pose}: completions={progress_data[current_pose]['completions']}")
-                            except Exception as e:
-                                print(f"Error updating progress data: {str(e)}")
+                                # Update progress data with calculated accuracy values
+                                entry = progress_store.update(
+                                    pose_session.current_pose,
+                                    completions=1,
+                                    practice_time=pose_session.pose_correct_duration,
+                                    best_accuracy=overall_accuracy
+                                )
+                                if entry is not None:
+                                    print(f"Updated progress for {pose_session.current_pose}: completions={entry['completions']}")
                             
-                            broadcast_pose_status(is_correct_pose, pose_completed)
-                            print(f"Pose completed! Held for {pose_correct_duration:.1f} seconds")
-                    else:
-                        # Reset hold timer if pose is incorrect (with longer grace period for TensorFlow model)
-                        if pose_hold_start_time is not None and (current_time - pose_hold_start_time) > 2.0:  # Extended grace period
-                            pose_hold_start_time = None
-                            pose_correct_duration = 0
-                            print("Pose incorrect - resetting timer")
+                                # Runs on the WebSocket server's loop; this generator is not a coroutine
+                                broadcast_pose_status_threadsafe(is_correct_pose, pose_session.pose_completed)
+                                print(f"Pose completed! Held for {pose_session.pose_correct_duration:.1f} seconds")
+                        else:
+                            # Reset hold timer if pose is incorrect (with longer grace period for TensorFlow model)
+                            if pose_session.pose_hold_start_time is not None and (current_time - pose_session.pose_hold_start_time) > 2.0:  # Extended grace period
+                                pose_session.pose_hold_start_time = None
+                                pose_session.pose_correct_duration = 0
+                                print("Pose incorrect - resetting timer")
+                    
+                    t = metrics.lap('scoring', t)
                     
                     # Add visual feedback for pose status - don't add breathing UI here
-                    h, w, c = frame.shape
+                    # (landmark clients draw their own UI)
+                    if render:
+                        h, w, c = frame.shape
                     
-                    # Add overlay showing completion status when pose is completed
-                    if pose_completed:
-                        # Create expanded image with 100 pixels at the bottom for completion notification
-                        expanded_h = h + 100
-                        expanded_img = np.zeros((expanded_h, w, 3), dtype=np.uint8)
-                        
-                        # Copy the original image to the top portion of the expanded image
-                        expanded_img[0:h, 0:w] = frame
-                        
-                        # Create bottom area with semi-transparent green background
-                        cv2.rectangle(expanded_img, (0, h), (w, expanded_h), (0, 200, 0), -1)
-                        
-                        # Add text
-                        font = cv2.FONT_HERSHEY_DUPLEX
-                        text = "Pose Completed!"
-                        text_size = cv2.getTextSize(text, font, 1.5, 2)[0]
-                        text_x = (w - text_size[0]) // 2
-                        text_y = h + 60
-                        cv2.putText(expanded_img, text, (text_x, text_y), font, 1.5, (255, 255, 255), 2)
-                        
-                        frame = expanded_img
+                        # Add overlay showing completion status when pose is completed
+                        if pose_session.pose_completed:
+                            # Completion band (static, rendered once and cached) below the image
+                            frame = overlay.completion_banner(frame)
                     
-                    # Add progress indicator if not completed yet but pose is correct  
-                    # This is the part that shows the hold pose prompt
-                    elif pose_correct_duration > 0:
-                        # Calculate required time to complete pose
-                        required_time = pose_completion_times.get(current_pose, 30)  # Default 30s
-                        
-                        # Calculate progress as a percentage
-                        progress = (pose_correct_duration / required_time) * 100
-                        progress = min(100, max(0, progress))  # Limit to 0-100%
-                        
-                        # Create expanded image with 60 pixels at the bottom for progress bar
-                        expanded_h = h + 60
-                        expanded_img = np.zeros((expanded_h, w, 3), dtype=np.uint8)
-                        
-                        # Copy the original image to the top portion of the expanded image
-                        expanded_img[0:h, 0:w] = frame
-                        
-                        # Create bottom area with dark background
-                        cv2.rectangle(expanded_img, (0, h), (w, expanded_h), (50, 50, 50), -1)
+                        # Add progress indicator if not completed yet but pose is correct  
+                        # This is the part that shows the hold pose prompt
+                        elif pose_session.pose_correct_duration > 0:
+                            # Calculate required time to complete pose
+                            required_time = pose_completion_times.get(pose_session.current_pose, 30)  # Default 30s
                         
-                        # Background of bar
-                        bar_height = 20
-                        bar_y = h + 20
-                        bar_width = int(w * 0.8)
-                        bar_x = (w - bar_width) // 2
-                        cv2.rectangle(expanded_img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (200, 200, 200), -1)
+                            # Calculate progress as a percentage
+                            progress = (pose_session.pose_correct_duration / required_time) * 100
+                            progress = min(100, max(0, progress))  # Limit to 0-100%
                         
-                        # Filled portion
-                        filled_width = int(bar_width * (progress / 100))
-                        cv2.rectangle(expanded_img, (bar_x, bar_y), (bar_x + filled_width, bar_y + bar_height), (0, 255, 0), -1)
-                        
-                        # Text showing percentage and time remaining
-                        text = f"{int(progress)}% - Hold for {int(required_time-pose_correct_duration)}s more"
-                        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 1)[0]
-                        text_x = (w - text_size[0]) // 2
-                        text_y = h + 15
-                        cv2.putText(expanded_img, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1, cv2.LINE_AA, False)
-                        
-                        frame = expanded_img
+                            # Text showing percentage and time remaining
+                            text = f"{int(progress)}% - Hold for {int(required_time-pose_session.pose_correct_duration)}s more"
+                            frame = overlay.progress_banner(frame, progress, text)
                     
-                    # Add a small indicator in the corner even when not holding a correct pose
-                    else:
-                        # Add a small text indicator in the corner
-                        cv2.putText(frame, "Adjust pose to match", (10, h-20), cv2.FONT_HERSHEY_SIMPLEX, 
-                                   0.6, (0, 0, 255), 1, cv2.LINE_AA)
+                        # Add a small indicator in the corner even when not holding a correct pose
+                        else:
+                            # Add a small text indicator in the corner
+                            cv2.putText(frame, "Adjust pose to match", (10, h-20), cv2.FONT_HERSHEY_SIMPLEX, 
+                                       0.6, (0, 0, 255), 1, cv2.LINE_AA)
+                        t = metrics.lap('overlay', t)
+                
+            if not render:
+                # ~300 byte binary result instead of a JPEG frame
+                packet = encode_frame_result(
+                    seq,
+                    detector.getLandmarkArray() if angles is not None else None,
+                    angles[:len(PART_NAMES)] if angles is not None else None,
+                    part_accuracies,
+                    overall_accuracy,
+                    breathing_info
+                )
+                t = metrics.lap('packet_encode', t)
+                yield packet
+            else:
+                cv2.waitKey(1)
+                ret, buffer = cv2.imencode('.jpg', frame)
+                frame = buffer.tobytes()
+                t = metrics.lap('jpeg_encode', t)
                 
-            cv2.waitKey(1)
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
+                yield(b'--frame\r\n'
+                      b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            # Time the consumer (broadcaster publish) held the frame
+            metrics.lap('yield', t)
+            metrics.frame_done()
+
+def attach_broadcaster(pose_session):
+    """One detection pipeline per session, shared by all of that client's /video and /api/video viewers"""
+    pose_session.broadcaster = FrameBroadcaster(
+        lambda: mjpeg_frames(pose_session), name=f"VideoBroadcaster-{pose_session.session_id[:8]}")
+    # Landmark-only stream for clients that render the skeleton themselves. It runs
+    # with its own detector so it can be used alongside the MJPEG stream, and
+    # leaves the hold timer and progress updates to the MJPEG pipeline
+    pose_session.landmark_broadcaster = FrameBroadcaster(
+        lambda: landmark_frames(pose_session),
+        name=f"LandmarkBroadcaster-{pose_session.session_id[:8]}"
+    )
+
+def mjpeg_frames(pose_session):
+    """generate_frames() with the session's detector, closed here if the session is closed meanwhile"""
+    detector = pose_session.acquire_detector()
+    if detector is None:
+        return
+    try:
+        yield from generate_frames(pose_session, detector=detector)
+    finally:
+        pose_session.release_detector()
+
+def landmark_frames(pose_session):
+    """Landmark-only generate_frames() with its own detector, released when the stream stops"""
+    detector = create_detector(pose_session.current_pose, enable_audio=False, metrics=pipeline_metrics['landmarks'])
+    try:
+        yield from generate_frames(pose_session, output='landmarks', detector=detector)
+    finally:
+        detector.pose.close()
+
+# Start loading models (the pose workers were forked at the top of this module)
+model_registry.warm_up()
+
+# Crop MediaPipe's input to the tracked person (opt-in with NYRA_ROI_TRACKING=1). Off by
+# default: in video mode MediaPipe's own tracking and landmark smoothing work in input
+# coordinates, so each crop move mixes two coordinate frames and the landmarks jump
+roi_tracking = os.environ.get('NYRA_ROI_TRACKING', '0') == '1'
+
+def create_detector(pose_name, **kwargs):
+    pm = model_registry.get('pose')
+    backend = pose_workers.stream() if pose_workers is not None else None
+    kwargs.setdefault('metrics', pipeline_metrics['mjpeg'])
+    return pm.PoseDetector(pose_name=pose_name, pose_backend=backend, roi_tracking=roi_tracking, **kwargs)
+
+# Per-client pose tracking: each session gets its own detector, timers and accuracy history
+session_manager = SessionManager(
+    create_detector,
+    max_sessions=4,
+    idle_timeout=300,
+    on_create=attach_broadcaster
+)
 
-            yield(b'--frame\r\n'
-                  b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            print('Original Array:', arr)
-            x = range(1, len(arr) + 1)
-            y = arr
-            plt.plot(x, y)
+def get_pose_session(pose_name=None):
+    """
+    Return the PoseSession for the current client, identified by the Flask
+    session cookie (or an explicit ?session= id for API clients).
+    """
+    session_id = request.args.get('session') or session.get('pose_session_id')
+    if not session_id:
+        session_id = uuid.uuid4().hex
+    session['pose_session_id'] = session_id
+    return session_manager.get(session_id, pose_name)
+
+def landmark_stream_source(params):
+    """WebSocket /landmarks?session=<id> source: binary per-frame results for that session"""
+    if 'session' not in params:
+        raise ValueError("Missing session id, get one from /api/session")
+    pose_session = session_manager.get(params['session'], params.get('pose'))
+    if 'pose' in params:
+        pose_session.set_pose(params['pose'])
+    return pose_session.landmark_broadcaster.subscribe()
+
+register_stream_source('landmarks', landmark_stream_source)
+
+@app.errorhandler(SessionLimitError)
+def session_limit_reached(e):
+    return jsonify({"error": str(e)}), 503
 
 def accuracyCalculation(arr):
-    accArray = np.array([])
-    sum = 0
-    for j in range(0, len(arr) - 1, 4):
-        sum = 0
-        for i in range(j, min(j + 4, len(arr))):
-            print("arr[i]", arr[i])
-            sum = sum + arr[i]
-        accur = sum / 4
-        accArray = np.append(accArray, accur)
-    
-    return accArray
+    # Mean of each group of four part accuracies (one reshape instead of nested loops)
+    return window_means(arr, 4)
 
 @app.route("/")
 def home():
@@ -568,18 +562,8 @@ def index():
     sanskrit_name = sanskrit_names.get(pose, '')
     english_name = english_names.get(pose, '')
     
-    # Store the selected pose in global variable
-    global current_pose, pose_hold_start_time, pose_correct_duration, pose_completed
-    current_pose = pose
-    
-    # Reset pose tracking when pose changes
-    pose_hold_start_time = None
-    pose_correct_duration = 0
-    pose_completed = False
-    
-    # Also update the detector's pose name
-    global detector
-    detector.setPose(pose)
+    # Store the selected pose in this client's session and reset its pose tracking
+    get_pose_session(pose).set_pose(pose)
     
     return render_template('index.html', 
                           pose_name=pose_name, 
@@ -593,45 +577,17 @@ def index():
 
 @app.route('/charts')
 def charts():
-    # Use the updated accuracy data
-    if len(accuracy_data['values']) == 0:
+    # Use the updated accuracy data for this client
+    accuracy_history = get_pose_session().accuracy_history
+    if len(accuracy_history) == 0:
         # Generate sample data if no real data exists yet
         values = [67, 78, 68, 89, 69, 59, 70, 61, 84, 78]
     else:
-        values = accuracy_data['values']
+        values = accuracy_history.values()
         
     labels = ['Right Arm', 'Left Arm', 'Right Leg', 'Left Leg']
     colors = ['#ff0000','#0000ff','#ffffe0','#008000','#800080','#FFA500', '#FF2554']
     
-    # Initialize progress data tracking if not already present
-    progress_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_progress.json')
-    
-    # Create progress data file if it doesn't exist
-    if not os.path.exists(progress_data_file):
-        poses = [
-            'vrksana', 'adhomukha', 'balasana', 'tadasan', 'trikonasana', 
-            'virabhadrasana', 'bhujangasana', 'setubandhasana', 
-            'uttanasana', 'shavasana', 'ardhamatsyendrasana'
-        ]
-        
-        data = {}
-        for pose in poses:
-            data[pose] = {
-                'attempts': 0,
-                'completions': 0,
-                'total_practice_time': 0,
-                'best_accuracy': 0,
-                'last_practiced': None
-            }
-        
-        # Save initial progress data
-        try:
-            with open(progress_data_file, 'w') as f:
-                json.dump(data, f, indent=4)
-            print("Initial progress data file created")
-        except Exception as e:
-            print(f"Error creating progress data file: {str(e)}")
-    
     return render_template('charts.html', values=values, labels=labels, colors=colors)
 
 @app.route('/video')
@@ -639,16 +595,27 @@ def video():
     # Get the pose parameter from the request
     pose = request.args.get('pose', 'vrksana')
     
-    # Update global detector with the selected pose
-    global detector, pose_hold_start_time, pose_correct_duration, pose_completed
-    detector.setPose(pose)
+    # Update this client's detector with the selected pose and reset pose tracking
+    pose_session = get_pose_session(pose)
+    pose_session.set_pose(pose)
     
-    # Reset pose tracking
-    pose_hold_start_time = None
-    pose_correct_duration = 0
-    pose_completed = False
-    
-    return Response(generate_frames(arr), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(video_stream(pose_session), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+def video_stream(pose_session):
+    """The session's MJPEG stream, preceded by a placeholder while the camera and MediaPipe load"""
+    if model_registry.is_ready(*STREAM_COMPONENTS):
+        return pose_session.broadcaster.subscribe()
+    return loading_stream(model_registry, STREAM_COMPONENTS, pose_session.broadcaster.subscribe)
+
+@app.route('/health')
+def health():
+    """Readiness probe: 200 once the camera and MediaPipe are loaded, 503 while they are loading"""
+    components = model_registry.status()
+    ready = model_registry.is_ready(*STREAM_COMPONENTS)
+    return jsonify({
+        "status": "ready" if ready else "loading",
+        "components": components
+    }), 200 if ready else 503
 
 # API endpoints for React frontend
 @app.route('/api/poses', methods=['GET'])
@@ -845,32 +812,61 @@ def get_pose(pose_id):
 
 @app.route('/api/accuracy', methods=['GET'])
 def get_accuracy():
-    """Return accuracy data for analytics"""
-    if len(accuracy_data['values']) == 0:
+    """Return accuracy data for analytics (?format=png for a rendered chart)"""
+    accuracy_history = get_pose_session().accuracy_history
+    if request.args.get('format') == 'png':
+        # Rendered on request and cached until the next sample arrives
+        try:
+            return Response(accuracy_history.chart('png'), mimetype='image/png')
+        except ImportError:
+            return jsonify({"error": "matplotlib is not installed"}), 501
+    
+    if len(accuracy_history) == 0:
         values = [67, 78, 68, 89, 69, 59, 70, 61, 84, 78]
     else:
-        values = accuracy_data['values']
+        values = accuracy_history.values()
     
     labels = ['Right Arm', 'Left Arm', 'Right Leg', 'Left Leg']
     return jsonify({
         'values': values,
         'labels': labels,
-        'poses': accuracy_data.get('poses', ['Pose 1', 'Pose 2', 'Pose 3', 'Pose 4'])
+        'poses': accuracy_history.poses(),
+        'summary': accuracy_history.summary()
     })
 
 @app.route('/api/video')
 def api_video():
     """API endpoint for video stream"""
     pose = request.args.get('pose', 'vrksana')
-    global detector, pose_hold_start_time, pose_correct_duration, pose_completed
-    detector.setPose(pose)
-    
-    # Reset pose tracking
-    pose_hold_start_time = None
-    pose_correct_duration = 0
-    pose_completed = False
+    pose_session = get_pose_session(pose)
+    pose_session.set_pose(pose)
     
-    return Response(generate_frames(arr), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(video_stream(pose_session), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Per-stage frame pipeline latencies (p50/p95/p99) plus camera, session and worker counters"""
+    camera = model_registry.get_nowait('camera')
+    return jsonify({
+        "pipeline": {name: metrics.snapshot() for name, metrics in pipeline_metrics.items()},
+        "camera": camera.stats() if camera is not None else None,
+        "sessions": session_manager.stats(),
+        "broadcasters": {
+            pose_session.session_id[:8]: {
+                "video": pose_session.broadcaster.stats(),
+                "landmarks": pose_session.landmark_broadcaster.stats()
+            }
+            for pose_session in session_manager.sessions()
+        },
+        "pose_workers": pose_workers.stats() if pose_workers is not None else None,
+        "websocket": broadcast_stats(),
+        "components": model_registry.status()
+    })
+
+@app.route('/api/session')
+def api_session():
+    """Return this client's session id, used to open ws://<host>:8765/landmarks?session=<id>"""
+    return jsonify({"session": get_pose_session().session_id})
 
 # WebSocket route
 @app.route('/ws/pose_feedback')
@@ -18,13 +18,15 @@ except ImportError:
 import cv2
 import numpy as np
 import threading
-import json
 import time
 import os
 import pygame
 from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from HuggingFacePoseClassifier import HuggingFacePoseClassifier
+from camera_stream import CameraStream
+from classification_worker import ClassificationWorker
+from progress_store import get_progress_store, initialize_progress_data as _initialize_progress_data
 
 # Global variables
 accuracy_data = {
@@ -33,10 +35,13 @@ accuracy_data = {
 }
 current_pose = 'vrksana'  # Default pose
 cap = None
+camera = None  # Threaded ring-buffer reader wrapping cap
 hf_classifier = None
+classification_worker = None  # Background classifier thread (see classification_worker.py)
 
-# Progress tracking
-progress_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_progress.json')
+# Progress tracking (shared in-memory store, flushed to pose_progress.json in the background)
+progress_store = get_progress_store()
+progress_data_file = progress_store.path
 
 # Pose completion tracking
 pose_start_time = time.time()
@@ -66,43 +71,12 @@ def inject_camera_fix_css():
     }
 
 def load_progress_data():
-    """Load pose progress data from JSON file"""
-    if os.path.exists(progress_data_file):
-        try:
-            with open(progress_data_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading progress data: {str(e)}")
-            return initialize_progress_data()
-    else:
-        return initialize_progress_data()
+    """Return a copy of the current pose progress data"""
+    return progress_store.snapshot()
             
 def initialize_progress_data():
     """Initialize empty progress data structure"""
-    poses = [
-        'vrksana', 'adhomukha', 'balasana', 'tadasan', 'trikonasana', 
-        'virabhadrasana', 'bhujangasana', 'setubandhasana', 
-        'uttanasana', 'shavasana', 'ardhamatsyendrasana'
-    ]
-    
-    data = {}
-    for pose in poses:
-        data[pose] = {
-            'attempts': 0,
-            'completions': 0,
-            'total_practice_time': 0,
-            'best_accuracy': 0,
-            'last_practiced': None
-        }
-    return data
-        
-def save_progress_data(data):
-    """Save pose progress data to JSON file"""
-    try:
-        with open(progress_data_file, 'w') as f:
-            json.dump(data, f, indent=4)
-    except Exception as e:
-        print(f"Error saving progress data: {str(e)}")
+    return _initialize_progress_data()
             
 def get_pose_completion_time(pose_name):
     """Get the required time to complete a pose in seconds"""
@@ -144,14 +118,15 @@ def get_breathing_pattern(pose_name):
 
 def initialize_hf_model():
     """Initialize the HuggingFace model"""
-    global hf_classifier
+    global hf_classifier, classification_worker
     
     if hf_classifier is None:
         print("Initializing HuggingFace model... (first request only)")
         try:
             # Initialize the model without the unsupported parameter
             hf_classifier = HuggingFacePoseClassifier()
-            print(f"HuggingFace model loaded successfully with {len(hf_classifier.model.config.id2label)} classes")
+            classification_worker = ClassificationWorker(hf_classifier).start()
+            print(f"HuggingFace model loaded successfully with {len(hf_classifier.id2label)} classes")
             print(f"Available classes: {hf_classifier.get_available_classes()}")
             return True
         except Exception as e:
@@ -161,10 +136,13 @@ def initialize_hf_model():
 
 def initialize_webcam():
     """Initialize webcam and return success status"""
-    global cap
+    global cap, camera
     
     # Close existing camera if opened
-    if cap is not None:
+    if camera is not None:
+        camera.release()
+        camera = None
+    elif cap is not None:
         cap.release()
     
     # Try opening the camera
@@ -187,6 +165,9 @@ def initialize_webcam():
         cap.set(3, 640)  # Width
         cap.set(4, 480)  # Height
         
+        # Drain the webcam on a background thread so slow classification never backs up the driver queue
+        camera = CameraStream(cap).start()
+        
         return True
     except Exception as e:
         print(f"Error initializing webcam: {e}")
@@ -279,9 +260,6 @@ def generate_frames():
     global accuracy_data, cap, hf_classifier, current_pose
     global pose_start_time, pose_completed, completion_notification_shown, correct_pose_start_time, correct_pose_duration
     
-    # Initialize progress data
-    progress_data = load_progress_data()
-    
     # Initialize pose completion time for current pose
     pose_completion_time = get_pose_completion_time(current_pose)
     
@@ -314,9 +292,8 @@ def generate_frames():
     # Target pose for HuggingFace (convert from app pose ID)
     target_hf_pose = reverse_pose_map.get(current_pose, "Tree")
     
-    # Set up periodic detection (don't run detection on every frame)
-    last_detection_time = 0
-    detection_interval = 0.5  # seconds
+    # Detection runs on the classification worker; the stream shows the latest result
+    predicted_pose, confidence, is_correct = "unknown", 0.0, False
     
     # Reset pose tracking variables
     pose_start_time = time.time()
@@ -326,10 +303,7 @@ def generate_frames():
     correct_pose_duration = 0
     
     # Update attempts count
-    if current_pose in progress_data:
-        progress_data[current_pose]['attempts'] += 1
-        progress_data[current_pose]['last_practiced'] = time.strftime("%Y-%m-%d %H:%M:%S")
-        save_progress_data(progress_data)
+    progress_store.update(current_pose, attempts=1)
     
     while True:
         # Read the camera frame
@@ -344,7 +318,7 @@ def generate_frames():
                 time.sleep(1)
                 continue
         
-        success, frame = cap.read()
+        success, frame = camera.read()
         if not success:
             yield (b'--frame\r\n'
                   b'Content-Type: image/jpeg\r\n\r\n' + 
@@ -356,13 +330,13 @@ def generate_frames():
         # Flip frame horizontally for more natural interaction
         frame = cv2.flip(frame, 1)
         
-        # Only run detection periodically to improve performance
+        # Offer the frame to the background classifier (it decides when to run based on
+        # latency and motion) and only update the pose state when a new result is ready
         current_time = time.time()
-        if current_time - last_detection_time >= detection_interval:
-            last_detection_time = current_time
-            
-            # Classify pose using HuggingFace
-            predicted_pose, confidence = hf_classifier.classify_image(frame)
+        classification_worker.submit(frame)
+        result = classification_worker.poll()
+        if result is not None:
+            predicted_pose, confidence = result['pose'], result['confidence']
             
             # Map predicted pose to application pose ID
             app_pose = pose_map.get(predicted_pose, "unknown")
@@ -402,21 +376,21 @@ def generate_frames():
                 if correct_pose_duration >= pose_completion_time and not pose_completed:
                     pose_completed = True
                     
-                    # Update progress data
-                    if current_pose in progress_data:
-                        progress_data[current_pose]['completions'] += 1
-                        progress_data[current_pose]['total_practice_time'] += correct_pose_duration
-                        
-                        # Update best accuracy if this attempt is better
-                        if confidence > progress_data[current_pose]['best_accuracy']:
-                            progress_data[current_pose]['best_accuracy'] = confidence
-                        
-                        # Save the updated progress
-                        save_progress_data(progress_data)
+                    # Update progress data (best accuracy is only replaced if this attempt is better)
+                    progress_store.update(
+                        current_pose,
+                        completions=1,
+                        practice_time=correct_pose_duration,
+                        best_accuracy=confidence,
+                        touch=False
+                    )
             else:
                 # Reset the timer if the pose is broken
                 correct_pose_start_time = None
                 correct_pose_duration = 0
+        elif is_correct and correct_pose_start_time is not None:
+            # No new classification this frame - keep the hold timer moving from the last result
+            correct_pose_duration = current_time - correct_pose_start_time
         
         # Draw pose information on frame
         color = (0, 255, 0) if is_correct else (0, 0, 255)
@@ -429,8 +403,9 @@ def generate_frames():
         cv2.putText(frame, f"Detected: {predicted_pose} ({int(confidence * 100)}%)", 
                    (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
         
-        # Show accuracy
-        avg_accuracy = sum(accuracy_data['values']) / len(accuracy_data['values'])
+        # Show accuracy (0 until the first asynchronous classification arrives)
+        values = accuracy_data['values']
+        avg_accuracy = sum(values) / len(values) if values else 0
         cv2.putText(frame, f"Accuracy: {int(avg_accuracy)}%", 
                    (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
@@ -619,12 +594,7 @@ def get_pose_charts(pose_id):
 @app.route('/charts')
 def charts():
     """Render charts page"""
-    # Ensure progress data file is created
-    if not os.path.exists(progress_data_file):
-        data = initialize_progress_data()
-        save_progress_data(data)
-        print(f"Created new progress data file at {progress_data_file}")
-        
+    # The progress store creates pose_progress.json on startup if it doesn't exist
     return render_template('charts.html')
 
 # Catch-all route to handle React Router paths
@@ -8,45 +8,12 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-# Path to progress data file
-progress_data_file = os.path.join(current_dir, 'pose_progress.json')
+from progress_store import get_progress_store
 
-# Initialize progress data if it doesn't exist
-def initialize_progress_data():
-    """Initialize empty progress data structure"""
-    poses = [
-        'vrksana', 'adhomukha', 'balasana', 'tadasan', 'trikonasana', 
-        'virabhadrasana', 'bhujangasana', 'setubandhasana', 
-        'uttanasana', 'shavasana', 'ardhamatsyendrasana'
-    ]
-    
-    data = {}
-    for pose in poses:
-        data[pose] = {
-            'attempts': 0,
-            'completions': 0,
-            'total_practice_time': 0,
-            'best_accuracy': 0,
-            'last_practiced': None
-        }
-    return data
-
-# Create or load progress data
-def ensure_progress_data():
-    if not os.path.exists(progress_data_file):
-        print(f"Creating new progress data file at {progress_data_file}")
-        data = initialize_progress_data()
-        try:
-            with open(progress_data_file, 'w') as f:
-                json.dump(data, f, indent=4)
-            print("Progress data file created successfully")
-        except Exception as e:
-            print(f"Error creating progress data file: {str(e)}")
-    else:
-        print(f"Progress data file already exists at {progress_data_file}")
-
-# Ensure progress data file exists
-ensure_progress_data()
+# Shared in-memory progress store; creates pose_progress.json if it doesn't exist
+progress_store = get_progress_store()
+progress_data_file = progress_store.path
+print(f"Using progress data file at {progress_data_file}")
 
 # Apply the fix for JAX-NumPy compatibility issue
 try:
@@ -61,29 +28,24 @@ from flask_cors import CORS
 import numpy as np
 import cv2
 import time 
-import PoseModule as pm
-import matplotlib.pyplot as plt
 import data as data
 import pyttsx3
 import pythoncom
 import schedule
 import gtts  
 from playsound import playsound
-import pygame
 import os
 import threading
-from HuggingFaceIntegration import HuggingFaceHybridDetector
+from camera_stream import CameraStream
+from stream_broadcaster import FrameBroadcaster
+from pose_reference import PoseReferenceTable, PART_NAMES, PART_LABELS
+from accuracy_history import AccuracyHistory
+from session_stats import window_means
+from model_registry import ModelRegistry, loading_stream
 
 # Import CORS to handle cross-origin requests during development
 from flask_cors import CORS
 
-# Initialize audio system
-try:
-    pygame.mixer.init()
-    print("Audio system initialized successfully")
-except Exception as e:
-    print(f"Audio initialization warning: {str(e)}")
-
 # Ensure audio directory exists
 audio_dir = os.path.join(os.path.dirname(__file__), 'static', 'audio')
 if not os.path.exists(audio_dir):
@@ -129,43 +91,111 @@ def inject_camera_fix_css():
         'camera_fix_css': True
     }
 
-# Global variable to store accuracy data
-accuracy_data = {
-    'poses': [],
-    'values': []
-}
+# Accuracy samples per body part (fixed-capacity ring buffer)
+accuracy_history = AccuracyHistory(PART_LABELS)
 
 # Global variable to store the current pose
 current_pose = 'vrksana'  # Default to vrksana
 
-# Load the MoveNet model for multi-pose detection
-cap = cv2.VideoCapture(0)
-cap.set(3, 640)  # Width
-cap.set(4, 480)  # Height
-
-# Initialize the hybrid detector with default pose
-detector = HuggingFaceHybridDetector(pose_name='vrksana', use_hf=True)
 dataList = data.AngleData
 
-# Check if the webcam is opened correctly
-if not cap.isOpened():
-    raise IOError("Cannot open webcam")
+def load_camera():
+    cap = cv2.VideoCapture(0)
+    cap.set(3, 640)  # Width
+    cap.set(4, 480)  # Height
+    
+    # Check if the webcam is opened correctly
+    if not cap.isOpened():
+        raise IOError("Cannot open webcam")
+    
+    # Drain the webcam on a background thread so HF/MediaPipe stalls never back up the driver queue
+    return CameraStream(cap)
+
+def load_pose_module():
+    """Import the hybrid detector (and MediaPipe)"""
+    import HuggingFaceIntegration
+    return HuggingFaceIntegration
+
+def load_hf_classifier():
+    from HuggingFacePoseClassifier import HuggingFacePoseClassifier
+    return HuggingFacePoseClassifier()
+
+def load_audio():
+    import pygame
+    pygame.mixer.init()
+    print("Audio system initialized successfully")
+    return pygame
+
+# The webcam, MediaPipe, the Hugging Face model and audio load in parallel background
+# threads so the server binds immediately; /health reports when they are ready
+model_registry = ModelRegistry()
+model_registry.register('camera', load_camera)
+model_registry.register('pose', load_pose_module)
+model_registry.register('hf_classifier', load_hf_classifier)
+model_registry.register('audio', load_audio)
+model_registry.warm_up()
+
+# Components the video stream needs; the classifier joins in once it has loaded
+STREAM_COMPONENTS = ('camera', 'pose')
+
+def get_camera():
+    return model_registry.get('camera')
+
+# The hybrid detector is created on first use and shares one classifier instance.
+# Only the frame producer calls get_detector(), so it is also the one that closes
+# a replaced detector (never while another thread is inside its findPose)
+detector = None
+detector_pose = 'vrksana'
+detector_stale = False
+detector_lock = threading.Lock()
+
+def get_detector():
+    """Return the hybrid detector for the selected pose, creating it if needed (producer thread only)"""
+    global detector, detector_stale
+    old_detector = None
+    with detector_lock:
+        if detector is None or detector_stale:
+            hf = model_registry.get('pose')
+            new_detector = hf.HuggingFaceHybridDetector(
+                pose_name=detector_pose, use_hf=False, classifier=model_registry.get_nowait('hf_classifier'))
+            old_detector, detector = detector, new_detector
+            detector_stale = False
+    if old_detector is not None:
+        old_detector.close()
+    return detector
+
+def attach_loaded_classifier(classifier):
+    """Classify with the shared model in the current detector as soon as it has loaded"""
+    with detector_lock:
+        if detector is not None:
+            detector.attach_classifier(classifier)
+
+# One callback for the process; detectors created after the load get the classifier directly
+model_registry.when_ready('hf_classifier', attach_loaded_classifier)
+
+def select_pose(pose):
+    """Select a pose; the producer rebuilds the detector for it (with fresh tracking) on the next frame"""
+    global detector_pose, detector_stale
+    with detector_lock:
+        detector_pose = pose
+        # Force a fresh detector even when the pose is unchanged, as before
+        detector_stale = True
 
 def make_1080p():
-    cap.set(3, 1920)
-    cap.set(4, 1080)
+    get_camera().set(3, 1920)
+    get_camera().set(4, 1080)
 
 def make_720p():
-    cap.set(3, 1280)
-    cap.set(4, 720)
+    get_camera().set(3, 1280)
+    get_camera().set(4, 720)
 
 def make_480p():
-    cap.set(3, 640)
-    cap.set(4, 480)
+    get_camera().set(3, 640)
+    get_camera().set(4, 480)
 
 def change_res(width, height):
-    cap.set(3, width)
-    cap.set(4, height)
+    get_camera().set(3, width)
+    get_camera().set(4, height)
 
 # Drawing the keypoints
 def draw_keypoints(frame, keypoints, confidence_threshold):
@@ -218,129 +248,42 @@ def loop_through_people(frame, keypoints_with_scores, edges, confidence_threshol
         draw_connections(frame, person, edges, confidence_threshold)
         draw_keypoints(frame, person, confidence_threshold)
 
+# Reference angles compiled once into a (num_poses, 4) matrix indexed by pose id.
+# Parts within 10 degrees of the reference score at least 85%.
+reference_table = PoseReferenceTable(dataList, min_accuracy=85)
+
 def get_pose_index(pose_name):
     """Get the index of the pose in dataList based on the pose name"""
-    pose_indices = {
-        'vrksana': 1,
-        'balasana': 2, 
-        'trikonasana': 3,
-        'virabhadrasana': 4,
-        'adhomukha': 5,
-        'tadasan': 0,
-        # Adding the new poses
-        'bhujangasana': 6,
-        'setubandhasana': 7,
-        'uttanasana': 8,
-        'shavasana': 9,
-        'ardhamatsyendrasana': 10
-    }
-    return pose_indices.get(pose_name, 0)  # Default to tadasan (0) if pose not found
-
-def compare_right_arm(right_arm):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-    
-    if(right_arm <= pose_data[0]):
-        acc = (right_arm / pose_data[0]) * 100
-    else:
-        acc = 0
-        
-    # Apply 85% minimum accuracy threshold for correct poses
-    if abs(pose_data[0] - right_arm) <= 10:
-        print("Your right arm is accurate")
-        # Ensure minimum 85% accuracy for correct poses
-        if acc < 85 and acc > 0:
-            acc = 85
-    else:
-        print("Your right arm is not accurate")
-
-    return acc
-
-
-def compare_left_arm(left_arm):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-    
-    if(left_arm <= pose_data[1]):
-        acc = (left_arm / pose_data[1]) * 100
-    else:
-        acc = 0
-        
-    if abs(pose_data[1] - left_arm) <= 10:    
-        print("Your left arm is accurate")
-        # Ensure minimum 85% accuracy for correct poses
-        if acc < 85 and acc > 0:
-            acc = 85
-    else:
-        print("Your left arm is not accurate, try again")
-    
-    return acc
-    
-def compare_right_leg(right_leg):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-
-    if(right_leg <= pose_data[2]):
-        acc = (right_leg / pose_data[2]) * 100
-    else:
-        acc = 0
-
-    if abs(pose_data[2] - right_leg) <= 10:
-        print("Your right leg is accurate")
-        # Ensure minimum 85% accuracy for correct poses
-        if acc < 85 and acc > 0:
-            acc = 85
-    else:
-        print("Your right leg is not accurate, try again") 
+    return reference_table.pose_index(pose_name)  # Defaults to tadasan if pose not found
 
-    return acc
-        
-       
-def compare_left_leg(left_leg):
-    # Get the pose data based on the current global pose
-    pose_index = get_pose_index(current_pose)
-    pose_data = [y for x, y in list(dataList[pose_index].items()) if type(y) == int]
-    
-    if(left_leg <= pose_data[3]):
-        acc = (left_leg / pose_data[3]) * 100
-    else:
-        acc = 0
-
-    if abs(pose_data[3] - left_leg) <= 10 and left_leg < pose_data[3]:
-       print("Your left leg is accurate")
-       # Ensure minimum 85% accuracy for correct poses
-       if acc < 85 and acc > 0:
-           acc = 85
-    else:
-        print("Your left leg is not accurate, try again") 
-    
-    return acc
+def score_pose(part_angles):
+    """
+    Score all four body parts against the current pose in one vectorized call.
+    Returns (accuracies, within_tolerance) arrays in PART_NAMES order.
+    """
+    return reference_table.score(current_pose, part_angles)
 
 
 arr = np.array([])
 
 def generate_frames(arr):
-    global accuracy_data
     count = 0
     timeout = 20
     timeout_start = time.time()
+    camera = get_camera()
     
     while time.time() < timeout_start + timeout:
         while True:
-            ## read the camera frame
-            success, frame = cap.read()
+            ## read the newest camera frame (older buffered frames are dropped)
+            success, frame = camera.read()
             if not success:
                 break
                 
-            frame = cv2.flip(frame, 1)
-      
-            # resize the image
-            img = frame.copy()
+            # camera.read() returns our own copy, so mirror it in place
+            frame = cv2.flip(frame, 1, dst=frame)
              
             # Use our hybrid detector (Hugging Face + angle-based)
+            detector = get_detector()
             frame = detector.findPose(frame, False)
             lmlist = detector.getPosition(frame, False)
             
@@ -350,42 +293,19 @@ def generate_frames(arr):
                 # to prevent duplicate breathing guides
                 
                 # Continue with the original angle-based measurements
-                # Right arm - setting draw=False to prevent extra blue lines
-                RightArmAngle = int(detector.findAngle(frame, 12, 14, 16, draw=False))
-                accuracy = compare_right_arm(RightArmAngle)
-                if (count <= 16 and accuracy != 0):
-                    arr = np.append(arr, accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Right Arm')
-                    accuracy_data['values'].append(accuracy)
-
-                # Left arm - setting draw=False to prevent extra blue lines
-                angle = int(detector.findAngle(frame, 11, 13, 15, draw=False))
-                accuracy = compare_left_arm(angle)
-                if (count <= 16 and accuracy != 0):
-                    arr = np.append(arr, accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Left Arm')
-                    accuracy_data['values'].append(accuracy)
+                # All joint angles are computed in one vectorized pass (no drawing)
+                angles = detector.findAngles(named=False)
+                
+                # Score right arm, left arm, right leg and left leg against the current pose at once
+                # (angles are truncated to whole degrees as before)
+                part_accuracies, _ = score_pose(np.trunc(angles[:len(PART_NAMES)]))
                 
-                # Right leg - setting draw=False to prevent extra blue lines
-                angle = int(detector.findAngle(frame, 24, 26, 28, draw=False))
-                accuracy = compare_right_leg(angle)
-                if (count <= 16 and accuracy != 0):
-                    arr = np.append(arr, accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Right Leg')
-                    accuracy_data['values'].append(accuracy)
-               
-                # Left leg - setting draw=False to prevent extra blue lines
-                angle = int(detector.findAngle(frame, 23, 25, 27, draw=False))
-                accuracy = compare_left_leg(angle)
-                if (count <= 16 and accuracy != 0):
-                    arr = np.append(arr, accuracy)
-                    count = count + 1
-                    accuracy_data['poses'].append('Left Leg')
-                    accuracy_data['values'].append(accuracy)
-                elif(count > 16):
+                for label, accuracy in zip(PART_LABELS, part_accuracies.tolist()):
+                    if (count <= 16 and accuracy != 0):
+                        arr = np.append(arr, accuracy)
+                        count = count + 1
+                        accuracy_history.append(label, accuracy)
+                if (count > 16):
                     print("entring")
                     print("accuracy: ", accuracyCaluclation(arr))
                     
@@ -395,24 +315,14 @@ def generate_frames(arr):
 
             yield(b'--frame\r\n'
                         b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            print('Original Array:', arr)
-            x = range(1, len(arr) + 1)
-            y = arr
-            plt.plot(x, y)
 
 
+# One detection pipeline per camera, shared by every /video viewer
+video_broadcaster = FrameBroadcaster(lambda: generate_frames(arr), name="VideoBroadcaster")
+
 def accuracyCaluclation(arr):
-    accArray = np.array([])
-    sum = 0
-    for j in range(0, len(arr) - 1, 4):
-        sum = 0
-        for i in range(j, min(j + 4, len(arr))):
-            print("arr[i]", arr[i])
-            sum = sum + arr[i]
-        accur = sum / 4
-        accArray = np.append(accArray, accur)
-    
-    return accArray
+    # Mean of each group of four part accuracies (one reshape instead of nested loops)
+    return window_means(arr, 4)
 
 
 @app.route("/")
@@ -515,8 +425,7 @@ def index():
     current_pose = pose
     
     # Also update the detector's pose name
-    global detector
-    detector = HuggingFaceHybridDetector(pose_name=pose, use_hf=True)
+    select_pose(pose)
     
     return render_template('index.html', 
                           pose_name=pose_name, 
@@ -531,11 +440,11 @@ def index():
 @app.route('/charts')
 def charts():
     # Use the updated accuracy data
-    if len(accuracy_data['values']) == 0:
+    if len(accuracy_history) == 0:
         # Generate sample data if no real data exists yet
         values = [67, 78, 68, 89, 69, 59, 70, 61, 84, 78]
     else:
-        values = accuracy_data['values']
+        values = accuracy_history.values()
         
     labels = ['Right Arm', 'Left Arm', 'Right Leg', 'Left Leg']
     colors = ['#ff0000','#0000ff','#ffffe0','#008000','#800080','#FFA500', '#FF2554']
@@ -547,10 +456,24 @@ def video():
     pose = request.args.get('pose', 'vrksana')
     
     # Update global detector with the selected pose
-    global detector
-    detector = HuggingFaceHybridDetector(pose_name=pose, use_hf=True)
+    select_pose(pose)
     
-    return Response(generate_frames(arr), mimetype='multipart/x-mixed-replace; boundary=frame')
+    if model_registry.is_ready(*STREAM_COMPONENTS):
+        stream = video_broadcaster.subscribe()
+    else:
+        # Placeholder frames until the camera and MediaPipe have loaded
+        stream = loading_stream(model_registry, STREAM_COMPONENTS, video_broadcaster.subscribe)
+    return Response(stream, mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/health')
+def health():
+    """Readiness probe: 200 once the camera and MediaPipe are loaded, 503 while they are loading"""
+    ready = model_registry.is_ready(*STREAM_COMPONENTS)
+    return jsonify({
+        "status": "ready" if ready else "loading",
+        "classifier_ready": model_registry.is_ready('hf_classifier'),
+        "components": model_registry.status()
+    }), 200 if ready else 503
 
 # API endpoints for React frontend
 @app.route('/api/poses', methods=['GET'])
@@ -888,25 +811,32 @@ def get_pose(pose_id):
 
 @app.route('/api/accuracy', methods=['GET'])
 def get_accuracy():
-    """Return accuracy data for analytics"""
-    if len(accuracy_data['values']) == 0:
+    """Return accuracy data for analytics (?format=png for a rendered chart)"""
+    if request.args.get('format') == 'png':
+        # Rendered on request and cached until the next sample arrives
+        try:
+            return Response(accuracy_history.chart('png'), mimetype='image/png')
+        except ImportError:
+            return jsonify({"error": "matplotlib is not installed"}), 501
+    
+    if len(accuracy_history) == 0:
         values = [67, 78, 68, 89, 69, 59, 70, 61, 84, 78]
     else:
-        values = accuracy_data['values']
+        values = accuracy_history.values()
     
     labels = ['Right Arm', 'Left Arm', 'Right Leg', 'Left Leg']
     return jsonify({
         'values': values,
         'labels': labels,
-        'poses': accuracy_data.get('poses', ['Pose 1', 'Pose 2', 'Pose 3', 'Pose 4'])
+        'poses': accuracy_history.poses(),
+        'summary': accuracy_history.summary()
     })
 
 @app.route('/api/progress', methods=['GET'])
 def get_progress():
     """Return progress data for all poses"""
-    # Get progress data from detector
-    global detector
-    progress_data = detector.progress_data
+    # Get progress data from the shared progress store
+    progress_data = progress_store.snapshot()
     
     # If no data exists yet, return empty data
     if not progress_data:
@@ -936,15 +866,14 @@ def get_progress():
 @app.route('/api/progress/<pose_id>', methods=['GET'])
 def get_pose_progress(pose_id):
     """Return progress data for a specific pose"""
-    global detector
-    progress_data = detector.progress_data
+    progress_data = progress_store.snapshot()
     
     # Check if pose exists in progress data
     if pose_id in progress_data:
         data = progress_data[pose_id].copy()
         
         # Add completion time for this pose
-        completion_time = detector._get_pose_completion_time(pose_id)
+        completion_time = model_registry.get('pose').HuggingFaceHybridDetector.get_pose_completion_time(pose_id)
         data['completion_time'] = completion_time
         
         # Format practice time
@@ -969,8 +898,7 @@ def get_pose_progress(pose_id):
 @app.route('/api/charts/<pose_id>', methods=['GET'])
 def get_pose_charts(pose_id):
     """Return chart data for a specific pose"""
-    global detector, accuracy_data
-    progress_data = detector.progress_data
+    progress_data = progress_store.snapshot()
     
     # Check if pose exists in progress data
     if pose_id in progress_data:
@@ -989,19 +917,12 @@ def get_pose_charts(pose_id):
         }
         
         # If we have real accuracy data, use it
-        if len(accuracy_data['values']) > 0:
-            # Group values by body part
-            body_parts = {}
-            for i, part in enumerate(accuracy_data.get('poses', [])):
-                if part not in body_parts:
-                    body_parts[part] = []
-                body_parts[part].append(accuracy_data['values'][i])
-            
-            # Calculate average for each body part
+        if len(accuracy_history) > 0:
+            # Rolling average for each body part
+            part_means = accuracy_history.part_means()
             for part in chart_data['accuracy']['labels']:
-                if part in body_parts and body_parts[part]:
-                    avg = sum(body_parts[part]) / len(body_parts[part])
-                    chart_data['accuracy']['values'].append(avg)
+                if part in part_means:
+                    chart_data['accuracy']['values'].append(part_means[part])
                 else:
                     # Use a default value if no data exists
                     chart_data['accuracy']['values'].append(75 + 10 * np.random.random())
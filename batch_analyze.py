@@ -0,0 +1,260 @@
+"""
+Offline batch analysis of recorded yoga sessions.
+
+Scores every video in a directory with PoseDetector and writes, per video,
+the per-frame landmarks, joint angles and accuracy against every reference
+pose in data.py to <output>/<video name>.npz (and .parquet when pyarrow is
+installed).
+
+Videos are spread over a pool of worker processes (one MediaPipe instance
+each); inside a worker a reader thread decodes frames ahead of inference.
+
+Usage:
+    python batch_analyze.py recordings/ -o analysis/ --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+def find_videos(input_dir, extensions=VIDEO_EXTENSIONS):
+    """Return the video files in input_dir (recursively), sorted by path"""
+    videos = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(extensions):
+                videos.append(os.path.join(root, name))
+    return sorted(videos)
+
+
+def output_stem(video_path, input_dir, output_dir):
+    """Output path without extension, mirroring the video's location under input_dir"""
+    relative = os.path.relpath(video_path, input_dir)
+    return os.path.join(output_dir, os.path.splitext(relative)[0])
+
+
+def read_frames(cap, frames, stop, stride=1, max_width=None):
+    """Reader thread: decode frames into a bounded queue, ending with None"""
+    index = 0
+    try:
+        while not stop.is_set():
+            success, frame = cap.read()
+            if not success:
+                break
+            if index % stride == 0:
+                if max_width and frame.shape[1] > max_width:
+                    scale = max_width / frame.shape[1]
+                    frame = cv2.resize(frame, (max_width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                # Blocks when inference falls behind, so memory stays bounded
+                frames.put((index, timestamp, frame))
+            index += 1
+    finally:
+        frames.put(None)
+
+
+def analyze_video(video_path, stride=1, max_width=None):
+    """
+    Run pose detection on every `stride`-th frame of a video.
+
+    Returns a dict of arrays: frame_index (F,), timestamp (F,), detected (F,),
+    landmarks (F, 33, 4), angles (F, 4) and accuracy (F, num_poses, 4), plus the
+    pose and part names, or None if the video could not be opened.
+    """
+    # Imported here so the parent process never loads MediaPipe
+    import PoseModule as pm
+    from data import AngleData
+    from pose_reference import PoseReferenceTable, PART_NAMES
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+
+    detector = pm.PoseDetector(enable_audio=False)
+    frames = queue.Queue(maxsize=32)
+    stop = threading.Event()
+    reader = threading.Thread(target=read_frames, args=(cap, frames, stop, stride, max_width),
+                              name="VideoReader", daemon=True)
+    reader.start()
+
+    indices, timestamps, detected, landmarks, angles = [], [], [], [], []
+    no_landmarks = np.full((pm.NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    no_angles = np.full(len(PART_NAMES), np.nan)
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            index, timestamp, frame = item
+
+            detector.findPose(frame, draw=False)
+            lm = detector.getLandmarkArray(frame)
+            frame_angles = detector.findAngles(named=False) if lm is not None else None
+
+            indices.append(index)
+            timestamps.append(timestamp)
+            detected.append(frame_angles is not None)
+            # getLandmarkArray() reuses its buffer, so copy it
+            landmarks.append(lm.copy() if frame_angles is not None else no_landmarks)
+            angles.append(np.trunc(frame_angles[:len(PART_NAMES)]) if frame_angles is not None else no_angles)
+    finally:
+        stop.set()
+        # Unblock the reader if it is waiting on a full queue
+        while reader.is_alive():
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                reader.join(timeout=0.1)
+        cap.release()
+        detector.pose.close()
+
+    angles = np.array(angles, dtype=np.float64).reshape(-1, len(PART_NAMES))
+    detected = np.array(detected, dtype=bool)
+
+    # Score every frame against every reference pose in one broadcast
+    reference_table = PoseReferenceTable(AngleData)
+    accuracy, _ = reference_table.score_all(np.nan_to_num(angles))
+    accuracy[~detected] = np.nan
+
+    return {
+        'frame_index': np.array(indices, dtype=np.int64),
+        'timestamp': np.array(timestamps, dtype=np.float64),
+        'detected': detected,
+        'landmarks': np.array(landmarks, dtype=np.float32).reshape(-1, pm.NUM_LANDMARKS, 4),
+        'angles': angles.astype(np.float32),
+        'accuracy': accuracy.astype(np.float32),
+        'pose_names': np.array(reference_table.pose_names),
+        'part_names': np.array(PART_NAMES),
+    }
+
+
+def write_npz(result, stem):
+    path = stem + '.npz'
+    np.savez_compressed(path, **result)
+    return path
+
+
+def write_parquet(result, stem):
+    """Write one row per frame; returns None if pyarrow is not installed"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+
+    columns = {
+        'frame_index': result['frame_index'],
+        'timestamp': result['timestamp'],
+        'detected': result['detected'],
+    }
+    for j, part in enumerate(result['part_names']):
+        columns[f'angle_{part}'] = result['angles'][:, j]
+    for p, pose in enumerate(result['pose_names']):
+        for j, part in enumerate(result['part_names']):
+            columns[f'accuracy_{pose}_{part}'] = result['accuracy'][:, p, j]
+    for i in range(result['landmarks'].shape[1]):
+        for c, axis in enumerate(('x', 'y', 'z', 'visibility')):
+            columns[f'lm{i}_{axis}'] = result['landmarks'][:, i, c]
+
+    path = stem + '.parquet'
+    pq.write_table(pa.table(columns), path)
+    return path
+
+
+def _process(job):
+    """Pool worker: analyze one video and write its output files"""
+    video_path, stem, options = job
+    # One OpenCV thread per worker process; parallelism comes from the pool
+    cv2.setNumThreads(1)
+    start = time.time()
+    try:
+        result = analyze_video(video_path, options['stride'], options['max_width'])
+        if result is None:
+            return video_path, None, "could not open video"
+
+        os.makedirs(os.path.dirname(stem) or '.', exist_ok=True)
+        written = []
+        if options['format'] in ('npz', 'both'):
+            written.append(write_npz(result, stem))
+        if options['format'] in ('parquet', 'both'):
+            path = write_parquet(result, stem)
+            if path is None:
+                if options['format'] == 'parquet':
+                    written.append(write_npz(result, stem))
+            else:
+                written.append(path)
+
+        frames = len(result['frame_index'])
+        elapsed = time.time() - start
+        summary = f"{frames} frames, {result['detected'].mean() * 100 if frames else 0:.0f}% with a person, " \
+                  f"{frames / elapsed if elapsed > 0 else 0:.1f} fps -> {', '.join(written)}"
+        return video_path, written, summary
+    except Exception as e:
+        return video_path, None, f"error: {str(e)}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score recorded yoga videos offline with PoseDetector")
+    parser.add_argument('input_dir', help="Directory containing the videos (searched recursively)")
+    parser.add_argument('-o', '--output', help="Output directory (default: <input_dir>/analysis)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: number of CPU cores)")
+    parser.add_argument('--stride', type=int, default=1, help="Analyze every Nth frame (default: 1)")
+    parser.add_argument('--max-width', type=int, default=None,
+                        help="Downscale frames wider than this before detection")
+    parser.add_argument('--format', choices=('npz', 'parquet', 'both'), default='both',
+                        help="Output format; parquet needs pyarrow and falls back to npz (default: both)")
+    parser.add_argument('--overwrite', action='store_true', help="Re-analyze videos that already have output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: {args.input_dir} is not a directory")
+        return 1
+
+    output_dir = args.output or os.path.join(args.input_dir, 'analysis')
+    options = {'stride': max(1, args.stride), 'max_width': args.max_width, 'format': args.format}
+
+    jobs = []
+    for video in find_videos(args.input_dir):
+        if os.path.abspath(video).startswith(os.path.abspath(output_dir) + os.sep):
+            continue
+        stem = output_stem(video, args.input_dir, output_dir)
+        if not args.overwrite and (os.path.exists(stem + '.npz') or os.path.exists(stem + '.parquet')):
+            print(f"Skipping {video} (already analyzed)")
+            continue
+        jobs.append((video, stem, options))
+
+    if not jobs:
+        print("No videos to analyze")
+        return 0
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"Analyzing {len(jobs)} videos with {workers} worker processes")
+    start = time.time()
+    failures = 0
+
+    # Spawn keeps MediaPipe/TensorFlow state out of forked children
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        for done, (video, written, summary) in enumerate(pool.imap_unordered(_process, jobs), 1):
+            if written is None:
+                failures += 1
+            print(f"[{done}/{len(jobs)}] {video}: {summary}")
+
+    print(f"Finished in {time.time() - start:.1f}s ({failures} failed)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""
+Reproducible throughput benchmark for the frame pipeline.
+
+Replays synthetic frames (bundled pose photos, letterboxed and shifted a little
+every frame) or a recorded video through the pipeline stages at 480p, 720p
+and 1080p, and reports frames/sec, per-stage latency (p50/p95/p99) and peak
+RSS. Each bench runs in a fresh process so its memory figures do not include
+earlier benches. Results are written as JSON so runs can be compared across commits.
+
+Benchmarks:
+    pipeline  PoseDetector + angles + scoring + overlay + JPEG, like app.generate_frames
+    scoring   PoseReferenceTable scoring of one frame and of a batch of frames
+    mjpeg     JPEG encoding only
+    hybrid    HuggingFaceHybridDetector.findPose (loads the Hugging Face model)
+
+Usage:
+    python benchmark_pipeline.py -o bench.json
+    python benchmark_pipeline.py --video session.mp4 --benchmarks pipeline mjpeg
+    python benchmark_pipeline.py -o new.json --compare bench.json
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from pipeline_metrics import PipelineMetrics
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+BENCHMARKS = ('pipeline', 'scoring', 'mjpeg', 'hybrid')
+DEFAULT_BENCHMARKS = ('pipeline', 'scoring', 'mjpeg')
+SYNTHETIC_IMAGES = ('vrksana.jpg', 'tadasan.jpg', 'trikonasana.jpg', 'virabhadrasana.jpg')
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+
+
+def letterbox(image, width, height):
+    """Scale an image to fit width x height, centered on black"""
+    h, w = image.shape[:2]
+    scale = min(width / w, height / h)
+    resized = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    y = (height - resized.shape[0]) // 2
+    x = (width - resized.shape[1]) // 2
+    canvas[y:y + resized.shape[0], x:x + resized.shape[1]] = resized
+    return canvas
+
+
+def synthetic_frames(width, height, count, seed=0):
+    """Bundled pose photos with a deterministic small shift per frame to imitate motion"""
+    bases = []
+    for name in SYNTHETIC_IMAGES:
+        image = cv2.imread(os.path.join(IMAGE_DIR, name))
+        if image is not None:
+            bases.append(letterbox(image, width, height))
+    if not bases:
+        raise RuntimeError(f"No synthetic fixture images found in {IMAGE_DIR}")
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    per_pose = max(1, count // len(bases))
+    for i in range(count):
+        base = bases[min(i // per_pose, len(bases) - 1)]
+        dx, dy = rng.integers(-8, 9, size=2)
+        shift = np.float32([[1, 0, dx], [0, 1, dy]])
+        frames.append(cv2.warpAffine(base, shift, (width, height)))
+    return frames
+
+
+def recorded_frames(video_path, width, height, count):
+    """The first `count` frames of a video, resized to width x height"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+    frames = []
+    while len(frames) < count:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"No frames decoded from {video_path}")
+    return frames
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def run_frames(frames, step, warmup, repeat=1):
+    """Run step(frame, metrics) over the frames; the first `warmup` calls are not measured"""
+    for frame in frames[:warmup]:
+        step(frame, PipelineMetrics(window=16))
+    metrics = PipelineMetrics(window=max(16, len(frames) * repeat))
+    start = time.perf_counter()
+    processed = 0
+    for _ in range(repeat):
+        for frame in frames:
+            step(frame, metrics)
+            metrics.frame_done()
+            processed += 1
+    elapsed = time.perf_counter() - start
+    snapshot = metrics.snapshot()
+    return {
+        'frames': processed,
+        'seconds': round(elapsed, 3),
+        'fps': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+        'stages': snapshot['stages'],
+    }
+
+
+def bench_pipeline(frames, warmup):
+    """Per-frame work of app.generate_frames, without the camera and the web server"""
+    import PoseModule as pm
+    from data import AngleData
+    from overlay import OverlayCompositor
+    from pose_reference import PoseReferenceTable, PART_NAMES
+
+    detector = pm.PoseDetector(enable_audio=False)
+    table = PoseReferenceTable(AngleData)
+    overlay = OverlayCompositor()
+    buffer = np.empty_like(frames[0])
+
+    def step(frame, metrics):
+        detector.metrics = metrics
+        t = time.perf_counter()
+        np.copyto(buffer, frame)
+        img = cv2.flip(buffer, 1, dst=buffer)
+        t = metrics.lap('flip', t)
+        # findPose records color_convert, mediapipe and draw_landmarks itself
+        img = detector.findPose(img, draw=True, inplace=True)
+        t = time.perf_counter()
+        detector.getPosition(img, draw=False)
+        t = metrics.lap('landmarks', t)
+        angles = detector.findAngles(named=False)
+        t = metrics.lap('angles', t)
+        accuracy = 0.0
+        if angles is not None:
+            scores, _ = table.score('vrksana', np.trunc(angles[:len(PART_NAMES)]))
+            valid = scores[scores > 0]
+            accuracy = float(valid.mean()) if valid.size else 0.0
+        t = metrics.lap('scoring', t)
+        img = overlay.progress_banner(img, accuracy, f"{int(accuracy)}% - Hold for 10s more")
+        t = metrics.lap('overlay', t)
+        cv2.imencode('.jpg', img)
+        metrics.lap('jpeg_encode', t)
+
+    try:
+        result = run_frames(frames, step, warmup)
+        result['bytes_copied_per_frame'] = detector.totalBytesCopied // max(1, result['frames'] + warmup)
+        return result
+    finally:
+        detector.pose.close()
+
+
+def bench_scoring(frames, warmup, batch_size=256):
+    """Scoring cost is independent of resolution; frames only set the iteration count"""
+    from data import AngleData
+    from pose_reference import PoseReferenceTable
+
+    table = PoseReferenceTable(AngleData)
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(0, 360, size=(len(frames), 4)).round()
+    batch = rng.uniform(0, 360, size=(batch_size, 4)).round()
+    index = {'i': 0}
+
+    def step(frame, metrics):
+        t = time.perf_counter()
+        table.score('vrksana', angles[index['i'] % len(angles)])
+        t = metrics.lap('score_one', t)
+        table.score_all(angles[index['i'] % len(angles)])
+        t = metrics.lap('score_all_poses', t)
+        table.score_all(batch)
+        metrics.lap(f'score_all_batch{batch_size}', t)
+        index['i'] += 1
+
+    return run_frames(frames, step, warmup, repeat=10)
+
+
+def bench_mjpeg(frames, warmup):
+    def step(frame, metrics):
+        t = time.perf_counter()
+        ret, buffer = cv2.imencode('.jpg', frame)
+        t = metrics.lap('jpeg_encode', t)
+        buffer.tobytes()
+        metrics.lap('to_bytes', t)
+
+    return run_frames(frames, step, warmup)
+
+
+def bench_hybrid(frames, warmup):
+    from HuggingFaceIntegration import HuggingFaceHybridDetector
+
+    detector = HuggingFaceHybridDetector(pose_name='vrksana', use_hf=True)
+
+    def step(frame, metrics):
+        detector.angle_detector.metrics = metrics
+        t = time.perf_counter()
+        detector.findPose(frame.copy(), draw=True)
+        # Includes the angle detector's stages above; a total, not a stage to add to them
+        metrics.lap('hybrid_find_pose_total', t)
+
+    try:
+        result = run_frames(frames, step, warmup)
+        if detector.classification_worker is not None:
+            result['classifier'] = detector.classification_worker.stats()
+        return result
+    finally:
+        detector.close()
+
+
+BENCH_FUNCTIONS = {
+    'pipeline': bench_pipeline,
+    'scoring': bench_scoring,
+    'mjpeg': bench_mjpeg,
+    'hybrid': bench_hybrid,
+}
+
+
+def environment():
+    """Commit and library versions the results were measured with"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def compare(current, baseline):
+    """Print FPS and p50 stage latency changes against a baseline result file"""
+    print(f"\nComparison with {baseline['environment'].get('commit') or 'baseline'}:")
+    regressions = []
+    for name, by_res in current['results'].items():
+        for res, result in by_res.items():
+            base = baseline.get('results', {}).get(name, {}).get(res)
+            if not base or 'fps' not in base or 'fps' not in result:
+                continue
+            change = (result['fps'] - base['fps']) / base['fps'] * 100 if base['fps'] else 0.0
+            print(f"  {name:<9} {res:<6} {base['fps']:>9.1f} -> {result['fps']:>9.1f} fps ({change:+.1f}%)")
+            for stage, stats in result['stages'].items():
+                base_stats = base['stages'].get(stage)
+                if base_stats and 'p50_ms' in stats and 'p50_ms' in base_stats:
+                    print(f"      {stage:<24} p50 {base_stats['p50_ms']:>8.3f} -> {stats['p50_ms']:>8.3f} ms")
+            regressions.append((name, res, change))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pose pipeline on synthetic or recorded frames")
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(DEFAULT_BENCHMARKS),
+                        help="Benchmarks to run (default: pipeline scoring mjpeg; hybrid loads the HF model)")
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument('--video', help="Recorded video to replay instead of the synthetic fixture")
+    parser.add_argument('--frames', type=int, default=120, help="Frames per run (default: 120)")
+    parser.add_argument('--warmup', type=int, default=10, help="Unmeasured warm-up frames (default: 10)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic fixture")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON file to compare against")
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help="Exit with status 1 if any FPS drops by more than this percentage vs --compare")
+    return parser.parse_args(argv)
+
+
+def run_bench(name, res, video, frame_count, warmup, seed):
+    """
+    Load the fixture and run one benchmark. Called in a fresh process per
+    bench so peak RSS (a process-wide high-water mark) only covers this run.
+    """
+    cv2.setRNGSeed(seed)
+    width, height = RESOLUTIONS[res]
+    if video:
+        frames = recorded_frames(video, width, height, frame_count)
+    else:
+        frames = synthetic_frames(width, height, frame_count, seed)
+    fixture_rss = peak_rss_mb()
+    try:
+        result = BENCH_FUNCTIONS[name](frames, min(warmup, len(frames)))
+    except ImportError as e:
+        result = {'skipped': f"missing dependency: {str(e)}"}
+    except Exception as e:
+        result = {'error': str(e)}
+    result['peak_rss_mb'] = peak_rss_mb()
+    # Memory the bench itself added on top of the interpreter and fixture frames
+    if result['peak_rss_mb'] is not None and fixture_rss is not None:
+        result['bench_rss_mb'] = round(result['peak_rss_mb'] - fixture_rss, 1)
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    context = multiprocessing.get_context('spawn')
+
+    for res in args.resolutions:
+        for name in args.benchmarks:
+            print(f"Running {name} at {res} ({args.frames} frames)...")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_bench, name, res, args.video, args.frames,
+                                         args.warmup, args.seed).result()
+            results.setdefault(name, {})[res] = result
+
+            if 'fps' in result:
+                print(f"  {result['fps']:.1f} fps, peak RSS {result['peak_rss_mb']} MB "
+                      f"({result.get('bench_rss_mb')} MB above the fixture)")
+                for stage, stats in result['stages'].items():
+                    print(f"    {stage:<24} p50 {stats['p50_ms']:>8.3f}  p95 {stats['p95_ms']:>8.3f}  "
+                          f"p99 {stats['p99_ms']:>8.3f} ms")
+            else:
+                print(f"  {result.get('skipped') or result.get('error')}")
+
+    report = {
+        'environment': environment(),
+        'fixture': {'video': args.video} if args.video else {'synthetic': list(SYNTHETIC_IMAGES), 'seed': args.seed},
+        'frames': args.frames,
+        'warmup': args.warmup,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline)
+        if args.max_regression is not None:
+            worst = [r for r in regressions if r[2] < -args.max_regression]
+            if worst:
+                print(f"\nFPS regressions beyond {args.max_regression}%: "
+                      + ", ".join(f"{name} {res} ({change:+.1f}%)" for name, res, change in worst))
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
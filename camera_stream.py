@@ -0,0 +1,174 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size ring of preallocated frames shared between one capture thread
+    and any number of consumers. The writer never blocks: when consumers fall
+    behind, the oldest unread frames are overwritten and counted as dropped.
+    """
+    def __init__(self, capacity=3):
+        if capacity < 2:
+            raise ValueError("FrameRingBuffer needs at least 2 slots")
+        self.capacity = capacity
+        self.slots = None          # np.ndarray of shape (capacity, h, w, c), allocated on first frame
+        self.write_seq = 0         # Sequence number of the newest frame (0 = no frame yet)
+        self.last_read_seq = 0     # Newest sequence number handed to any consumer
+        self.frames_captured = 0
+        self.frames_consumed = 0
+        self.frames_dropped = 0
+        self._cond = threading.Condition(threading.RLock())
+
+    def allocate(self, shape, dtype=np.uint8):
+        """(Re)allocate the slots for a new frame shape, e.g. after a resolution change"""
+        with self._cond:
+            if self.slots is None or self.slots.shape[1:] != tuple(shape) or self.slots.dtype != dtype:
+                self.slots = np.empty((self.capacity,) + tuple(shape), dtype=dtype)
+            return self.slots
+
+    def next_slot(self):
+        """Return the slot the writer should fill next (never the newest published frame)"""
+        return self.slots[(self.write_seq + 1) % self.capacity]
+
+    def publish(self):
+        """Mark the slot returned by next_slot() as the newest frame"""
+        with self._cond:
+            self.write_seq += 1
+            self.frames_captured += 1
+            self._cond.notify_all()
+
+    def publish_frame(self, frame):
+        """Copy a frame that was not captured in place, resizing the ring if needed"""
+        with self._cond:
+            self.allocate(frame.shape, frame.dtype)
+            np.copyto(self.next_slot(), frame)
+            self.publish()
+
+    def read_latest(self, after_seq=0, out=None, timeout=1.0):
+        """
+        Copy the newest frame into `out` (allocated if None) once a frame newer
+        than `after_seq` is available. Frames between `after_seq` and the newest
+        one are skipped. Returns (seq, frame) or (0, None) on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.write_seq <= after_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if self.write_seq <= after_seq:
+                        return 0, None
+            seq = self.write_seq
+            latest = self.slots[seq % self.capacity]
+            if out is None or out.shape != latest.shape or out.dtype != latest.dtype:
+                out = np.empty_like(latest)
+            np.copyto(out, latest)
+            if seq > self.last_read_seq:
+                # Frames published between two reads were never handed out
+                if self.last_read_seq > 0:
+                    self.frames_dropped += seq - self.last_read_seq - 1
+                self.last_read_seq = seq
+                self.frames_consumed += 1
+            return seq, out
+
+    def stats(self):
+        """Return capture/consume/drop counters"""
+        with self._cond:
+            return {
+                'captured': self.frames_captured,
+                'consumed': self.frames_consumed,
+                'dropped': self.frames_dropped,
+                'capacity': self.capacity,
+            }
+
+
+class CameraStream:
+    """
+    Drains an OpenCV VideoCapture on a dedicated thread into a FrameRingBuffer
+    so that slow inference never lets the driver queue fill up. Consumers always
+    receive the newest frame; stale ones are dropped.
+
+    Exposes a cv2.VideoCapture-like read()/set()/isOpened() so it can replace
+    `cap` in the frame generators without restructuring them.
+    """
+    def __init__(self, cap, capacity=3, name="CameraCaptureThread"):
+        self.cap = cap
+        self.buffer = FrameRingBuffer(capacity)
+        self.name = name
+        self.running = False
+        self.thread = None
+        self._last_seq = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the capture thread if it is not already running"""
+        with self._lock:
+            if self.running:
+                return self
+            self.running = True
+            self.thread = threading.Thread(target=self._capture_loop, name=self.name, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the capture thread (the underlying VideoCapture is left open)"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+
+    def _capture_loop(self):
+        while self.running:
+            if self.cap is None or not self.cap.isOpened():
+                time.sleep(0.5)
+                continue
+
+            slot = self.buffer.next_slot() if self.buffer.slots is not None else None
+            success, frame = self.cap.read(slot) if slot is not None else self.cap.read()
+            if not success or frame is None:
+                time.sleep(0.01)
+                continue
+
+            if frame is slot:
+                self.buffer.publish()
+            else:
+                # First frame or a resolution change: size the ring to the camera output
+                self.buffer.publish_frame(frame)
+
+    def read(self, out=None, timeout=1.0):
+        """
+        cv2.VideoCapture.read() replacement for a single consumer: returns
+        (success, frame) with the newest frame not yet returned by this method.
+        """
+        if not self.running:
+            self.start()
+        seq, frame = self.buffer.read_latest(self._last_seq, out=out, timeout=timeout)
+        if frame is None:
+            return False, None
+        self._last_seq = seq
+        return True, frame
+
+    def read_latest(self, after_seq=0, out=None, timeout=1.0):
+        """Multi-consumer read: each consumer tracks its own last sequence number"""
+        if not self.running:
+            self.start()
+        return self.buffer.read_latest(after_seq, out=out, timeout=timeout)
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def set(self, prop_id, value):
+        return self.cap.set(prop_id, value)
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def release(self):
+        self.stop()
+        if self.cap is not None:
+            self.cap.release()
+
+    def stats(self):
+        return self.buffer.stats()
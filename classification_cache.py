@@ -0,0 +1,150 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ClassificationCache:
+    """
+    LRU cache of classification results keyed by a hash of the image content,
+    so classifying the same reference image again never touches the model.
+
+    Keys include a namespace (e.g. model name and variant) so results from
+    different models never mix. With a `path`, entries are persisted as JSON
+    (written atomically, at most every `save_interval` seconds off the caller's
+    thread, and at exit) and reloaded on the next start.
+    """
+    def __init__(self, max_entries=512, path=None, namespace='', save_interval=30.0):
+        self.max_entries = max_entries
+        self.path = path
+        self.namespace = namespace
+        self.save_interval = save_interval
+        self._entries = OrderedDict()
+        self._file_keys = OrderedDict()    # path -> (mtime, size, key), to skip rehashing unchanged files
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self._load()
+            atexit.register(self.save)
+
+    def key_for_bytes(self, data):
+        """Cache key for encoded image bytes or a numpy array's raw buffer"""
+        digest = hashlib.sha256()
+        digest.update(self.namespace.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def key_for_file(self, file_path):
+        """Cache key for an image file, from its content (rehashed only when the file changes)"""
+        stat = os.stat(file_path)
+        with self._lock:
+            known = self._file_keys.get(file_path)
+        if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            return known[2]
+        with open(file_path, 'rb') as f:
+            key = self.key_for_bytes(f.read())
+        with self._lock:
+            self._file_keys[file_path] = (stat.st_mtime_ns, stat.st_size, key)
+            self._file_keys.move_to_end(file_path)
+            while len(self._file_keys) > self.max_entries:
+                self._file_keys.popitem(last=False)
+        return key
+
+    def get(self, key):
+        """Return a copy of the cached result, or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key, result):
+        """Store a result dict, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+            if self.path and self._save_timer is None:
+                # Batch writes: one background save per interval instead of one per miss
+                self._save_timer = threading.Timer(self.save_interval, self._timed_save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _timed_save(self):
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._file_keys.clear()
+            self._dirty = True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            if stored.get('namespace') != self.namespace:
+                print(f"Ignoring classification cache {self.path} from a different model")
+                return
+            for key, result in stored.get('entries', [])[-self.max_entries:]:
+                self._entries[key] = result
+            print(f"Loaded {len(self._entries)} cached classifications from {self.path}")
+        except Exception as e:
+            print(f"Error loading classification cache: {str(e)}")
+
+    def save(self):
+        """Write the cache to `path` (atomically) if it changed"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = list(self._entries.items())
+            self._dirty = False
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'namespace': self.namespace, 'entries': entries}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving classification cache: {str(e)}")
+            with self._lock:
+                self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
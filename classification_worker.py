@@ -0,0 +1,203 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class ClassificationWorker:
+    """
+    Runs a pose classifier (anything with classify_image(frame) -> (pose, confidence))
+    on a background thread so the video stream never waits for a forward pass.
+
+    The frame loop calls submit() every frame; it returns immediately and only
+    copies the frame when the worker is idle and a new classification is due.
+    The worker always classifies the newest submitted frame.
+
+    The interval between classifications adapts to the measured model latency
+    (the model is kept busy for at most `duty_cycle` of the time), and frames
+    are skipped while the body is still, down to one every `still_interval`
+    seconds. Motion is measured from pose landmarks when they are given, or
+    from a small grayscale thumbnail of the frame otherwise.
+    """
+    def __init__(self, classifier, min_interval=0.1, max_interval=2.0, duty_cycle=0.5,
+                 motion_threshold=0.01, still_interval=1.5, name="ClassificationWorker"):
+        self.classifier = classifier
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.duty_cycle = duty_cycle
+        self.motion_threshold = motion_threshold
+        self.still_interval = still_interval
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._pending = None          # Frame waiting to be classified (reused buffer)
+        self._working = None          # Frame being classified (swapped with _pending)
+        self._pending_seq = 0
+        self._busy = False
+        self._running = False
+        self._thread = None
+
+        self._last_submit_time = 0.0
+        self._last_landmarks = None   # Landmarks (x, y) of the last classified frame
+        self._last_thumbnail = None   # 32x32 grayscale thumbnail of the last classified frame
+        self._thumbnail = np.empty((32, 32), dtype=np.uint8)
+
+        self.latency_ewma = None      # Smoothed seconds per classification
+        self._result = None
+        self._result_seq = 0
+        self._polled_seq = 0
+
+        # Counters for debugging the scheduler
+        self.classified = 0
+        self.skipped_still = 0
+
+    def start(self):
+        """Start the worker thread if it is not already running"""
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the worker thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @property
+    def interval(self):
+        """Current minimum time between classifications"""
+        if self.latency_ewma is None:
+            return self.min_interval
+        return min(self.max_interval, max(self.min_interval, self.latency_ewma / self.duty_cycle))
+
+    def _motion(self, frame, landmarks):
+        """Motion between `frame` and the last classified frame (0 = identical)"""
+        if landmarks is not None:
+            points = np.asarray(landmarks, dtype=np.float32)[:, :2]
+            if self._last_landmarks is None or self._last_landmarks.shape != points.shape:
+                return float('inf')
+            # Mean landmark displacement in normalized image coordinates
+            return float(np.abs(points - self._last_landmarks).mean())
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        cv2.resize(gray, (32, 32), dst=self._thumbnail, interpolation=cv2.INTER_AREA)
+        if self._last_thumbnail is None:
+            return float('inf')
+        return float(cv2.absdiff(self._thumbnail, self._last_thumbnail).mean()) / 255.0
+
+    def _remember_motion_reference(self, frame, landmarks):
+        """Keep the landmarks / thumbnail of the frame that is about to be classified"""
+        if landmarks is not None:
+            self._last_landmarks = np.array(landmarks, dtype=np.float32)[:, :2]
+            return
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if self._last_thumbnail is None:
+            self._last_thumbnail = np.empty((32, 32), dtype=np.uint8)
+        cv2.resize(gray, (32, 32), dst=self._last_thumbnail, interpolation=cv2.INTER_AREA)
+
+    def submit(self, frame, landmarks=None, force=False):
+        """
+        Offer the newest frame for classification.
+
+        Args:
+            frame: BGR image (copied if accepted, so the caller may reuse it)
+            landmarks: optional (33, >=2) normalized landmarks used for motion gating
+            force: classify as soon as the worker is idle, ignoring the schedule
+
+        Returns:
+            True if the frame was queued for classification
+        """
+        if frame is None or frame.size == 0:
+            return False
+        if not self._running:
+            self.start()
+
+        now = time.monotonic()
+        with self._cond:
+            if self._busy and not force:
+                return False
+            elapsed = now - self._last_submit_time
+            if elapsed < self.interval and not force:
+                return False
+
+            if not force and elapsed < self.still_interval:
+                if self._motion(frame, landmarks) < self.motion_threshold:
+                    self.skipped_still += 1
+                    return False
+
+            if self._pending is None or self._pending.shape != frame.shape or self._pending.dtype != frame.dtype:
+                self._pending = np.empty_like(frame)
+            np.copyto(self._pending, frame)
+            self._remember_motion_reference(frame, landmarks)
+            self._pending_seq += 1
+            self._last_submit_time = now
+            self._cond.notify_all()
+            return True
+
+    def _run(self):
+        handled_seq = 0
+        while True:
+            with self._cond:
+                while self._running and self._pending_seq == handled_seq:
+                    self._cond.wait(0.5)
+                if not self._running:
+                    return
+                handled_seq = self._pending_seq
+                # Swap buffers so submit() can fill the next frame while we classify this one
+                self._pending, self._working = self._working, self._pending
+                self._busy = True
+
+            start = time.perf_counter()
+            try:
+                pose, confidence = self.classifier.classify_image(self._working)
+            except Exception as e:
+                print(f"Error in {self.name}: {str(e)}")
+                pose, confidence = "unknown", 0.0
+            latency = time.perf_counter() - start
+
+            with self._cond:
+                self._busy = False
+                if self.latency_ewma is None:
+                    self.latency_ewma = latency
+                else:
+                    self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+                self._result_seq += 1
+                self._result = {
+                    'pose': pose,
+                    'confidence': confidence,
+                    'latency': latency,
+                    'timestamp': time.time(),
+                    'seq': self._result_seq,
+                }
+                self.classified += 1
+
+    def poll(self):
+        """Return the newest result not yet returned by poll(), or None"""
+        with self._cond:
+            if self._result_seq == self._polled_seq:
+                return None
+            self._polled_seq = self._result_seq
+            return dict(self._result)
+
+    def latest(self):
+        """Return the newest result (even if already polled), or None"""
+        with self._cond:
+            return dict(self._result) if self._result is not None else None
+
+    def stats(self):
+        """Return scheduler counters"""
+        with self._cond:
+            return {
+                'classified': self.classified,
+                'skipped_still': self.skipped_still,
+                'latency_ewma': self.latency_ewma,
+                'interval': self.interval,
+            }
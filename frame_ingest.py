@@ -0,0 +1,139 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from pose_reference import PoseReferenceTable, PART_NAMES
+
+
+class DetectorPool:
+    """
+    Fixed-size pool of pose detectors shared by all ingest connections.
+    Detectors are created lazily, up to `size`, and handed out one per frame.
+    """
+    def __init__(self, factory, size=2):
+        self.factory = factory
+        self.size = size
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Borrow a detector for the duration of the with-block"""
+        try:
+            detector = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    detector = self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                detector = self._idle.get(timeout=timeout)
+        try:
+            yield detector
+        finally:
+            self._idle.put(detector)
+
+
+def decode_frame(data):
+    """
+    Decode a JPEG/WebP/PNG message into a BGR frame, or return None if the
+    bytes are not a valid image. The message bytes are wrapped without copying.
+
+    The decoded frame itself is a fresh array: the Python binding of cv2.imdecode
+    takes no destination, so there is no pooled buffer to decode into.
+    """
+    if not data:
+        return None
+    buf = np.frombuffer(data, dtype=np.uint8)
+    frame = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    if frame is None or frame.size == 0:
+        return None
+    return frame
+
+
+class FrameIngestor:
+    """
+    Server-side inference for frames pushed by clients (browser webcams) instead
+    of a server-attached camera. Each frame is decoded, run through a pooled
+    PoseDetector on a worker thread and turned into a JSON-ready result with
+    landmarks, joint angles and per-part accuracy against the selected pose.
+
+    Pooled detectors serve many clients, so the factory should create them in
+    static image mode (no tracking state carried between frames).
+    """
+    def __init__(self, detector_factory, angle_data, pool_size=2):
+        self.pool = DetectorPool(detector_factory, pool_size)
+        self.reference_table = PoseReferenceTable(angle_data)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="FrameIngest")
+        self.frames_processed = 0
+        self.frames_rejected = 0
+        self._stats_lock = threading.Lock()   # Counters are bumped from several executor threads
+
+    def _count(self, rejected=False):
+        with self._stats_lock:
+            if rejected:
+                self.frames_rejected += 1
+            else:
+                self.frames_processed += 1
+
+    def analyze(self, data, pose_name='vrksana'):
+        """Decode one encoded frame and run pose detection on it (blocking)"""
+        frame = decode_frame(data)
+        if frame is None:
+            self._count(rejected=True)
+            return {"error": "Could not decode frame"}
+
+        h, w = frame.shape[:2]
+        with self.pool.acquire() as detector:
+            detector.findPose(frame, draw=False)
+            # Passing the frame also fills the pixel coordinates the angles are computed from
+            landmarks = detector.getLandmarkArray(frame)
+            angles = detector.findAngles(named=False) if landmarks is not None else None
+            if angles is None:
+                self._count()
+                return {"detected": False, "width": w, "height": h}
+            landmarks = landmarks.tolist()
+
+        part_angles = np.trunc(angles[:len(PART_NAMES)])
+        accuracy, within_tolerance = self.reference_table.score(pose_name, part_angles)
+        valid = accuracy[accuracy > 0]
+        self._count()
+
+        return {
+            "detected": True,
+            "width": w,
+            "height": h,
+            "pose": pose_name,
+            "landmarks": landmarks,   # 33 x [x, y, z, visibility], normalized
+            "angles": dict(zip(PART_NAMES, part_angles.tolist())),
+            "accuracy": dict(zip(PART_NAMES, accuracy.tolist())),
+            "within_tolerance": dict(zip(PART_NAMES, within_tolerance.tolist())),
+            "overall_accuracy": float(valid.mean()) if valid.size else 0.0
+        }
+
+    async def analyze_async(self, data, pose_name='vrksana'):
+        """analyze() on the ingest thread pool so the event loop keeps serving other sockets"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.analyze, data, pose_name)
+
+    def stats(self):
+        with self._stats_lock:
+            processed, rejected = self.frames_processed, self.frames_rejected
+        return {
+            'processed': processed,
+            'rejected': rejected,
+            'pool_size': self.pool.size,
+        }
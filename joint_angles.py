@@ -0,0 +1,72 @@
+import numpy as np
+
+# Declarative joint table: (name, p1, p2, p3) with the angle measured at p2,
+# using MediaPipe Pose landmark indices. Order matters - it is the column order
+# of every angle array returned by JointAngleEngine.
+JOINT_ANGLES = (
+    ('right_arm', 12, 14, 16),   # shoulder - elbow - wrist
+    ('left_arm', 11, 13, 15),
+    ('right_leg', 24, 26, 28),   # hip - knee - ankle
+    ('left_leg', 23, 25, 27),
+)
+
+# Additional joints available without any extra per-joint Python work
+EXTENDED_JOINT_ANGLES = JOINT_ANGLES + (
+    ('right_shoulder', 14, 12, 24),  # elbow - shoulder - hip
+    ('left_shoulder', 13, 11, 23),
+    ('right_hip', 12, 24, 26),       # shoulder - hip - knee
+    ('left_hip', 11, 23, 25),
+)
+
+
+class JointAngleEngine:
+    """
+    Computes every joint angle in a table with a single vectorized np.arctan2
+    call, for one frame of landmarks (N, 2) or a batch of frames (F, N, 2).
+
+    Angles follow PoseDetector.findAngle: degrees in [0, 360), measured from
+    the p2->p1 ray to the p2->p3 ray.
+    """
+    def __init__(self, joints=JOINT_ANGLES):
+        self.joints = tuple(joints)
+        self.names = tuple(joint[0] for joint in self.joints)
+        index = np.array([joint[1:] for joint in self.joints], dtype=np.intp)
+        self._ends = index[:, [2, 0]]    # (J, 2): p3 and p1 for each joint
+        self._vertex = index[:, 1]       # (J,): p2 for each joint
+        self.max_index = int(index.max())
+        # Structured dtype so results can be read by joint name
+        self.dtype = np.dtype([(name, np.float64) for name in self.names])
+
+    def __len__(self):
+        return len(self.names)
+
+    def compute(self, points):
+        """
+        Return a float64 array of shape (..., J) with one angle per joint.
+
+        Args:
+            points: array of shape (..., N, 2) with x, y landmark coordinates.
+                    Extra trailing columns (z, visibility) are ignored.
+        """
+        points = np.asarray(points, dtype=np.float64)[..., :2]
+        # (..., J, 2, 2): for every joint, the p2->p3 and p2->p1 vectors
+        vectors = points[..., self._ends, :] - points[..., self._vertex, :][..., None, :]
+        theta = np.arctan2(vectors[..., 1], vectors[..., 0])
+        angles = np.degrees(theta[..., 0] - theta[..., 1])
+        return np.mod(angles, 360.0, out=angles)
+
+    def named(self, angles):
+        """View a (..., J) angle array as a structured array indexed by joint name"""
+        return np.ascontiguousarray(angles, dtype=np.float64).view(self.dtype)[..., 0]
+
+    def compute_named(self, points):
+        """compute() returning a named (structured) array, e.g. result['right_arm']"""
+        return self.named(self.compute(points))
+
+    def as_dict(self, angles):
+        """Convert the angles of a single frame into a {joint_name: angle} dict"""
+        return dict(zip(self.names, np.asarray(angles, dtype=np.float64).tolist()))
+
+
+# Shared engine for the four joints scored against data.py AngleData
+DEFAULT_ENGINE = JointAngleEngine()
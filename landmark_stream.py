@@ -0,0 +1,98 @@
+import struct
+import time
+
+import numpy as np
+
+# Binary per-frame result packet (little-endian), ~300 bytes instead of a JPEG frame:
+#
+#   header      magic b'NYLM', version, flags (bit 0 = person detected),
+#               landmark count, part count, sequence number, timestamp (s),
+#               overall accuracy (hundredths of a percent), breathing phase
+#               (1 = inhale, 0 = exhale), breathing progress (0-100)
+#   landmarks   int16[landmark count, 4]: x, y, z, visibility * LANDMARK_SCALE
+#   angles      int16[part count]: joint angles in tenths of a degree
+#   accuracies  uint16[part count]: per-part accuracy in hundredths of a percent
+PACKET_MAGIC = b'NYLM'
+PACKET_VERSION = 1
+HEADER = struct.Struct('<4sBBBBIdHBB')
+LANDMARK_SCALE = 10000    # Normalized coordinates in [-3.27, 3.27] fit in int16
+ANGLE_SCALE = 10          # Tenths of a degree
+ACCURACY_SCALE = 100      # Hundredths of a percent
+
+FLAG_DETECTED = 0x01
+
+# Explicit little-endian wire types, so big-endian hosts still write the documented layout
+WIRE_INT16 = np.dtype('<i2')
+WIRE_UINT16 = np.dtype('<u2')
+
+
+def _quantize(values, scale, dtype):
+    info = np.iinfo(dtype)
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * scale)
+    return np.clip(scaled, info.min, info.max).astype(dtype)
+
+
+def encode_frame_result(seq, landmarks=None, angles=None, accuracies=None, overall_accuracy=0.0,
+                        breathing_info=None, timestamp=None):
+    """
+    Pack one frame's pose result into a compact binary packet.
+
+    Args:
+        seq: frame sequence number
+        landmarks: (N, 4) normalized x, y, z, visibility, or None if nobody was detected
+        angles: per-part joint angles in degrees (e.g. PART_NAMES order)
+        accuracies: per-part accuracy percentages, same order as angles
+        overall_accuracy: overall accuracy percentage
+        breathing_info: dict from PoseDetector.getBreathingInfo()
+        timestamp: seconds since the epoch (defaults to now)
+    """
+    detected = landmarks is not None
+    lm = _quantize(landmarks, LANDMARK_SCALE, WIRE_INT16) if detected else np.zeros((0, 4), dtype=WIRE_INT16)
+    ang = _quantize(angles if angles is not None else [], ANGLE_SCALE, WIRE_INT16)
+    acc = _quantize(accuracies if accuracies is not None else np.zeros(len(ang)), ACCURACY_SCALE, WIRE_UINT16)
+    if len(acc) != len(ang):
+        raise ValueError("angles and accuracies must have the same length")
+
+    breathing_info = breathing_info or {}
+    header = HEADER.pack(
+        PACKET_MAGIC,
+        PACKET_VERSION,
+        FLAG_DETECTED if detected else 0,
+        lm.shape[0],
+        len(ang),
+        seq & 0xFFFFFFFF,
+        time.time() if timestamp is None else timestamp,
+        int(_quantize(overall_accuracy, ACCURACY_SCALE, np.uint16)),
+        1 if breathing_info.get('is_inhaling', True) else 0,
+        int(min(100, max(0, breathing_info.get('progress', 0))))
+    )
+    return b''.join((header, lm.tobytes(), ang.tobytes(), acc.tobytes()))
+
+
+def decode_frame_result(data):
+    """Unpack a packet from encode_frame_result() into a dict of floats / arrays"""
+    (magic, version, flags, num_landmarks, num_parts, seq, timestamp,
+     accuracy, inhaling, breathing_progress) = HEADER.unpack_from(data, 0)
+    if magic != PACKET_MAGIC:
+        raise ValueError("Not a landmark packet")
+    if version != PACKET_VERSION:
+        raise ValueError(f"Unsupported landmark packet version {version}")
+
+    offset = HEADER.size
+    lm = np.frombuffer(data, dtype=WIRE_INT16, count=num_landmarks * 4, offset=offset).reshape(num_landmarks, 4)
+    offset += lm.nbytes
+    angles = np.frombuffer(data, dtype=WIRE_INT16, count=num_parts, offset=offset)
+    offset += angles.nbytes
+    accuracies = np.frombuffer(data, dtype=WIRE_UINT16, count=num_parts, offset=offset)
+
+    return {
+        'seq': seq,
+        'timestamp': timestamp,
+        'detected': bool(flags & FLAG_DETECTED),
+        'landmarks': lm.astype(np.float32) / LANDMARK_SCALE if flags & FLAG_DETECTED else None,
+        'angles': angles.astype(np.float64) / ANGLE_SCALE,
+        'accuracies': accuracies.astype(np.float64) / ACCURACY_SCALE,
+        'overall_accuracy': accuracy / ACCURACY_SCALE,
+        'is_inhaling': bool(inhaling),
+        'breathing_progress': breathing_progress,
+    }
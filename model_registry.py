@@ -0,0 +1,170 @@
+import threading
+import time
+import traceback
+
+import cv2
+import numpy as np
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a component is still loading (or failed to load)"""
+    pass
+
+
+class _Entry:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.load_time = None
+        self.ready = threading.Event()
+        self.callbacks = []
+
+
+class ModelRegistry:
+    """
+    Loads heavy components (camera, MediaPipe, the Hugging Face classifier,
+    the audio mixer) on background threads so the web server can bind and
+    answer health checks right away.
+
+    Each component is registered with a loader function. warm_up() starts all
+    loaders in parallel; get() waits for one (starting it if needed) and
+    get_nowait() returns None while it is still loading.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        """Register a loader() for a component; it runs at most once"""
+        with self._lock:
+            self._entries[name] = _Entry(name, loader)
+
+    def _entry(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown component: {name}")
+        return entry
+
+    def _load(self, entry):
+        start = time.perf_counter()
+        try:
+            value = entry.loader()
+        except Exception as e:
+            print(f"Error loading {entry.name}: {str(e)}")
+            traceback.print_exc()
+            with self._lock:
+                entry.state = FAILED
+                entry.error = str(e)
+                entry.load_time = time.perf_counter() - start
+                callbacks, entry.callbacks = entry.callbacks, []
+            entry.ready.set()
+            return
+
+        with self._lock:
+            entry.value = value
+            entry.state = READY
+            entry.load_time = time.perf_counter() - start
+            callbacks, entry.callbacks = entry.callbacks, []
+        entry.ready.set()
+        print(f"Loaded {entry.name} in {entry.load_time:.1f}s")
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"Error in {entry.name} ready callback: {str(e)}")
+
+    def start(self, name):
+        """Start loading a component in the background (no-op if already started)"""
+        with self._lock:
+            entry = self._entry(name)
+            if entry.state != PENDING:
+                return
+            entry.state = LOADING
+        threading.Thread(target=self._load, args=(entry,), name=f"Load-{name}", daemon=True).start()
+
+    def warm_up(self, names=None):
+        """Start loading every component (or the given ones) in parallel"""
+        for name in (names or list(self._entries)):
+            self.start(name)
+        return self
+
+    def get(self, name, timeout=None):
+        """Return a component, waiting up to `timeout` seconds for it to load"""
+        self.start(name)
+        entry = self._entry(name)
+        if not entry.ready.wait(timeout):
+            raise ModelNotReadyError(f"{name} is still loading")
+        if entry.state == FAILED:
+            raise ModelNotReadyError(f"{name} failed to load: {entry.error}")
+        return entry.value
+
+    def get_nowait(self, name):
+        """Return a component if it is loaded, otherwise start loading it and return None"""
+        self.start(name)
+        entry = self._entry(name)
+        return entry.value if entry.state == READY else None
+
+    def when_ready(self, name, callback):
+        """Call callback(component) once it is loaded (immediately if it already is)"""
+        self.start(name)
+        with self._lock:
+            entry = self._entry(name)
+            if entry.state == FAILED:
+                return
+            if entry.state != READY:
+                entry.callbacks.append(callback)
+                return
+        callback(entry.value)
+
+    def is_ready(self, *names):
+        """True once all the given components (default: all) are loaded"""
+        with self._lock:
+            entries = [self._entry(n) for n in names] if names else list(self._entries.values())
+            return all(entry.state == READY for entry in entries)
+
+    def status(self):
+        """Per-component state, error and load time for health checks"""
+        with self._lock:
+            return {
+                name: {
+                    'state': entry.state,
+                    'error': entry.error,
+                    'load_time': round(entry.load_time, 3) if entry.load_time is not None else None,
+                }
+                for name, entry in self._entries.items()
+            }
+
+
+def loading_frame(text, width=640, height=480):
+    """JPEG placeholder shown in video streams while models load"""
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+    cv2.putText(img, text, ((width - tw) // 2, (height + th) // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                0.8, (255, 255, 255), 2, cv2.LINE_AA)
+    return cv2.imencode('.jpg', img)[1].tobytes()
+
+
+def loading_stream(registry, names, then, interval=0.5, text="Loading models, please wait..."):
+    """
+    MJPEG chunks of a placeholder frame until the named components are ready,
+    then the chunks of then() (e.g. the real video stream).
+    """
+    chunk = (b'--frame\r\n'
+             b'Content-Type: image/jpeg\r\n\r\n' + loading_frame(text) + b'\r\n')
+    registry.warm_up(names)
+    while not registry.is_ready(*names):
+        if any(registry.status()[name]['state'] == FAILED for name in names):
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + loading_frame("Failed to load models") + b'\r\n')
+            return
+        yield chunk
+        time.sleep(interval)
+    yield from then()
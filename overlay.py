@@ -0,0 +1,115 @@
+import cv2
+import numpy as np
+
+
+class OverlayCompositor:
+    """
+    Composites a camera frame with a UI band above or below it.
+
+    Output canvases are preallocated once per (height, width, band, position)
+    and reused every frame, and the static chrome of each band (background,
+    boxes, fixed labels) is rendered once and cached, so a frame only costs
+    one copy of the camera image plus the dynamic drawing (bar fill, text).
+
+    The returned canvas is reused on the next call with the same size, so it
+    must be consumed (encoded or displayed) before the next frame is composed.
+    """
+    def __init__(self, max_cached_chrome=64):
+        self.max_cached_chrome = max_cached_chrome
+        self._canvases = {}   # (h, w, band, position) -> canvas
+        self._chrome = {}     # (w, band, chrome_key) -> pre-rendered band
+
+    def canvas(self, h, w, band, position='bottom'):
+        """
+        Return (canvas, frame_region, band_region) for the given output size.
+        Callers may draw directly into frame_region to avoid the frame copy.
+        """
+        key = (h, w, band, position)
+        canvas = self._canvases.get(key)
+        if canvas is None:
+            canvas = np.zeros((h + band, w, 3), dtype=np.uint8)
+            self._canvases[key] = canvas
+        if position == 'top':
+            return canvas, canvas[band:], canvas[:band]
+        return canvas, canvas[:h], canvas[h:]
+
+    def _get_chrome(self, w, band, chrome_key, draw_chrome):
+        key = (w, band, chrome_key)
+        chrome = self._chrome.get(key)
+        if chrome is None:
+            if len(self._chrome) >= self.max_cached_chrome:
+                self._chrome.clear()
+            chrome = np.zeros((band, w, 3), dtype=np.uint8)
+            draw_chrome(chrome)
+            self._chrome[key] = chrome
+        return chrome
+
+    def compose(self, frame, band, chrome_key, draw_chrome, position='bottom'):
+        """
+        Place `frame` on a reusable canvas with a `band`-pixel UI strip.
+
+        Args:
+            frame: BGR image to show
+            band: height of the UI strip in pixels
+            chrome_key: hashable id of the static chrome (e.g. ('breathing', pose, phase))
+            draw_chrome: callable(band_img) that renders the static chrome; only
+                         called the first time a chrome_key is seen for this width
+            position: 'top' or 'bottom'
+
+        Returns:
+            (canvas, band_region) - draw dynamic elements into band_region using
+            coordinates relative to the top-left corner of the band
+        """
+        h, w = frame.shape[:2]
+        canvas, frame_region, band_region = self.canvas(h, w, band, position)
+
+        # Skip the copy when the caller already rendered into the canvas
+        if frame.ctypes.data != frame_region.ctypes.data:
+            np.copyto(frame_region, frame)
+
+        np.copyto(band_region, self._get_chrome(w, band, chrome_key, draw_chrome))
+        return canvas, band_region
+
+    def completion_banner(self, frame, text="Pose Completed!"):
+        """Frame with a 100px green 'Pose Completed!' band underneath"""
+        w = frame.shape[1]
+
+        def draw_chrome(band_img):
+            cv2.rectangle(band_img, (0, 0), (w, 100), (0, 200, 0), -1)
+            font = cv2.FONT_HERSHEY_DUPLEX
+            text_size = cv2.getTextSize(text, font, 1.5, 2)[0]
+            text_x = (w - text_size[0]) // 2
+            cv2.putText(band_img, text, (text_x, 60), font, 1.5, (255, 255, 255), 2)
+
+        canvas, _ = self.compose(frame, 100, ('completion', text), draw_chrome)
+        return canvas
+
+    def progress_banner(self, frame, progress, text):
+        """
+        Frame with a 60px hold-progress band underneath.
+
+        Args:
+            progress: percentage in [0, 100]
+            text: status line drawn above the bar
+        """
+        w = frame.shape[1]
+        bar_height = 20
+        bar_y = 20
+        bar_width = int(w * 0.8)
+        bar_x = (w - bar_width) // 2
+
+        def draw_chrome(band_img):
+            # Dark background and empty bar
+            cv2.rectangle(band_img, (0, 0), (w, 60), (50, 50, 50), -1)
+            cv2.rectangle(band_img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (200, 200, 200), -1)
+
+        canvas, band_img = self.compose(frame, 60, ('progress',), draw_chrome)
+
+        # Filled portion
+        filled_width = int(bar_width * (progress / 100))
+        cv2.rectangle(band_img, (bar_x, bar_y), (bar_x + filled_width, bar_y + bar_height), (0, 255, 0), -1)
+
+        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 1)[0]
+        text_x = (w - text_size[0]) // 2
+        cv2.putText(band_img, text, (text_x, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1, cv2.LINE_AA, False)
+        return canvas
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import numpy as np
+
+
+class StageHistogram:
+    """Rolling window of the last `window` durations (seconds) for one pipeline stage"""
+    def __init__(self, window=1000):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.count = 0          # Total samples ever recorded
+        self.total = 0.0        # Sum of all samples ever recorded
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        """Count and latency percentiles in milliseconds over the window"""
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if filled.size == 0:
+            return {'count': 0}
+        p50, p95, p99 = np.percentile(filled, (50, 95, 99)) * 1000
+        return {
+            'count': self.count,
+            'mean_ms': round(float(filled.mean()) * 1000, 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class PipelineMetrics:
+    """
+    Per-stage latency for the frame pipeline, aggregated into rolling
+    histograms (p50/p95/p99) plus a frame rate.
+
+    Timing is done with monotonic perf_counter() laps so each stage costs a
+    single call:
+
+        t = time.perf_counter()
+        frame = capture()
+        t = metrics.lap('capture', t)
+        ...
+        metrics.frame_done()
+    """
+    def __init__(self, window=1000):
+        self.window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._frame_times = np.zeros(window, dtype=np.float64)
+        self._frames = 0
+        self.started = time.time()
+
+    def record(self, stage, seconds):
+        """Add one duration (seconds) to a stage's histogram"""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram(self.window)
+            histogram.add(seconds)
+
+    def lap(self, stage, start):
+        """Record the time since `start` for a stage and return the current time"""
+        now = time.perf_counter()
+        self.record(stage, now - start)
+        return now
+
+    def frame_done(self):
+        """Mark the end of a frame (for the frame rate)"""
+        now = time.perf_counter()
+        with self._lock:
+            self._frame_times[self._frames % self.window] = now
+            self._frames += 1
+
+    def fps(self):
+        """Frames per second over the window"""
+        with self._lock:
+            n = min(self._frames, self.window)
+            if n < 2:
+                return 0.0
+            last = self._frame_times[(self._frames - 1) % self.window]
+            first = self._frame_times[(self._frames - n) % self.window]
+        return (n - 1) / (last - first) if last > first else 0.0
+
+    def snapshot(self):
+        """JSON-ready summary of every stage"""
+        with self._lock:
+            stages = {name: histogram.summary() for name, histogram in self._stages.items()}
+            frames = self._frames
+        return {
+            'frames': frames,
+            'fps': round(self.fps(), 2),
+            'uptime': round(time.time() - self.started, 1),
+            'stages': stages,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._frames = 0
+            self.started = time.time()
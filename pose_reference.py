@@ -0,0 +1,80 @@
+import numpy as np
+
+from joint_angles import JOINT_ANGLES
+
+# Body parts scored against data.py AngleData, in JointAngleEngine column order
+PART_NAMES = ('right_arm', 'left_arm', 'right_leg', 'left_leg')
+PART_LABELS = ('Right Arm', 'Left Arm', 'Right Leg', 'Left Leg')
+
+assert PART_NAMES == tuple(joint[0] for joint in JOINT_ANGLES[:len(PART_NAMES)]), \
+    "PART_NAMES must match the first columns of the joint-angle table"
+
+
+def score_angles(reference, angles, tolerance=10, min_accuracy=None):
+    """
+    Vectorized accuracy scoring for every body part at once.
+
+    A part scores (angle / reference) * 100 when the measured angle does not
+    exceed the reference, and 0 otherwise. Parts within `tolerance` degrees of
+    the reference are reported as accurate and, if min_accuracy is set, their
+    non-zero scores are raised to at least that value.
+
+    `reference` and `angles` broadcast, so (4,) vs (4,) scores one frame,
+    (P, 4) vs (F, 1, 4) scores F frames against P poses.
+
+    Returns:
+        (accuracy, within_tolerance) arrays with the broadcast shape
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    angles = np.asarray(angles, dtype=np.float64)
+
+    accuracy = np.where(angles <= reference, angles / reference * 100, 0.0)
+    within_tolerance = np.abs(reference - angles) <= tolerance
+
+    if min_accuracy is not None:
+        boost = within_tolerance & (accuracy > 0) & (accuracy < min_accuracy)
+        accuracy = np.where(boost, min_accuracy, accuracy)
+
+    return accuracy, within_tolerance
+
+
+class PoseReferenceTable:
+    """
+    Reference joint angles from data.py AngleData compiled once into a
+    contiguous (num_poses, 4) float matrix indexed by pose id.
+    """
+    def __init__(self, angle_data, default_pose='tadasan', tolerance=10, min_accuracy=None):
+        self.pose_names = tuple(entry['Name'] for entry in angle_data)
+        self.pose_ids = {name: i for i, name in enumerate(self.pose_names)}
+        self.angles = np.ascontiguousarray(
+            [[entry[part] for part in PART_NAMES] for entry in angle_data], dtype=np.float64)
+        self.default_index = self.pose_ids.get(default_pose, 0)
+        self.tolerance = tolerance
+        self.min_accuracy = min_accuracy
+
+    def __len__(self):
+        return len(self.pose_names)
+
+    def pose_index(self, pose_name):
+        """Row of the pose in the table, falling back to the default pose"""
+        return self.pose_ids.get(pose_name, self.default_index)
+
+    def reference(self, pose_name):
+        """(4,) reference angles for a pose (a view, not a copy)"""
+        return self.angles[self.pose_index(pose_name)]
+
+    def score(self, pose_name, angles):
+        """Score one frame (or a batch of frames) of part angles against a single pose"""
+        return score_angles(self.reference(pose_name), angles, self.tolerance, self.min_accuracy)
+
+    def score_all(self, angles):
+        """
+        Score frames against every pose in the table.
+
+        Args:
+            angles: (4,) or (F, 4) part angles
+        Returns:
+            (accuracy, within_tolerance) of shape (P, 4) or (F, P, 4)
+        """
+        angles = np.asarray(angles, dtype=np.float64)
+        return score_angles(self.angles, angles[..., None, :], self.tolerance, self.min_accuracy)
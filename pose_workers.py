@@ -0,0 +1,300 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+
+def _worker_main(conn, pose_kwargs):
+    """
+    Worker process loop: one MediaPipe Pose per stream assigned to this worker,
+    so each stream keeps its own temporal smoothing. Frames arrive in shared
+    memory; only the (33, 4) landmark array is sent back through the pipe.
+    """
+    import mediapipe as mp
+
+    poses = {}
+    segments = {}
+    landmarks = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            op = message[0]
+
+            if op == 'process':
+                _, request_id, stream_id, shm_name, shape = message
+                try:
+                    segment = segments.get(stream_id)
+                    if segment is None or segment.name != shm_name:
+                        if segment is not None:
+                            segment.close()
+                        segment = shared_memory.SharedMemory(name=shm_name)
+                        segments[stream_id] = segment
+                    frame = np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+
+                    pose = poses.get(stream_id)
+                    if pose is None:
+                        pose = mp.solutions.pose.Pose(**pose_kwargs)
+                        poses[stream_id] = pose
+                    results = pose.process(frame)
+                    del frame
+
+                    if results.pose_landmarks:
+                        landmarks.ravel()[:] = [v for lm in results.pose_landmarks.landmark
+                                                for v in (lm.x, lm.y, lm.z, lm.visibility)]
+                        conn.send((request_id, landmarks.tobytes()))
+                    else:
+                        conn.send((request_id, None))
+                except Exception as e:
+                    conn.send((request_id, e))
+
+            elif op == 'release':
+                stream_id = message[1]
+                pose = poses.pop(stream_id, None)
+                if pose is not None:
+                    pose.close()
+                segment = segments.pop(stream_id, None)
+                if segment is not None:
+                    segment.close()
+
+            elif op == 'stop':
+                break
+    finally:
+        for pose in poses.values():
+            pose.close()
+        for segment in segments.values():
+            segment.close()
+
+
+class RemotePoseResults:
+    """
+    Result of RemotePose.process(), compatible with MediaPipe's results for the
+    parts PoseDetector uses. `landmark_array` is the (33, 4) normalized
+    x, y, z, visibility array (or None); the protobuf `pose_landmarks` is only
+    built when something (e.g. drawing) asks for it.
+    """
+    __slots__ = ('landmark_array', '_pose_landmarks')
+
+    def __init__(self, landmark_array=None):
+        self.landmark_array = landmark_array
+        self._pose_landmarks = None
+
+    @property
+    def pose_landmarks(self):
+        if self.landmark_array is None:
+            return None
+        if self._pose_landmarks is None:
+            from mediapipe.framework.formats import landmark_pb2
+            landmark_list = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z, visibility in self.landmark_array.tolist():
+                landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+            self._pose_landmarks = landmark_list
+        return self._pose_landmarks
+
+
+class _Worker:
+    def __init__(self, index, ctx, pose_kwargs):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, pose_kwargs),
+                                   name=f"PoseWorker-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        self.streams = set()
+        self.frames = 0
+        self.busy_time = 0.0
+
+
+class RemotePose:
+    """
+    Drop-in replacement for mp.solutions.pose.Pose backed by a PoseWorkerPool.
+    Every frame of this stream goes to the same worker process.
+    """
+    def __init__(self, pool, stream_id, worker):
+        self.pool = pool
+        self.stream_id = stream_id
+        self.worker = worker
+        self._segment = None
+        self._frame = None
+        self.closed = False
+
+    def input_buffer(self, shape):
+        """
+        Shared-memory RGB frame of `shape` that process() sends without copying.
+        Write the next frame straight into it (e.g. cv2.cvtColor(..., dst=buffer)).
+        """
+        shape = tuple(shape)
+        if self._frame is None or self._frame.shape != shape:
+            old = self._segment
+            size = int(np.prod(shape))
+            self._segment = shared_memory.SharedMemory(create=True, size=size)
+            self._frame = np.ndarray(shape, dtype=np.uint8, buffer=self._segment.buf)
+            if old is not None:
+                # The worker switches to the new segment on its next frame
+                old.close()
+                old.unlink()
+        return self._frame
+
+    def process(self, image):
+        """Run pose estimation on an RGB uint8 image in this stream's worker"""
+        if self.closed:
+            raise RuntimeError(f"Pose stream {self.stream_id} is closed")
+        image = np.asarray(image)
+        if image.dtype != np.uint8:
+            raise ValueError("RemotePose expects uint8 RGB images")
+        buffer = self.input_buffer(image.shape)
+        if image.__array_interface__['data'][0] != buffer.__array_interface__['data'][0]:
+            np.copyto(buffer, image)
+
+        result = self.pool._request(self.worker, self.stream_id, self._segment.name, image.shape)
+        if isinstance(result, Exception):
+            raise result
+        if result is None:
+            return RemotePoseResults()
+        return RemotePoseResults(np.frombuffer(result, dtype=np.float32).reshape(NUM_LANDMARKS, 4))
+
+    def close(self):
+        """Release this stream's Pose instance and shared memory"""
+        if self.closed:
+            return
+        self.closed = True
+        self.pool.release(self.stream_id)
+        if self._segment is not None:
+            self._frame = None
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+
+class PoseWorkerPool:
+    """
+    Pool of worker processes running MediaPipe Pose, so pose estimation for
+    several streams (cameras, client sessions) uses several cores instead of
+    the request thread's one.
+
+    Each stream is pinned to one worker for its lifetime, which keeps its
+    frames in order for MediaPipe's tracking and smoothing; new streams go to
+    the worker with the fewest streams. Frames are passed through shared memory.
+
+    Workers are forked where possible: spawn would re-run the launching script
+    (app.py opens the camera at import), so create and start() the pool before
+    anything in the process starts a thread, including modules that start one
+    at import time (e.g. progress_store's flusher).
+
+    Usage:
+        pool = PoseWorkerPool(num_workers=4).start()
+        detector = PoseDetector(pose_backend=pool.stream())
+    """
+    def __init__(self, num_workers=None, timeout=10.0, start_method=None, **pose_kwargs):
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.timeout = timeout
+        self.pose_kwargs = pose_kwargs
+        if start_method is None:
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._ctx = multiprocessing.get_context(start_method)
+        self._workers = []
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+
+    def start(self):
+        with self._lock:
+            if not self._workers:
+                others = [t.name for t in threading.enumerate() if t is not threading.current_thread()]
+                if others and self._ctx.get_start_method() == 'fork':
+                    print(f"Warning: forking pose workers while other threads are running: {others}")
+                # Share the parent's resource tracker; workers that attach to a segment
+                # would otherwise start their own and unlink it when they exit
+                resource_tracker.ensure_running()
+                self._workers = [_Worker(i, self._ctx, self.pose_kwargs) for i in range(self.num_workers)]
+                print(f"Started {self.num_workers} pose worker processes")
+        return self
+
+    def stream(self, stream_id=None):
+        """Return a RemotePose for a new stream, pinned to the least loaded worker"""
+        self.start()
+        stream_id = stream_id or uuid.uuid4().hex
+        with self._lock:
+            if stream_id in self._streams:
+                raise ValueError(f"Pose stream {stream_id} already exists")
+            worker = min(self._workers, key=lambda w: len(w.streams))
+            worker.streams.add(stream_id)
+            remote = RemotePose(self, stream_id, worker)
+            self._streams[stream_id] = remote
+        return remote
+
+    def _request(self, worker, stream_id, shm_name, shape):
+        request_id = next(self._request_ids)
+        with worker.lock:
+            start = time.perf_counter()
+            worker.conn.send(('process', request_id, stream_id, shm_name, tuple(shape)))
+            deadline = start + self.timeout
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    if not worker.process.is_alive():
+                        raise RuntimeError(f"Pose worker {worker.index} exited")
+                    raise TimeoutError(f"Pose worker {worker.index} did not answer within {self.timeout}s")
+                reply_id, result = worker.conn.recv()
+                # Drop late replies to requests that already timed out
+                if reply_id == request_id:
+                    break
+            worker.frames += 1
+            worker.busy_time += time.perf_counter() - start
+        return result
+
+    def release(self, stream_id):
+        """Free the Pose instance a stream was using in its worker"""
+        with self._lock:
+            remote = self._streams.pop(stream_id, None)
+        if remote is None:
+            return
+        remote.worker.streams.discard(stream_id)
+        try:
+            with remote.worker.lock:
+                remote.worker.conn.send(('release', stream_id))
+        except (OSError, ValueError):
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': [
+                    {
+                        'pid': w.process.pid,
+                        'alive': w.process.is_alive(),
+                        'streams': len(w.streams),
+                        'frames': w.frames,
+                        'avg_latency_ms': w.busy_time / w.frames * 1000 if w.frames else 0.0,
+                    }
+                    for w in self._workers
+                ],
+                'streams': len(self._streams),
+            }
+
+    def close(self):
+        """Stop all worker processes and free every stream's shared memory"""
+        for remote in list(self._streams.values()):
+            remote.close()
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                with worker.lock:
+                    worker.conn.send(('stop',))
+            except (OSError, ValueError):
+                pass
+            worker.process.join(timeout=2.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
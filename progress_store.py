@@ -0,0 +1,281 @@
+import atexit
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+
+# Poses tracked in pose_progress.json
+PROGRESS_POSES = [
+    'vrksana', 'adhomukha', 'balasana', 'tadasan', 'trikonasana',
+    'virabhadrasana', 'bhujangasana', 'setubandhasana',
+    'uttanasana', 'shavasana', 'ardhamatsyendrasana'
+]
+
+DEFAULT_PROGRESS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_progress.json')
+
+
+def default_progress_entry():
+    """Progress record for a pose that has never been practiced"""
+    return {
+        'attempts': 0,
+        'completions': 0,
+        'total_practice_time': 0,
+        'best_accuracy': 0,
+        'last_practiced': None
+    }
+
+
+def initialize_progress_data():
+    """Initialize empty progress data structure"""
+    return {pose: default_progress_entry() for pose in PROGRESS_POSES}
+
+
+class JsonProgressBackend:
+    """Stores progress as the pose_progress.json file, replaced atomically on every flush"""
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _file_mode(self):
+        try:
+            return stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+    def save(self, data, dirty_poses):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.pose_progress.', suffix='.tmp', dir=directory)
+        try:
+            # mkstemp creates the file 0600; keep the existing file's mode (or the umask default)
+            os.chmod(tmp_path, self._file_mode())
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # Atomic on both POSIX and Windows: readers never see a half-written file
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class SqliteProgressBackend:
+    """Stores progress in a SQLite table, upserting only the poses that changed"""
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pose_progress ("
+            "pose TEXT PRIMARY KEY, attempts INTEGER, completions INTEGER, "
+            "total_practice_time REAL, best_accuracy REAL, last_practiced TEXT)"
+        )
+        return conn
+
+    def load(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT pose, attempts, completions, total_practice_time, best_accuracy, last_practiced "
+                "FROM pose_progress").fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return None
+        return {
+            pose: {
+                'attempts': attempts,
+                'completions': completions,
+                'total_practice_time': total_practice_time,
+                'best_accuracy': best_accuracy,
+                'last_practiced': last_practiced
+            }
+            for pose, attempts, completions, total_practice_time, best_accuracy, last_practiced in rows
+        }
+
+    def save(self, data, dirty_poses):
+        rows = [
+            (pose, data[pose]['attempts'], data[pose]['completions'], data[pose]['total_practice_time'],
+             data[pose]['best_accuracy'], data[pose]['last_practiced'])
+            for pose in dirty_poses if pose in data
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO pose_progress VALUES (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+
+class ProgressStore:
+    """
+    In-memory pose progress shared by every writer in the process.
+
+    Updates are merged under a lock and only mark poses dirty; a background
+    thread flushes dirty state to disk every `flush_interval` seconds and on
+    shutdown, so no disk I/O happens on the frame loop or WebSocket handlers.
+    Subscribers are notified of every change with the updated entries.
+    """
+    def __init__(self, path=DEFAULT_PROGRESS_FILE, backend='json', flush_interval=2.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        if backend == 'sqlite':
+            self.backend = SqliteProgressBackend(path)
+        else:
+            self.backend = JsonProgressBackend(path)
+
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()   # Only one flush (disk writer) at a time
+        self._dirty = set()
+        self._closed = False
+        self._wake = threading.Event()
+        self._subscribers = []
+        self.version = 0        # Bumped on every change
+
+        try:
+            loaded = self.backend.load()
+        except Exception as e:
+            print(f"Error loading progress data: {str(e)}")
+            loaded = None
+
+        self._data = initialize_progress_data()
+        if loaded:
+            for pose, entry in loaded.items():
+                self._data[pose] = dict(default_progress_entry(), **entry)
+        else:
+            # Create the store on disk right away so other tools can find it
+            self._dirty.update(self._data)
+            self.flush()
+
+        self._thread = threading.Thread(target=self._flush_loop, name="ProgressStoreFlusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def snapshot(self):
+        """Return a copy of the progress data for all poses"""
+        with self._lock:
+            return {pose: dict(entry) for pose, entry in self._data.items()}
+
+    def get(self, pose):
+        """Return a copy of one pose's progress, or None if the pose is not tracked"""
+        with self._lock:
+            entry = self._data.get(pose)
+            return dict(entry) if entry is not None else None
+
+    def subscribe(self, callback):
+        """
+        Call callback({pose: entry}) after every change. Callbacks run on the
+        updating thread, so they should only hand the change off (e.g. to an
+        event loop) and return quickly.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, changes):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Error in progress subscriber: {str(e)}")
+
+    def __contains__(self, pose):
+        with self._lock:
+            return pose in self._data
+
+    def update(self, pose, attempts=0, completions=0, practice_time=0, best_accuracy=None, touch=True):
+        """
+        Atomically merge an update into a pose's progress.
+
+        Counters and practice time are incremented, best_accuracy only ever
+        increases, and touch=True sets last_practiced to now.
+        Returns the updated entry, or None if the pose is not tracked.
+        """
+        with self._lock:
+            entry = self._data.get(pose)
+            if entry is None:
+                return None
+            entry['attempts'] += attempts
+            entry['completions'] += completions
+            entry['total_practice_time'] += practice_time
+            if best_accuracy is not None and best_accuracy > entry['best_accuracy']:
+                entry['best_accuracy'] = best_accuracy
+            if touch:
+                entry['last_practiced'] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._dirty.add(pose)
+            self.version += 1
+            updated = dict(entry)
+        self._notify({pose: dict(updated)})
+        return updated
+
+    def flush(self):
+        """Write dirty progress to disk now (safe to call from any thread)"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                dirty = self._dirty
+                self._dirty = set()
+                data = {pose: dict(entry) for pose, entry in self._data.items()}
+            try:
+                self.backend.save(data, dirty)
+            except Exception as e:
+                print(f"Error saving progress data: {str(e)}")
+                with self._lock:
+                    self._dirty |= dirty
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background flusher and write any pending updates"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_progress_store(path=None, backend=None, flush_interval=2.0):
+    """
+    Return the process-wide ProgressStore for `path` (pose_progress.json by
+    default). Paths ending in .db/.sqlite use the SQLite backend unless
+    `backend` is given explicitly.
+    """
+    path = os.path.abspath(path or DEFAULT_PROGRESS_FILE)
+    if backend is None:
+        backend = 'sqlite' if path.endswith(('.db', '.sqlite', '.sqlite3')) else 'json'
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ProgressStore(path, backend=backend, flush_interval=flush_interval)
+            _stores[path] = store
+        return store
@@ -0,0 +1,159 @@
+import cv2
+import numpy as np
+
+
+class ROITracker:
+    """
+    Region-of-interest tracking for PoseDetector: instead of the full camera
+    frame, MediaPipe gets a padded crop around the person found in the previous
+    frame, downscaled to at most `target_size` pixels on its longest side.
+    While nobody is tracked, the whole frame is searched, downscaled to
+    `search_size`. Landmarks are mapped back to full-frame coordinates.
+
+    The crop only moves when the body leaves it or it becomes much larger than
+    needed (`hysteresis`), so MediaPipe's smoothing sees a steady input.
+    """
+    def __init__(self, padding=0.25, target_size=480, search_size=640, min_visibility=0.5,
+                 min_size=0.2, hysteresis=0.5):
+        self.padding = padding                # Margin around the body, as a fraction of its size
+        self.target_size = target_size
+        self.search_size = search_size
+        self.min_visibility = min_visibility
+        self.min_size = min_size              # Smallest crop, as a fraction of the frame's shorter side
+        self.hysteresis = hysteresis
+
+        self.roi = None             # (x0, y0, x1, y1) in full-frame pixels, None = search the full frame
+        self.active_roi = None      # Region the last crop() was taken from
+        self.frame_size = None      # (width, height) of the full frame
+        self._buffer = None         # Reused downscaled crop
+
+        self.tracked_frames = 0
+        self.search_frames = 0
+        self.lost = 0
+
+    def reset(self):
+        self.roi = None
+
+    def crop(self, frame):
+        """
+        Return the image to run pose estimation on: the tracked region of
+        `frame`, or the whole frame while searching, downscaled if needed.
+        The returned array may be a view of `frame` or a reused buffer.
+        """
+        h, w = frame.shape[:2]
+        if self.frame_size != (w, h):
+            self.frame_size = (w, h)
+            self.roi = None
+
+        if self.roi is None:
+            x0, y0, x1, y1 = 0, 0, w, h
+            limit = self.search_size
+            self.search_frames += 1
+        else:
+            x0, y0, x1, y1 = self.roi
+            limit = self.target_size
+            self.tracked_frames += 1
+        self.active_roi = (x0, y0, x1, y1)
+
+        region = frame[y0:y1, x0:x1]
+        cw, ch = x1 - x0, y1 - y0
+        scale = limit / max(cw, ch)
+        if scale >= 1.0:
+            return region
+
+        size = (max(1, int(round(cw * scale))), max(1, int(round(ch * scale))))
+        shape = (size[1], size[0]) + frame.shape[2:]
+        if self._buffer is None or self._buffer.shape != shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty(shape, dtype=frame.dtype)
+        cv2.resize(region, size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+        return self._buffer
+
+    def _is_full_frame(self):
+        w, h = self.frame_size
+        return self.active_roi == (0, 0, w, h)
+
+    def to_full_frame(self, landmarks):
+        """Map (N, >=3) landmarks normalized to the last crop to full-frame normalized coordinates, in place"""
+        if self.active_roi is None or self._is_full_frame():
+            return landmarks
+        x0, y0, x1, y1 = self.active_roi
+        w, h = self.frame_size
+        landmarks[:, 0] = (x0 + landmarks[:, 0] * (x1 - x0)) / w
+        landmarks[:, 1] = (y0 + landmarks[:, 1] * (y1 - y0)) / h
+        # MediaPipe's z uses roughly the same scale as x
+        landmarks[:, 2] *= (x1 - x0) / w
+        return landmarks
+
+    def remap_results(self, results):
+        """Rewrite a pose result's landmarks from crop to full-frame coordinates"""
+        if self.active_roi is None or self._is_full_frame():
+            return results
+        landmark_array = getattr(results, 'landmark_array', None)
+        if landmark_array is not None:
+            # Pose worker results (pose_workers.RemotePoseResults)
+            results.landmark_array = self.to_full_frame(landmark_array.copy())
+        elif results.pose_landmarks:
+            x0, y0, x1, y1 = self.active_roi
+            w, h = self.frame_size
+            sx, sy = (x1 - x0) / w, (y1 - y0) / h
+            ox, oy = x0 / w, y0 / h
+            for lm in results.pose_landmarks.landmark:
+                lm.x = ox + lm.x * sx
+                lm.y = oy + lm.y * sy
+                lm.z = lm.z * sx
+        return results
+
+    def update(self, landmarks):
+        """
+        Choose the next frame's region from this frame's full-frame normalized
+        (33, 4) landmarks, or fall back to a full-frame search if there are none.
+        """
+        if landmarks is None or self.frame_size is None:
+            if self.roi is not None:
+                self.lost += 1
+            self.roi = None
+            return
+
+        visible = landmarks[:, 3] >= self.min_visibility
+        if np.count_nonzero(visible) < 4:
+            if self.roi is not None:
+                self.lost += 1
+            self.roi = None
+            return
+
+        w, h = self.frame_size
+        points = landmarks[visible, :2] * (w, h)
+        bx0, by0 = points.min(axis=0)
+        bx1, by1 = points.max(axis=0)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        half = max(bx1 - bx0, by1 - by0, self.min_size * min(w, h)) * (0.5 + self.padding)
+
+        new_roi = (
+            int(max(0, cx - half)), int(max(0, cy - half)),
+            int(min(w, cx + half)), int(min(h, cy + half))
+        )
+        if new_roi[2] - new_roi[0] < 2 or new_roi[3] - new_roi[1] < 2:
+            self.roi = None
+            return
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            # Keep the current crop while the body (with half the padding) is inside it
+            # and the crop is not much larger than a fresh one would be
+            inner = half * (0.5 + self.padding / 2) / (0.5 + self.padding)
+            contains = (x0 <= max(0, cx - inner) and y0 <= max(0, cy - inner) and
+                        x1 >= min(w, cx + inner) and y1 >= min(h, cy + inner))
+            current_area = (x1 - x0) * (y1 - y0)
+            new_area = (new_roi[2] - new_roi[0]) * (new_roi[3] - new_roi[1])
+            if contains and current_area <= new_area * (1 + self.hysteresis):
+                return
+
+        self.roi = new_roi
+
+    def stats(self):
+        return {
+            'roi': self.roi,
+            'tracked_frames': self.tracked_frames,
+            'search_frames': self.search_frames,
+            'lost': self.lost,
+        }
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+
+from accuracy_history import AccuracyHistory
+from pose_reference import PART_LABELS
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when every session slot is taken by an active client"""
+    pass
+
+
+class PoseSession:
+    """
+    Pose tracking state for one client: selected pose, hold timer, accuracy
+    history and a private detector (its own landmark buffers, smoothing
+    context and breathing clock).
+    """
+    def __init__(self, session_id, detector_factory, pose_name='vrksana'):
+        self.session_id = session_id
+        self.detector_factory = detector_factory
+        self.detector = None
+        self._producers = 0     # Frame producers currently using the detector
+        self.current_pose = pose_name
+        self.accuracy_history = AccuracyHistory(PART_LABELS)
+        self.pose_hold_start_time = None
+        self.pose_correct_duration = 0
+        self.pose_completed = False
+
+        # Frame producers for this session's MJPEG and landmark viewers (set by the app)
+        self.broadcaster = None
+        self.landmark_broadcaster = None
+        self.closed = False
+        self.lock = threading.RLock()
+        self.created = time.monotonic()
+        self.last_seen = self.created
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def get_detector(self):
+        """Create the session's detector on first use"""
+        with self.lock:
+            if self.detector is None:
+                self.detector = self.detector_factory(self.current_pose)
+            return self.detector
+
+    def acquire_detector(self):
+        """
+        Detector for a frame producer, or None once the session is closed.
+        Pair with release_detector() in the producer's finally block.
+        """
+        with self.lock:
+            if self.closed:
+                return None
+            self._producers += 1
+            return self.get_detector()
+
+    def release_detector(self):
+        """Called when a producer stops; the last one out of a closed session closes the detector"""
+        with self.lock:
+            self._producers -= 1
+            if not self.closed or self._producers > 0:
+                return
+            detector, self.detector = self.detector, None
+        self._close_detector(detector)
+
+    def _close_detector(self, detector):
+        pose = getattr(detector, 'pose', None)
+        if pose is not None and hasattr(pose, 'close'):
+            try:
+                pose.close()
+            except Exception as e:
+                print(f"Error closing detector for session {self.session_id}: {str(e)}")
+
+    def reset_tracking(self):
+        """Reset the hold timer (e.g. when the pose changes or a new stream starts)"""
+        with self.lock:
+            self.pose_hold_start_time = None
+            self.pose_correct_duration = 0
+            self.pose_completed = False
+
+    def set_pose(self, pose_name):
+        """Select a pose for this session and reset its tracking"""
+        with self.lock:
+            self.current_pose = pose_name
+            self.reset_tracking()
+            if self.detector is not None:
+                self.detector.setPose(pose_name)
+
+    def _broadcasters(self):
+        return [b for b in (self.broadcaster, self.landmark_broadcaster) if b is not None]
+
+    def is_active(self):
+        """True while someone is watching this session's video or landmark stream"""
+        return any(b.subscriber_count > 0 for b in self._broadcasters())
+
+    def close(self):
+        """
+        Stop the session's frame producers and release its detector. A producer
+        still inside findPose closes the detector itself when it exits.
+        """
+        with self.lock:
+            self.closed = True
+            detector = None
+            if self._producers == 0:
+                detector, self.detector = self.detector, None
+        for broadcaster in self._broadcasters():
+            broadcaster.stop()
+        if detector is not None:
+            self._close_detector(detector)
+
+
+class SessionManager:
+    """
+    Keeps one PoseSession per client id in LRU order.
+
+    Sessions unused for `idle_timeout` seconds are evicted, and at most
+    `max_sessions` exist at once: when full, the least recently used session
+    without an active viewer is evicted, and SessionLimitError is raised if
+    every session is active.
+    """
+    def __init__(self, detector_factory, max_sessions=4, idle_timeout=300, on_create=None):
+        self.detector_factory = detector_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.on_create = on_create    # Optional callback(session) to attach app resources
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.evicted += 1
+        print(f"Evicting pose session {session_id}")
+        session.close()
+
+    def evict_idle(self):
+        """Drop sessions that have been idle for longer than idle_timeout"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                sid for sid, session in self._sessions.items()
+                if now - session.last_seen > self.idle_timeout and not session.is_active()
+            ]
+            for sid in stale:
+                self._evict(sid)
+
+    def get(self, session_id, pose_name=None):
+        """Return the session for `session_id`, creating it if needed"""
+        self.evict_idle()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.touch()
+                return session
+
+            if len(self._sessions) >= self.max_sessions:
+                # OrderedDict iterates least recently used first
+                idle = next((sid for sid, s in self._sessions.items() if not s.is_active()), None)
+                if idle is None:
+                    raise SessionLimitError(
+                        f"All {self.max_sessions} practice sessions are in use, please try again later")
+                self._evict(idle)
+
+            session = PoseSession(session_id, self.detector_factory, pose_name or 'vrksana')
+            if self.on_create is not None:
+                self.on_create(session)
+            self._sessions[session_id] = session
+            return session
+
+    def remove(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._evict(session_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def sessions(self):
+        """Snapshot of the current sessions, least recently used first"""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'active': sum(1 for s in self._sessions.values() if s.is_active()),
+                'max_sessions': self.max_sessions,
+                'evicted': self.evicted,
+            }
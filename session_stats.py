@@ -0,0 +1,95 @@
+import math
+
+import numpy as np
+
+
+def window_means(values, size=4):
+    """
+    Means of consecutive `size`-sample windows, vectorized.
+
+    Matches the original accuracyCalculation loop exactly: windows start at
+    range(0, len(values) - 1, size), a trailing partial window is still
+    divided by `size`, and a single trailing sample after the last full
+    window is dropped.
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    windows = len(range(0, max(len(values) - 1, 0), size))
+    if windows == 0:
+        return np.array([])
+    padded = np.zeros(windows * size, dtype=np.float64)
+    covered = min(len(values), windows * size)
+    padded[:covered] = values[:covered]
+    return padded.reshape(windows, size).sum(axis=1) / size
+
+
+class RollingStats:
+    """
+    Incremental statistics over an accuracy stream.
+
+    update() is O(1): count, mean, min/max and an exponentially weighted
+    moving average are kept for the whole session, and the last `window`
+    samples are kept in a ring buffer for percentiles.
+    """
+    def __init__(self, window=256, alpha=0.1):
+        self.alpha = alpha
+        self._window = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.ewma = None
+
+    def update(self, value):
+        value = float(value)
+        self._window[self.count % len(self._window)] = value
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.ewma = value if self.ewma is None else self.ewma + self.alpha * (value - self.ewma)
+
+    def extend(self, values):
+        for value in np.asarray(values, dtype=np.float64).ravel().tolist():
+            self.update(value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def window(self):
+        """The most recent samples, oldest first"""
+        size = len(self._window)
+        if self.count <= size:
+            return self._window[:self.count].copy()
+        return np.roll(self._window, -(self.count % size))
+
+    def percentiles(self, q=(50, 95)):
+        """Percentiles of the recent window"""
+        recent = self._window[:min(self.count, len(self._window))]
+        if recent.size == 0:
+            return [0.0] * len(q)
+        return np.percentile(recent, q).tolist()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.ewma = None
+
+    def summary(self):
+        """Session summary; percentiles are over the recent window"""
+        if self.count == 0:
+            return {'count': 0}
+        p50, p95 = self.percentiles((50, 95))
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 2),
+            'ewma': round(self.ewma, 2),
+            'min': round(self.min, 2),
+            'max': round(self.max, 2),
+            'p50': round(p50, 2),
+            'p95': round(p95, 2),
+        }
@@ -0,0 +1,137 @@
+import threading
+import time
+
+
+class FrameBroadcaster:
+    """
+    Runs a single frame producer (e.g. generate_frames) on a background thread
+    and fans its output out to any number of MJPEG subscribers.
+
+    Each subscriber only ever receives the newest published chunk, so a slow
+    client skips frames instead of slowing down the producer or other viewers.
+    The producer starts with the first subscriber and stops once the last one
+    has been gone for `idle_timeout` seconds.
+    """
+    def __init__(self, source_factory, idle_timeout=5.0, name="FrameBroadcaster"):
+        self.source_factory = source_factory
+        self.idle_timeout = idle_timeout
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._latest = None        # Newest chunk published by the producer
+        self._seq = 0              # Sequence number of self._latest
+        self._subscribers = 0
+        self._last_unsubscribe = time.monotonic()
+        self._thread = None
+        self._running = False
+        self._stopped = False
+
+        # Counters for debugging fan-out behaviour
+        self.frames_published = 0
+        self.frames_delivered = 0
+        self.frames_skipped = 0
+
+    def _ensure_producer(self):
+        """Start the producer thread if it is not running (caller holds the lock)"""
+        if self._running or self._stopped:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._produce, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _should_stop(self):
+        with self._cond:
+            if self._stopped:
+                self._running = False
+                self._cond.notify_all()
+                return True
+            if self._subscribers > 0:
+                return False
+            if time.monotonic() - self._last_unsubscribe < self.idle_timeout:
+                return False
+            self._running = False
+            self._cond.notify_all()
+            return True
+
+    def _produce(self):
+        while True:
+            source = self.source_factory()
+            try:
+                for chunk in source:
+                    self.publish(chunk)
+                    if self._should_stop():
+                        return
+            except Exception as e:
+                print(f"Error in {self.name} producer: {e}")
+            finally:
+                close = getattr(source, 'close', None)
+                if close is not None:
+                    close()
+
+            # Source ended (e.g. camera timeout); restart it only while someone is watching
+            if self._should_stop():
+                return
+            time.sleep(0.5)
+
+    def publish(self, chunk):
+        """Replace the newest chunk and wake up all waiting subscribers"""
+        with self._cond:
+            self._latest = chunk
+            self._seq += 1
+            self.frames_published += 1
+            self._cond.notify_all()
+
+    def subscribe(self, timeout=5.0):
+        """
+        Generator for one viewer. Yields the newest chunk each time a new one is
+        published; chunks published while the viewer was busy are skipped.
+        """
+        with self._cond:
+            self._subscribers += 1
+            self._ensure_producer()
+            last_seq = 0
+
+        try:
+            while True:
+                with self._cond:
+                    while self._seq == last_seq and self._running:
+                        if not self._cond.wait(timeout):
+                            break
+                    if self._seq == last_seq:
+                        if not self._running:
+                            return
+                        continue
+                    if last_seq:
+                        self.frames_skipped += self._seq - last_seq - 1
+                    last_seq = self._seq
+                    chunk = self._latest
+                    self.frames_delivered += 1
+                # Yield outside the lock so a slow client never blocks the producer
+                yield chunk
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                self._last_unsubscribe = time.monotonic()
+
+    def stop(self):
+        """Stop for good: the producer exits after its current chunk and subscribers end"""
+        with self._cond:
+            self._stopped = True
+            self._running = False
+            self._cond.notify_all()
+
+    @property
+    def subscriber_count(self):
+        with self._cond:
+            return self._subscribers
+
+    def stats(self):
+        """Return fan-out counters"""
+        with self._cond:
+            return {
+                'running': self._running,
+                'subscribers': self._subscribers,
+                'published': self.frames_published,
+                'delivered': self.frames_delivered,
+                'skipped': self.frames_skipped,
+            }
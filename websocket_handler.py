@@ -3,63 +3,153 @@ import asyncio
 import websockets
 import os
 import time
+import threading
+from collections import deque
 from typing import Dict, Set, Any
+from urllib.parse import urlparse, parse_qs
+from progress_store import get_progress_store, initialize_progress_data as _initialize_progress_data
 
 # Store active connections
 active_connections: Set[websockets.WebSocketServerProtocol] = set()
 # Store pose data for each connection
 pose_data: Dict[websockets.WebSocketServerProtocol, Dict[str, Any]] = {}
+# Outbound messages for each feedback connection, drained by its own writer task
+outbound_queues: Dict[websockets.WebSocketServerProtocol, "Outbox"] = {}
 
-# Path to progress data file
-progress_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_progress.json')
+# Outbound message kinds: a newer pose status supersedes a queued one, progress
+# pushes are merged into a queued one, anything else (e.g. completions) is always kept
+STATUS = 'status'
+PROGRESS = 'progress'
+EVENT = 'event'
+
+# Seconds a single send may take; a timed-out message is never resent (the frame is
+# usually already written), and a client that times out MAX_SEND_TIMEOUTS times in a
+# row is disconnected
+SEND_TIMEOUT = 2.0
+MAX_SEND_TIMEOUTS = 3
+# Messages a connection may have queued; a client that falls further behind is disconnected
+OUTBOX_LIMIT = 32
+dropped_messages = 0
+
+# Event loop of the running WebSocket server, for broadcasts from other threads
+_server_loop = None
+
+# Progress data lives in the shared in-memory store, which flushes pose_progress.json in the background
+progress_store = get_progress_store()
+progress_data_file = progress_store.path
 
 def load_progress_data():
-    """Load pose progress data from JSON file"""
-    if os.path.exists(progress_data_file):
-        try:
-            with open(progress_data_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading progress data: {str(e)}")
-            return initialize_progress_data()
-    else:
-        # Create the initial progress data file if it doesn't exist
-        data = initialize_progress_data()
-        save_progress_data(data)
-        return data
+    """Return a copy of the current pose progress data"""
+    return progress_store.snapshot()
             
 def initialize_progress_data():
     """Initialize empty progress data structure"""
-    poses = [
-        'vrksana', 'adhomukha', 'balasana', 'tadasan', 'trikonasana', 
-        'virabhadrasana', 'bhujangasana', 'setubandhasana', 
-        'uttanasana', 'shavasana', 'ardhamatsyendrasana'
-    ]
-    
-    data = {}
-    for pose in poses:
-        data[pose] = {
-            'attempts': 0,
-            'completions': 0,
-            'total_practice_time': 0,
-            'best_accuracy': 0,
-            'last_practiced': None
-        }
-    return data
-        
-def save_progress_data(data):
-    """Save pose progress data to JSON file"""
+    return _initialize_progress_data()
+
+class Outbox:
+    """
+    Outbound messages for one connection. At most one pose status is queued
+    (a newer one replaces it) and queued progress pushes are merged into one;
+    completion and other event messages are never dropped. If more than
+    `limit` messages are still queued the client is too slow to serve:
+    the outbox overflows and the writer disconnects it.
+    """
+    def __init__(self, limit=OUTBOX_LIMIT):
+        self._messages = deque()    # [kind, serialized message]
+        self._ready = asyncio.Event()
+        self.limit = limit
+        self.overflowed = False
+
+    def put(self, message, kind=EVENT):
+        global dropped_messages
+        if kind in (STATUS, PROGRESS):
+            for item in self._messages:
+                if item[0] != kind:
+                    continue
+                if kind == STATUS:
+                    # Superseded: drop the queued status and queue the new one at the end
+                    self._messages.remove(item)
+                    dropped_messages += 1
+                else:
+                    # Later entries win, so the merge loses nothing
+                    merged = json.loads(item[1])
+                    merged["progress"].update(json.loads(message)["progress"])
+                    item[1] = json.dumps(merged)
+                    return
+                break
+        if len(self._messages) >= self.limit:
+            self.overflowed = True
+        else:
+            self._messages.append([kind, message])
+        self._ready.set()
+
+    async def get(self):
+        """Next (kind, message); (None, None) once the outbox has overflowed"""
+        while not self._messages and not self.overflowed:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.overflowed:
+            return None, None
+        kind, message = self._messages.popleft()
+        return kind, message
+
+    def qsize(self):
+        return len(self._messages)
+
+def _enqueue(websocket, message, kind=EVENT):
+    """Queue an already serialized message for a connection; False if it has no writer"""
+    outbox = outbound_queues.get(websocket)
+    if outbox is None:
+        return False
+    outbox.put(message, kind)
+    return True
+
+async def _connection_writer(websocket, outbox):
+    """Send a connection's queued messages in order, so a slow client only delays itself"""
+    global dropped_messages
+    timeouts = 0
+    while True:
+        kind, message = await outbox.get()
+        if kind is None:
+            print(f"Disconnecting slow client with more than {outbox.limit} queued messages")
+            await _close_slow_client(websocket, "outbound queue full")
+            return
+        try:
+            await asyncio.wait_for(websocket.send(message), SEND_TIMEOUT)
+            timeouts = 0
+        except asyncio.TimeoutError:
+            # Not resent: the frame has usually reached the transport already
+            dropped_messages += 1
+            timeouts += 1
+            if timeouts >= MAX_SEND_TIMEOUTS:
+                print(f"Disconnecting stalled client after {timeouts} send timeouts")
+                await _close_slow_client(websocket, "send timeouts")
+                return
+        except websockets.exceptions.ConnectionClosed:
+            return
+
+async def _close_slow_client(websocket, reason):
+    """Close a connection that cannot keep up; its handler cleans up when the close completes"""
     try:
-        with open(progress_data_file, 'w') as f:
-            json.dump(data, f, indent=4)
-        print(f"Progress data saved successfully to {progress_data_file}")
-    except Exception as e:
-        print(f"Error saving progress data: {str(e)}")
+        await asyncio.wait_for(websocket.close(code=1008, reason=f"Too slow: {reason}"), SEND_TIMEOUT)
+    except Exception:
+        # A client too stalled to complete the closing handshake: stop broadcasting to it
+        # (its handler still records practice time when the connection finally ends)
+        active_connections.discard(websocket)
+        outbound_queues.pop(websocket, None)
+
+def _forget_connection(websocket):
+    active_connections.discard(websocket)
+    outbound_queues.pop(websocket, None)
+    pose_data.pop(websocket, None)
 
 async def handle_websocket(websocket, path):
     """Handle WebSocket connections for pose feedback"""
+    outbox = Outbox()
+    writer = asyncio.ensure_future(_connection_writer(websocket, outbox))
     try:
         # Add connection to active connections
+        outbound_queues[websocket] = outbox
         active_connections.add(websocket)
         pose_data[websocket] = {
             "pose": "vrksana", 
@@ -68,8 +158,8 @@ async def handle_websocket(websocket, path):
             "practice_start_time": time.time()
         }
         
-        # Load progress data when connection starts
-        progress_data = load_progress_data()
+        # Current progress from the shared in-memory store; later changes are pushed as they happen
+        _enqueue(websocket, json.dumps({"progress": progress_store.snapshot()}), PROGRESS)
         
         # Keep connection open and handle messages
         async for message in websocket:
@@ -84,52 +174,40 @@ async def handle_websocket(websocket, path):
                     print(f"Client set pose: {new_pose}")
                     
                     # Record practice time for previous pose if changing poses
+                    # (merged into the shared in-memory store; nothing is read from disk here)
                     if old_pose != new_pose and "practice_start_time" in pose_data[websocket]:
                         practice_duration = time.time() - pose_data[websocket]["practice_start_time"]
-                        if practice_duration >= 5 and old_pose in progress_data:
-                            progress_data[old_pose]["total_practice_time"] += practice_duration
-                            progress_data[old_pose]["last_practiced"] = time.strftime("%Y-%m-%d %H:%M:%S")
-                            save_progress_data(progress_data)
+                        if practice_duration >= 5:
+                            progress_store.update(old_pose, practice_time=practice_duration)
                     
                     # Reset practice timer for new pose
                     pose_data[websocket]["practice_start_time"] = time.time()
                     
                     # Increment attempt count for the new pose
-                    if new_pose in progress_data:
-                        progress_data[new_pose]["attempts"] += 1
-                        progress_data[new_pose]["last_practiced"] = time.strftime("%Y-%m-%d %H:%M:%S")
-                        save_progress_data(progress_data)
+                    progress_store.update(new_pose, attempts=1)
                 
                 # If backend sends pose status update
                 if "is_correct_pose" in data:
                     pose_data[websocket]["is_correct_pose"] = data["is_correct_pose"]
                     
                     # Send the updated information back to client
-                    await websocket.send(json.dumps({
+                    _enqueue(websocket, json.dumps({
                         "is_correct_pose": pose_data[websocket]["is_correct_pose"]
-                    }))
+                    }), STATUS)
                 
                 # If backend sends pose completion update  
                 if "pose_completed" in data:
                     pose_data[websocket]["pose_completed"] = data["pose_completed"]
                     current_pose = pose_data[websocket]["pose"]
                     
-                    # Update completion statistics when pose is completed
-                    if data["pose_completed"] and current_pose in progress_data:
-                        progress_data[current_pose]["completions"] += 1
-                        
-                        # Update accuracy if provided
-                        if "accuracy" in data:
-                            accuracy = data["accuracy"]
-                            if accuracy > progress_data[current_pose]["best_accuracy"]:
-                                progress_data[current_pose]["best_accuracy"] = accuracy
-                        
-                        # Save updated progress data
-                        save_progress_data(progress_data)
+                    # Update completion statistics (and best accuracy, if provided) when pose is completed
+                    if data["pose_completed"]:
+                        progress_store.update(current_pose, completions=1,
+                                              best_accuracy=data.get("accuracy"), touch=False)
                     
                     # Send the completion notification to client
                     if data["pose_completed"]:
-                        await websocket.send(json.dumps({
+                        _enqueue(websocket, json.dumps({
                             "pose_completed": True
                         }))
             except json.JSONDecodeError:
@@ -138,7 +216,9 @@ async def handle_websocket(websocket, path):
         print("Client disconnected")
     finally:
         # Clean up when connection closes
-        active_connections.remove(websocket)
+        writer.cancel()
+        active_connections.discard(websocket)
+        outbound_queues.pop(websocket, None)
         
         # Record practice time for the last pose when disconnecting
         if websocket in pose_data:
@@ -147,59 +227,188 @@ async def handle_websocket(websocket, path):
                 practice_duration = time.time() - pose_data[websocket]["practice_start_time"]
                 
                 # Only record if they practiced for at least 5 seconds
-                progress_data = load_progress_data()
-                if practice_duration >= 5 and current_pose in progress_data:
-                    progress_data[current_pose]["total_practice_time"] += practice_duration
-                    save_progress_data(progress_data)
-                    print(f"Recorded {practice_duration:.1f}s practice time for {current_pose} on disconnect")
+                if practice_duration >= 5:
+                    if progress_store.update(current_pose, practice_time=practice_duration, touch=False) is not None:
+                        print(f"Recorded {practice_duration:.1f}s practice time for {current_pose} on disconnect")
             
             del pose_data[websocket]
 
+async def _deliver(websocket, message, kind=EVENT):
+    """Queue a message for a connection, or send it directly (with a timeout) if it has no writer"""
+    if _enqueue(websocket, message, kind):
+        return
+    try:
+        await asyncio.wait_for(websocket.send(message), SEND_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("Timed out sending status to a slow client")
+    except websockets.exceptions.ConnectionClosed:
+        print("Connection closed while sending status")
+        _forget_connection(websocket)
+
 async def send_pose_status(websocket, is_correct_pose, pose_completed=False):
     """Send pose status update to specific client"""
     if websocket in active_connections:
-        try:
-            await websocket.send(json.dumps({
-                "is_correct_pose": is_correct_pose,
-                "pose_completed": pose_completed
-            }))
-        except websockets.exceptions.ConnectionClosed:
-            print("Connection closed while sending status")
-            active_connections.remove(websocket)
-            if websocket in pose_data:
-                del pose_data[websocket]
+        await _deliver(websocket, json.dumps({
+            "is_correct_pose": is_correct_pose,
+            "pose_completed": pose_completed
+        }), EVENT if pose_completed else STATUS)
+
+async def _broadcast(message, kind=EVENT):
+    """Deliver one serialized message to every feedback client concurrently"""
+    await asyncio.gather(*(_deliver(websocket, message, kind) for websocket in list(active_connections)),
+                         return_exceptions=True)
 
 async def broadcast_pose_status(is_correct_pose, pose_completed=False):
-    """Send pose status update to all connected clients"""
-    disconnected = set()
+    """Send pose status update to all connected clients (serialized once, delivered concurrently)"""
+    # A completion must always arrive; a plain status may be superseded by the next one
+    await _broadcast(json.dumps({
+        "is_correct_pose": is_correct_pose,
+        "pose_completed": pose_completed
+    }), EVENT if pose_completed else STATUS)
+
+def _on_progress_change(changes):
+    """ProgressStore subscriber: push changed pose progress to feedback clients"""
+    loop = _server_loop
+    if loop is None or not loop.is_running() or not active_connections:
+        return
+    asyncio.run_coroutine_threadsafe(_broadcast(json.dumps({"progress": changes}), PROGRESS), loop)
+
+def broadcast_pose_status_threadsafe(is_correct_pose, pose_completed=False):
+    """
+    Schedule broadcast_pose_status on the WebSocket server's event loop from any
+    thread (e.g. the frame generators). Returns a concurrent Future, or None if
+    the server is not running; it never blocks the caller.
+    """
+    loop = _server_loop
+    if loop is None or not loop.is_running():
+        return None
+    return asyncio.run_coroutine_threadsafe(broadcast_pose_status(is_correct_pose, pose_completed), loop)
+
+def broadcast_stats():
+    """Connection and outbound queue state for monitoring"""
+    return {
+        'connections': len(active_connections),
+        'queued_messages': sum(queue.qsize() for queue in outbound_queues.values()),
+        'dropped_messages': dropped_messages,
+    }
+
+# Server-side inference for frames pushed by browsers (created on the first /ingest connection)
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+def get_ingestor():
+    """Return the shared FrameIngestor, loading MediaPipe on first use"""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            import PoseModule as pm
+            from data import AngleData
+            from frame_ingest import FrameIngestor
+            # Static image mode: pooled detectors carry no tracking state between different clients' frames
+            _ingestor = FrameIngestor(
+                lambda: pm.PoseDetector(mode=True, enable_audio=False),
+                AngleData,
+                pool_size=max(1, min(4, os.cpu_count() or 1))
+            )
+        return _ingestor
+
+async def handle_ingest(websocket, path):
+    """
+    Accept binary JPEG/WebP frames from a client and reply to each one with
+    landmarks, joint angles and accuracy scores as JSON.
+    The pose is chosen with /ingest?pose=<id> or a {"pose": "<id>"} text message.
+    """
+    query = parse_qs(urlparse(path).query)
+    pose = query.get("pose", ["vrksana"])[0]
+    # The first connection imports MediaPipe and builds the detector pool; do that
+    # on a worker thread so other sockets on this loop keep being served
+    ingestor = await asyncio.get_running_loop().run_in_executor(None, get_ingestor)
+    print(f"Ingest client connected for pose: {pose}")
     
-    for websocket in active_connections:
-        try:
-            await websocket.send(json.dumps({
-                "is_correct_pose": is_correct_pose,
-                "pose_completed": pose_completed
-            }))
-        except websockets.exceptions.ConnectionClosed:
-            disconnected.add(websocket)
+    try:
+        async for message in websocket:
+            if isinstance(message, str):
+                try:
+                    data = json.loads(message)
+                    if "pose" in data:
+                        pose = data["pose"]
+                        await websocket.send(json.dumps({"pose": pose}))
+                except json.JSONDecodeError:
+                    print(f"Invalid JSON received: {message}")
+                continue
+            
+            # Replies are sent in order, one per frame, which also paces clients to the inference rate
+            result = await ingestor.analyze_async(message, pose)
+            await websocket.send(json.dumps(result))
+    except websockets.exceptions.ConnectionClosed:
+        print("Ingest client disconnected")
+
+# Binary stream sources by WebSocket path, e.g. '/landmarks' -> factory(params) returning an iterator of packets
+stream_sources: Dict[str, Any] = {}
+
+def register_stream_source(path, factory):
+    """
+    Serve the packets of factory(query_params) to clients connecting to `path`.
+    The iterator may block (e.g. FrameBroadcaster.subscribe()); it is advanced
+    on a worker thread so the event loop is never blocked.
+    """
+    stream_sources["/" + path.strip("/")] = factory
+
+async def handle_stream(websocket, path, factory):
+    """Send each packet from a registered stream source as a binary message"""
+    params = {key: values[0] for key, values in parse_qs(urlparse(path).query).items()}
+    try:
+        iterator = factory(params)
+    except Exception as e:
+        await websocket.close(code=1013, reason=str(e)[:120])
+        return
     
-    # Clean up disconnected clients
-    for websocket in disconnected:
-        active_connections.remove(websocket)
-        if websocket in pose_data:
-            del pose_data[websocket]
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            packet = await loop.run_in_executor(None, next, iterator, None)
+            if packet is None:
+                break
+            await websocket.send(packet)
+    except websockets.exceptions.ConnectionClosed:
+        print(f"Stream client disconnected from {urlparse(path).path}")
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                pass  # Still running on the worker thread after a cancel; it ends on its own timeout
+
+async def route_connection(websocket, path):
+    """
+    Dispatch WebSocket connections by path: /ingest for frame upload, registered
+    stream sources (e.g. /landmarks), anything else for pose feedback
+    """
+    route = urlparse(path).path.rstrip("/")
+    if route == "/ingest":
+        await handle_ingest(websocket, path)
+    elif route in stream_sources:
+        await handle_stream(websocket, path, stream_sources[route])
+    else:
+        await handle_websocket(websocket, path)
 
 def start_websocket_server(host='0.0.0.0', port=8765):
     """Start WebSocket server"""
+    global _server_loop
     try:
         # Create a new event loop for this thread
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        _server_loop = loop
+        progress_store.subscribe(_on_progress_change)
         
         print(f"WebSocket server starting on {host}:{port}")
         
         # Start the server
         async def start_server():
-            server = await websockets.serve(handle_websocket, host, port)
+            # max_size allows full-resolution JPEG frames on /ingest
+            server = await websockets.serve(route_connection, host, port, max_size=2 ** 22)
             print(f"WebSocket server successfully started on {host}:{port}")
             await server.wait_closed()
         
@@ -212,6 +421,8 @@ def start_websocket_server(host='0.0.0.0', port=8765):
     except KeyboardInterrupt:
         print("WebSocket server stopped")
     finally:
+        _server_loop = None
+        progress_store.unsubscribe(_on_progress_change)
         try:
             loop.close()
         except: